@@ -0,0 +1,119 @@
+"""Time to N joined bots: fixed batch_size batches vs. the adaptive ramp controller.
+
+Joins run against a simulated host that can serve --capacity joins at once. Past
+that, join time grows with the square of the overload, and a join slower than
+--join-timeout fails, like a Chrome that times out on a starved host. The
+controller still reads the real host's CPU, memory and /dev/shm. Run from the
+repository root:
+
+    python benchmarks/adaptive_ramp.py --bots 200 --batch-size 25 --capacity 10
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from threading import Lock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from engine import BotScheduler  # noqa: E402
+from fakes import patch_main, reset_main_state  # noqa: E402
+
+
+class SimulatedHost:
+    def __init__(self, capacity, join_latency, join_timeout):
+        self.capacity = capacity
+        self.join_latency = join_latency
+        self.join_timeout = join_timeout
+        self.in_flight = 0
+        self.join_times = []  # monotonic time of each successful join
+        self.lock = Lock()
+
+    def join_session(self, driver, bot_name, batch=None):
+        with self.lock:
+            self.in_flight += 1
+            overload = max(1.0, self.in_flight / self.capacity)
+        try:
+            latency = self.join_latency * overload ** 2
+            if latency > self.join_timeout:
+                time.sleep(self.join_timeout)
+                return False
+            time.sleep(latency)
+            with self.lock:
+                self.join_times.append(time.monotonic())
+            return True
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def run(mode, args):
+    reset_main_state(args.bots, batch_size=args.batch_size)
+    host = SimulatedHost(args.capacity, args.join_latency, args.join_timeout)
+    main.join_session = host.join_session
+    main.ramp_mode = mode
+    main.ramp_config = {
+        "initial_concurrency": args.initial, "max_concurrency": args.max_concurrency,
+        "target_join_rate": args.target_join_rate, "max_join_seconds": args.join_timeout,
+        "update_interval": args.update_interval, "window_seconds": args.window,
+    }
+    main.max_workers = max(args.batch_size, args.max_concurrency)
+    scheduler = BotScheduler(max_workers=main.max_workers, log=main.log_with_timestamp)
+    started = time.monotonic()
+    main.ramp_up(list(enumerate(["about:blank"] * args.bots, start=1)), scheduler)
+    ramp_seconds = time.monotonic() - started
+    main.shutdown_bots(scheduler)
+
+    target = args.target or args.bots
+    join_times = sorted(host.join_times)
+    result = {
+        "mode": mode,
+        "bots": args.bots,
+        "joined": len(join_times),
+        "failed": args.bots - len(join_times),
+        "target": target,
+        "seconds_to_target": round(join_times[target - 1] - started, 2) if len(join_times) >= target else None,
+        "ramp_seconds": round(ramp_seconds, 2),
+    }
+    if main.ramp_controller is not None:
+        result.update(main.ramp_controller.summary())
+    return result
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bots", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=25)
+    parser.add_argument("--capacity", type=int, default=10, help="joins the simulated host serves at full speed")
+    parser.add_argument("--join-latency", type=float, default=1.0, help="seconds per join on an idle host")
+    parser.add_argument("--join-timeout", type=float, default=5.0)
+    parser.add_argument("--target", type=int, default=0, help="joined bots to time; defaults to --bots")
+    parser.add_argument("--initial", type=int, default=5, help="adaptive: starting concurrency")
+    parser.add_argument("--max-concurrency", type=int, default=50)
+    parser.add_argument("--target-join-rate", type=float, default=100.0,
+                        help="adaptive: joins per second to aim for; high values probe for the host's limit")
+    parser.add_argument("--update-interval", type=float, default=1.0)
+    parser.add_argument("--window", type=float, default=5.0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    patch_main(args.join_latency)
+    results = []
+    print(f"{'mode':<10}{'joined':>8}{'failed':>8}{'to target s':>13}{'ramp s':>9}{'peak':>6}")
+    for mode in ("batch", "adaptive"):
+        result = run(mode, args)
+        results.append(result)
+        to_target = result['seconds_to_target'] if result['seconds_to_target'] is not None else "never"
+        print(f"{mode:<10}{result['joined']:>8}{result['failed']:>8}{to_target:>13}{result['ramp_seconds']:>9}"
+              f"{result.get('peak_concurrency', args.batch_size):>6}")
+
+    if args.json:
+        with open(args.json, 'w') as output_file:
+            json.dump(results, output_file, indent=4)
+
+
+if __name__ == "__main__":
+    main_benchmark()
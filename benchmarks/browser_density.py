@@ -0,0 +1,91 @@
+"""RSS/PSS per bot and startup time per bot: one Chrome per bot vs. browser contexts in a shared Chrome.
+
+Needs chromedriver and Chrome. Run from the repository root:
+
+    python benchmarks/browser_density.py --bots 20 --bots-per-browser 20 --url https://example.com
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+import procstats  # noqa: E402
+from browser_contexts import SharedBrowserPool  # noqa: E402
+
+
+def start_bots(num_bots, new_driver, url):
+    drivers = []
+    startup_seconds = []
+    for _ in range(num_bots):
+        started = time.monotonic()
+        driver = new_driver()
+        driver.get(url)
+        startup_seconds.append(time.monotonic() - started)
+        drivers.append(driver)
+    return drivers, startup_seconds
+
+
+def measure(mode, num_bots, bots_per_browser, url, settle):
+    pool = None
+    if mode == "contexts":
+        pool = SharedBrowserPool(bots_per_browser, main.new_chrome_driver)
+        new_driver, quit_driver = pool.new_bot_driver, pool.release
+    else:
+        new_driver, quit_driver = main.new_chrome_driver, lambda driver: driver.quit()
+
+    ramp_started = time.monotonic()
+    drivers, startup_seconds = start_bots(num_bots, new_driver, url)
+    ramp_seconds = time.monotonic() - ramp_started
+    time.sleep(settle)
+    rss_kb, pss_kb = procstats.tree_memory_kb(os.getpid(), include_root=False)
+
+    for driver in drivers:
+        quit_driver(driver)
+    if pool is not None:
+        pool.close()
+
+    return {
+        "mode": mode,
+        "bots": num_bots,
+        "bots_per_browser": bots_per_browser if mode == "contexts" else 1,
+        "ramp_seconds": round(ramp_seconds, 2),
+        "startup_seconds_mean": round(statistics.mean(startup_seconds), 3),
+        "startup_seconds_p50": round(statistics.median(startup_seconds), 3),
+        "startup_seconds_max": round(max(startup_seconds), 3),
+        "rss_mb_total": round(rss_kb / 1024, 1),
+        "pss_mb_total": round(pss_kb / 1024, 1),
+        "rss_mb_per_bot": round(rss_kb / 1024 / num_bots, 1),
+        "pss_mb_per_bot": round(pss_kb / 1024 / num_bots, 1),
+    }
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bots", type=int, default=10)
+    parser.add_argument("--bots-per-browser", type=int, default=10)
+    parser.add_argument("--url", default="about:blank")
+    parser.add_argument("--settle", type=float, default=5.0, help="seconds to wait before sampling memory")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = [measure(mode, args.bots, args.bots_per_browser, args.url, args.settle)
+               for mode in ("per-bot", "contexts")]
+
+    print(f"{'mode':<10}{'bots':>6}{'startup p50 s':>15}{'startup max s':>15}{'RSS MB/bot':>12}{'PSS MB/bot':>12}")
+    for result in results:
+        print(f"{result['mode']:<10}{result['bots']:>6}{result['startup_seconds_p50']:>15}"
+              f"{result['startup_seconds_max']:>15}{result['rss_mb_per_bot']:>12}{result['pss_mb_per_bot']:>12}")
+
+    if args.json:
+        with open(args.json, 'w') as output_file:
+            json.dump(results, output_file, indent=4)
+
+
+if __name__ == "__main__":
+    main_benchmark()
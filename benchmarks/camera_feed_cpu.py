@@ -0,0 +1,168 @@
+"""Camera-on CPU per bot for each camera feed variant, against Chrome's synthetic test pattern.
+
+Needs chromedriver and Chrome. Each bot opens a local page that captures the fake
+camera and sends it through a loopback RTCPeerConnection, so Chrome decodes the
+feed and encodes it as it would for the SFU. CPU is the Chrome process tree's
+user+system time over --hold seconds. Run from the repository root:
+
+    python benchmarks/camera_feed_cpu.py --bots 5 --hold 30
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+import procstats  # noqa: E402
+from camera_feed import CameraFeeds  # noqa: E402
+
+PAGE = """<!DOCTYPE html>
+<html><body>
+<video id="local" autoplay muted playsinline></video>
+<script>
+window.__camera = {ready: false, error: null};
+(async () => {
+    try {
+        const stream = await navigator.mediaDevices.getUserMedia({video: true, audio: false});
+        document.getElementById('local').srcObject = stream;
+        const sender = new RTCPeerConnection(), receiver = new RTCPeerConnection();
+        sender.onicecandidate = (e) => e.candidate && receiver.addIceCandidate(e.candidate);
+        receiver.onicecandidate = (e) => e.candidate && sender.addIceCandidate(e.candidate);
+        stream.getTracks().forEach((track) => sender.addTrack(track, stream));
+        await sender.setLocalDescription(await sender.createOffer());
+        await receiver.setRemoteDescription(sender.localDescription);
+        await receiver.setLocalDescription(await receiver.createAnswer());
+        await sender.setRemoteDescription(receiver.localDescription);
+        window.__sender = sender;
+        window.__camera.ready = true;
+    } catch (e) {
+        window.__camera.error = String(e);
+    }
+})();
+</script>
+</body></html>
+"""
+
+STATS_JS = """
+const done = arguments[arguments.length - 1];
+if (!window.__sender) { done(null); return; }
+window.__sender.getStats().then((stats) => {
+    let result = null;
+    stats.forEach((report) => {
+        if (report.type === 'outbound-rtp' && report.kind === 'video') {
+            result = {framesEncoded: report.framesEncoded, bytesSent: report.bytesSent,
+                      width: report.frameWidth, height: report.frameHeight};
+        }
+    });
+    done(result);
+});
+"""
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = PAGE.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def encoder_stats(drivers):
+    return [driver.execute_async_script(STATS_JS) or {} for driver in drivers]
+
+
+def measure(label, feeds, num_bots, url, args):
+    main.camera_feeds = feeds
+    harness_pid = os.getpid()
+    drivers = []
+    try:
+        for bot_id in range(1, num_bots + 1):
+            driver = main.new_chrome_driver(feeds.feed_for(bot_id))
+            drivers.append(driver)
+            driver.get(url)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            states = [driver.execute_script("return window.__camera") for driver in drivers]
+            if all(state['ready'] or state['error'] for state in states):
+                break
+            time.sleep(0.5)
+        errors = [state['error'] for state in states if state['error']]
+        time.sleep(args.settle)
+
+        stats_before = encoder_stats(drivers)
+        cpu_before = procstats.tree_cpu_seconds(harness_pid, include_root=False)
+        time.sleep(args.hold)
+        cpu_seconds = procstats.tree_cpu_seconds(harness_pid, include_root=False) - cpu_before
+        stats_after = encoder_stats(drivers)
+        rss_kb, pss_kb = procstats.tree_memory_kb(harness_pid, include_root=False)
+    finally:
+        for driver in drivers:
+            driver.quit()
+
+    frames = sum(after.get('framesEncoded', 0) - before.get('framesEncoded', 0)
+                 for before, after in zip(stats_before, stats_after))
+    sent = sum(after.get('bytesSent', 0) - before.get('bytesSent', 0)
+               for before, after in zip(stats_before, stats_after))
+    return {
+        "feed": label,
+        "bots": num_bots,
+        "errors": errors,
+        "cpu_percent_per_bot": round(100 * cpu_seconds / args.hold / num_bots, 1),
+        "encoded_fps_per_bot": round(frames / args.hold / num_bots, 1),
+        "kbps_per_bot": round(sent * 8 / 1000 / args.hold / num_bots, 1),
+        "pss_mb_per_bot": round(pss_kb / 1024 / num_bots, 1),
+        "rss_mb_per_bot": round(rss_kb / 1024 / num_bots, 1),
+        "feed_files_mb": round(feeds.total_bytes() / (1024 * 1024), 1) if feeds.paths else 0,
+    }
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bots", type=int, default=5)
+    parser.add_argument("--settle", type=float, default=5.0, help="seconds before CPU is sampled")
+    parser.add_argument("--hold", type=float, default=30.0, help="seconds over which CPU is measured")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    config_feeds = main.camera_feeds
+    runs = [("synthetic", CameraFeeds(config_feeds.source, config_feeds.directory, [], log=main.log_with_timestamp))]
+    for variant in config_feeds.variants:
+        feeds = CameraFeeds(config_feeds.source, config_feeds.directory, [variant],
+                            feeds_per_variant=config_feeds.feeds_per_variant, noise=config_feeds.noise,
+                            log=main.log_with_timestamp)
+        feeds.prepare(range(1, args.bots + 1))
+        runs.append((f"{variant['width']}x{variant['height']}@{variant['fps']}", feeds))
+
+    results = [measure(label, feeds, args.bots, url, args) for label, feeds in runs]
+    server.shutdown()
+
+    print(f"{'feed':<16}{'bots':>6}{'CPU %/bot':>11}{'enc fps':>9}{'kbps':>8}{'PSS MB/bot':>12}{'files MB':>10}")
+    for result in results:
+        print(f"{result['feed']:<16}{result['bots']:>6}{result['cpu_percent_per_bot']:>11}"
+              f"{result['encoded_fps_per_bot']:>9}{result['kbps_per_bot']:>8}{result['pss_mb_per_bot']:>12}"
+              f"{result['feed_files_mb']:>10}")
+        for error in sorted(set(result['errors'])):
+            print(f"  camera error: {error}")
+
+    if args.json:
+        with open(args.json, 'w') as output_file:
+            json.dump(results, output_file, indent=4)
+
+
+if __name__ == "__main__":
+    main_benchmark()
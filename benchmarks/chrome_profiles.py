@@ -0,0 +1,104 @@
+"""RSS/PSS and CPU per joined bot for each Chrome profile: default, lean, and lean with the shared cache.
+
+Needs chromedriver and Chrome. Bots load --url; with --join they also run the
+harness's join and confirm steps, and only bots that joined are counted. The
+lean+cache profile runs when --shared-cache-dir points at a seeded cache
+(python chrome_profile.py --seed-cache URL --cache-dir DIR). Run from the
+repository root:
+
+    python benchmarks/chrome_profiles.py --bots 10 --url "<session link>" --join --shared-cache-dir cache/seed
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+import procstats  # noqa: E402
+from chrome_profile import LeanProfile  # noqa: E402
+
+
+def measure(profile, args):
+    main.chrome_profile_mode = 'default' if profile == 'default' else 'lean'
+    main.lean_profile = LeanProfile(
+        renderer_process_limit=args.renderer_process_limit,
+        js_heap_mb=args.js_heap_mb,
+        shared_cache_dir=args.shared_cache_dir if profile == 'lean+cache' else '',
+    )
+    harness_pid = os.getpid()
+    cpu_before = procstats.tree_cpu_seconds(harness_pid, include_root=False)
+
+    drivers = []
+    joined = 0
+    started = time.monotonic()
+    for index in range(args.bots):
+        driver = main.acquire_driver()
+        drivers.append(driver)
+        driver.get(args.url)
+        bot_name = f"Bot_{index + 1}"
+        if not args.join or (main.join_session(driver, bot_name) and main.confirm_session_join(driver, bot_name)):
+            joined += 1
+    ramp_seconds = time.monotonic() - started
+    time.sleep(args.settle)
+
+    rss_kb, pss_kb = procstats.tree_memory_kb(harness_pid, include_root=False)
+    cpu_ramp = procstats.tree_cpu_seconds(harness_pid, include_root=False) - cpu_before
+    time.sleep(args.hold)
+    cpu_hold = procstats.tree_cpu_seconds(harness_pid, include_root=False) - cpu_before - cpu_ramp
+
+    for driver in drivers:
+        main.quit_driver(driver)
+    main.lean_profile.cleanup()
+
+    per_bot = max(joined, 1)
+    return {
+        "profile": profile,
+        "bots": args.bots,
+        "joined": joined,
+        "ramp_seconds": round(ramp_seconds, 2),
+        "rss_mb_per_bot": round(rss_kb / 1024 / per_bot, 1),
+        "pss_mb_per_bot": round(pss_kb / 1024 / per_bot, 1),
+        # CPU seconds to start, load and join one bot (including the settle period)
+        "cpu_seconds_per_bot_startup": round(cpu_ramp / per_bot, 2),
+        # Share of one core a joined bot uses while it sits in the session
+        "cpu_percent_per_bot_idle": round(100 * cpu_hold / args.hold / per_bot, 2),
+    }
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bots", type=int, default=10)
+    parser.add_argument("--url", default="about:blank")
+    parser.add_argument("--join", action="store_true", help="run join_session and confirm_session_join")
+    parser.add_argument("--shared-cache-dir", default=main.lean_profile.shared_cache_dir)
+    parser.add_argument("--renderer-process-limit", type=int, default=main.lean_profile.renderer_process_limit)
+    parser.add_argument("--js-heap-mb", type=int, default=main.lean_profile.js_heap_mb)
+    parser.add_argument("--settle", type=float, default=10.0, help="seconds to wait before sampling memory")
+    parser.add_argument("--hold", type=float, default=30.0, help="seconds over which idle CPU is measured")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    main.screenshot_pipeline.mode = 'off'
+    profiles = ["default", "lean"]
+    if args.shared_cache_dir and os.path.isdir(args.shared_cache_dir):
+        profiles.append("lean+cache")
+
+    results = [measure(profile, args) for profile in profiles]
+
+    print(f"{'profile':<12}{'joined':>8}{'RSS MB/bot':>12}{'PSS MB/bot':>12}{'CPU s/bot':>11}{'idle CPU %':>12}")
+    for result in results:
+        print(f"{result['profile']:<12}{result['joined']:>8}{result['rss_mb_per_bot']:>12}"
+              f"{result['pss_mb_per_bot']:>12}{result['cpu_seconds_per_bot_startup']:>11}"
+              f"{result['cpu_percent_per_bot_idle']:>12}")
+
+    if args.json:
+        with open(args.json, 'w') as output_file:
+            json.dump(results, output_file, indent=4)
+
+
+if __name__ == "__main__":
+    main_benchmark()
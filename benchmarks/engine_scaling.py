@@ -0,0 +1,137 @@
+"""Harness CPU and thread count against bot count: thread-per-bot vs. BotScheduler.
+
+Browsers are replaced with a no-op driver and a fixed join latency, so the numbers
+are the harness's own overhead. Run from the repository root:
+
+    python benchmarks/engine_scaling.py --bots 100 500 1000 2000 --hold 10
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from engine import BotScheduler  # noqa: E402
+from fakes import patch_main, reset_main_state  # noqa: E402
+
+
+class ThreadSampler:
+    """Tracks the peak thread count while a run is in progress."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, threading.active_count() - 1)  # exclude the sampler itself
+            self._stop.wait(self.interval)
+
+
+def run_thread_per_bot(num_bots, join_latency, hold):
+    """The pre-scheduler model: one thread per bot polling stop_event every second."""
+    stop = threading.Event()
+    joined = threading.Semaphore(0)
+
+    def bot():
+        time.sleep(5 + join_latency)  # the old fixed sleep after driver.get, then the join itself
+        joined.release()
+        while not stop.is_set():
+            time.sleep(1)
+
+    with ThreadSampler() as sampler:
+        ramp_start = time.monotonic()
+        cpu_start = time.process_time()
+        threads = [threading.Thread(target=bot) for _ in range(num_bots)]
+        for thread in threads:
+            thread.start()
+        for _ in range(num_bots):
+            joined.acquire()
+        ramp_cpu = time.process_time() - cpu_start
+        ramp_time = time.monotonic() - ramp_start
+
+        hold_cpu_start = time.process_time()
+        time.sleep(hold)
+        hold_cpu = time.process_time() - hold_cpu_start
+        steady_threads = threading.active_count() - 1
+
+        stop.set()
+        for thread in threads:
+            thread.join()
+    return ramp_time, ramp_cpu, hold_cpu, steady_threads, sampler.peak
+
+
+def run_scheduler(num_bots, join_latency, hold, workers):
+    reset_main_state(num_bots)
+    links = [(bot_id, f"http://localhost/session/{bot_id}") for bot_id in range(1, num_bots + 1)]
+    scheduler = BotScheduler(max_workers=workers, log=main.log_with_timestamp)
+
+    with ThreadSampler() as sampler:
+        ramp_start = time.monotonic()
+        cpu_start = time.process_time()
+        main.launch_bots(links, scheduler)
+        ramp_cpu = time.process_time() - cpu_start
+        ramp_time = time.monotonic() - ramp_start
+
+        hold_cpu_start = time.process_time()
+        time.sleep(hold)
+        hold_cpu = time.process_time() - hold_cpu_start
+        steady_threads = threading.active_count() - 1
+
+        main.shutdown_bots(scheduler)
+    return ramp_time, ramp_cpu, hold_cpu, steady_threads, sampler.peak
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bots", type=int, nargs="+", default=[100, 500, 1000, 2000])
+    parser.add_argument("--hold", type=float, default=10.0, help="seconds to hold joined bots idle")
+    parser.add_argument("--join-latency", type=float, default=0.2, help="simulated seconds per join")
+    parser.add_argument("--workers", type=int, default=main.max_workers)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    patch_main(args.join_latency)
+
+    results = []
+    print(f"{'engine':<10}{'bots':>7}{'ramp s':>9}{'ramp cpu s':>12}{'idle cpu %':>12}{'threads':>9}{'peak':>7}")
+    for num_bots in args.bots:
+        for engine, runner in (("threads", lambda: run_thread_per_bot(num_bots, args.join_latency, args.hold)),
+                               ("scheduler", lambda: run_scheduler(num_bots, args.join_latency, args.hold,
+                                                                   args.workers))):
+            ramp_time, ramp_cpu, hold_cpu, steady_threads, peak_threads = runner()
+            idle_cpu_percent = 100.0 * hold_cpu / args.hold
+            results.append({
+                "engine": engine,
+                "bots": num_bots,
+                "ramp_seconds": round(ramp_time, 3),
+                "ramp_cpu_seconds": round(ramp_cpu, 3),
+                "idle_cpu_percent": round(idle_cpu_percent, 2),
+                "steady_threads": steady_threads,
+                "peak_threads": peak_threads,
+            })
+            print(f"{engine:<10}{num_bots:>7}{ramp_time:>9.2f}{ramp_cpu:>12.3f}{idle_cpu_percent:>12.2f}"
+                  f"{steady_threads:>9}{peak_threads:>7}")
+
+    if args.json:
+        with open(args.json, 'w') as output_file:
+            json.dump(results, output_file, indent=4)
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,71 @@
+"""Browser stand-ins for benchmarks that measure the harness rather than Chrome."""
+import time
+
+import main
+
+
+class FakeDriver:
+    def __init__(self, startup_seconds=0.0):
+        if startup_seconds:
+            time.sleep(startup_seconds)
+
+    def get(self, url):
+        pass
+
+    def execute_script(self, script, *args):
+        return None
+
+    def set_script_timeout(self, seconds):
+        pass
+
+    def save_screenshot(self, path):
+        return True
+
+    def quit(self):
+        pass
+
+
+def reset_main_state(num_bots, batch_size=None, group_size=None):
+    main.num_bots = num_bots
+    main.batch_size = batch_size or num_bots
+    main.group_size = group_size or num_bots
+    main.open_camera = False
+    main.vote = False
+    main.whiteboard = False
+    main.bots_completed = 0
+    main.current_group = -1
+    main.driver_pool = None
+    main.protocol_engine = None
+    main.protocol_bot_ids.clear()
+    main.ramp_controller = None
+    main.timeline = None
+    main.health_interval = 0
+    main.health_sampler = None
+    main.watchdog_interval = 0
+    main.driver_watchdog = None
+    main.results_path = ''
+    main.results_store = None
+    main.bot_results.clear()
+    main.bot_map.clear()
+    main.bot_tasks.clear()
+    main.joined_bot_ids.clear()
+    main.vote_fire_times.clear()
+    main.vote_deadlines.clear()
+    main.stroke_stats = main.StrokeStats(main.stroke_batch_interval)
+    main.parked_bots.clear()
+    main.ramp_timings.clear()
+    main.run_metrics = main.PhaseMetrics()
+    main.screenshot_pipeline.mode = 'off'
+    main.stop_event.clear()
+
+
+def patch_main(join_latency, driver_startup=0.0):
+    """Replace browser work in main with sleeps of the given lengths."""
+    def join_session(driver, bot_name, batch=None):
+        time.sleep(join_latency)
+        return True
+
+    main.log_with_timestamp = lambda message, **fields: None
+    main.new_chrome_driver = lambda camera_feed_path=None: FakeDriver(driver_startup)
+    main.join_session = join_session
+    main.confirm_session_join = lambda driver, bot_name, batch=None: True
@@ -0,0 +1,210 @@
+"""Harness overhead end to end: main.py against the local mock Perculus server at 10, 100 and 500 bots.
+
+For each bot count, mock_perculus runs in this process and main.py runs as a
+child process in a scratch directory. The scratch directory holds a config.json
+copied from the repository's, with the bot count, session and scenario set and
+--set applied. Its session_links.txt points every bot at the mock. A scenario
+file opens --camera-share of the cameras at T0, has every bot vote at --vote-at
+and has --draw-share of the bots draw from --draw-at for --draw-for seconds.
+Protocol bots (--protocol-share) follow the same scenario, except for the
+camera, and run their flow's draw steps once instead of drawing for a while.
+
+While main.py runs, it and every process it starts (chromedriver, Chrome) are
+sampled every --sample-interval seconds. Reported per bot count:
+
+    joined/s       bots joined per second, from the start of the ramp-up to the last join
+    harness CPU    CPU seconds of the main.py process alone, per bot
+    harness RSS    peak RSS of the main.py process, per bot
+    tree CPU, PSS  CPU seconds and peak PSS of main.py and its browsers, per bot
+    phases         p50 / p90 of every phase in run_report.json
+
+Needs chromedriver and Chrome unless --protocol-share is 1. --fault passes fault
+injection to the mock (see mock_perculus.FAULTS). Run from the repository root:
+
+    python benchmarks/harness_overhead.py --bots 10 100 500
+    python benchmarks/harness_overhead.py --bots 100 --fault join_latency=1.0 --fault join_failure_rate=0.05
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import procstats  # noqa: E402
+from mock_perculus import MockPerculus, serve_in_thread  # noqa: E402
+
+QUIZ_OPTIONS = ["A", "B", "C", "D"]
+
+
+def parse_assignments(assignments, parse_value):
+    parsed = {}
+    for assignment in assignments:
+        key, _, value = assignment.partition('=')
+        parsed[key] = parse_value(value)
+    return parsed
+
+
+def write_run_files(directory, bots, port, args):
+    with open('config.json', 'r') as config_file:
+        config = json.load(config_file)
+    camera_feed = config.get('camera_feed', {})
+    config.update(
+        num_bots=bots,
+        session_duration=args.session,
+        open_camera=args.camera_share > 0,
+        vote=True,
+        vote_time=datetime.fromtimestamp(time.time() + args.vote_at).strftime("%Y-%m-%d %H:%M:%S"),
+        whiteboard=args.draw_share > 0,
+        scenario_file='scenario.json',
+        metrics=dict(config.get('metrics', {}), report_path='run_report.json', prometheus_port=0),
+        logging=dict(config.get('logging', {}), path='run_log.jsonl', console='summary'),
+        screenshots=dict(config.get('screenshots', {}), mode='failures'),
+        camera_feed=dict(camera_feed, source=os.path.abspath(camera_feed.get('source', 'test-video.Y4M'))),
+        protocol_bots=dict(config.get('protocol_bots', {}), share=args.protocol_share,
+                           flow=os.path.abspath(config.get('protocol_bots', {}).get('flow', 'protocol_flow.json'))),
+    )
+    config.update(args.set)
+    with open(os.path.join(directory, 'config.json'), 'w') as config_file:
+        json.dump(config, config_file, indent=4)
+
+    cohorts = [{"name": "voters", "actions": [{"action": "vote", "at": args.vote_at}]}]
+    if args.camera_share > 0:
+        cohorts.insert(0, {"name": "cameras", "share": args.camera_share,
+                           "actions": [{"action": "open_camera", "at": 0}]})
+    if args.draw_share > 0:
+        cohorts.append({"name": "drawers", "share": args.draw_share,
+                        "actions": [{"action": "draw", "at": args.draw_at, "duration": args.draw_for}]})
+    with open(os.path.join(directory, 'scenario.json'), 'w') as scenario_file:
+        json.dump({"group_interval": 1.0, "cohorts": cohorts}, scenario_file, indent=4)
+
+    with open(os.path.join(directory, 'session_links.txt'), 'w') as links_file:
+        for bot_id in range(1, bots + 1):
+            links_file.write(f"http://127.0.0.1:{port}/app/?c=BENCHMARK&name=kullanici&surname={bot_id}\n")
+
+
+def run(bots, args):
+    server = MockPerculus(quiz_options=QUIZ_OPTIONS, faults=args.fault, seed=bots)
+    port, stop_server = serve_in_thread(server)
+    directory = tempfile.mkdtemp(prefix=f"harness-{bots}-")
+    write_run_files(directory, bots, port, args)
+
+    console = open(os.path.join(directory, 'console.log'), 'w')
+    started = time.monotonic()
+    process = subprocess.Popen([sys.executable, os.path.abspath('main.py')], cwd=directory,
+                               stdout=console, stderr=subprocess.STDOUT)
+    harness_cpu = 0.0
+    peak_harness_rss_kb = 0
+    peak_tree_pss_kb = 0
+    peak_processes = 0
+    interrupted = False
+    while True:
+        pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            break
+        # The last reading before exit; main.py's CPU after it is not counted
+        harness_cpu = procstats.cpu_seconds(process.pid) or harness_cpu
+        peak_harness_rss_kb = max(peak_harness_rss_kb, procstats.memory_kb(process.pid)[0])
+        tree = procstats.process_tree(process.pid)
+        peak_processes = max(peak_processes, len(tree))
+        peak_tree_pss_kb = max(peak_tree_pss_kb, sum(procstats.memory_kb(member)[1] for member in tree))
+        if not interrupted and time.monotonic() - started > args.timeout:
+            # Like Ctrl-C: main.py still shuts the bots down and writes its report
+            process.send_signal(signal.SIGINT)
+            interrupted = True
+        time.sleep(args.sample_interval)
+    wall_seconds = time.monotonic() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    console.close()
+    stop_server()
+
+    report_path = os.path.join(directory, 'run_report.json')
+    if not os.path.exists(report_path):
+        raise RuntimeError(f"main.py exited with {process.returncode} and no run report; see {directory}/console.log")
+    with open(report_path, 'r') as report_file:
+        report = json.load(report_file)
+    summary = report['summary']
+    join_seconds = summary.get('time_to_last_join_seconds')
+    tree_cpu = usage.ru_utime + usage.ru_stime  # main.py and every descendant it reaped
+    return {
+        "bots": bots,
+        "protocol_bots": summary['protocol_bots'],
+        "joined": summary['joined'],
+        "ramp_seconds": summary.get('ramp_seconds'),
+        "time_to_first_join_seconds": summary.get('time_to_first_join_seconds'),
+        "time_to_last_join_seconds": join_seconds,
+        "joined_per_second": round(summary['joined'] / join_seconds, 2) if join_seconds else None,
+        "wall_seconds": round(wall_seconds, 1),
+        "timed_out": interrupted,
+        "exit_code": process.returncode,
+        "harness_cpu_seconds": round(harness_cpu, 2),
+        "harness_cpu_seconds_per_bot": round(harness_cpu / bots, 3),
+        "harness_peak_rss_mb": round(peak_harness_rss_kb / 1024, 1),
+        "harness_rss_mb_per_bot": round(peak_harness_rss_kb / 1024 / bots, 2),
+        "tree_cpu_seconds_per_bot": round(tree_cpu / bots, 3),
+        "tree_pss_mb_per_bot": round(peak_tree_pss_kb / 1024 / bots, 1),
+        "peak_processes": peak_processes,
+        "phases": {phase: {"p50_ms": values.get('p50_ms'), "p90_ms": values.get('p90_ms'),
+                           "ok": values['ok'], "failed": values['failed']}
+                   for phase, values in report['phases'].items()},
+        "server": dict(server.counters),
+        "directory": directory,
+    }
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bots", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--session", type=float, default=60.0, help="session_duration: seconds from T0 to the end")
+    parser.add_argument("--vote-at", type=float, default=20.0, help="seconds after T0 every bot votes")
+    parser.add_argument("--camera-share", type=float, default=0.1, help="share of bots opening the camera at T0")
+    parser.add_argument("--draw-share", type=float, default=0.2, help="share of bots drawing")
+    parser.add_argument("--draw-at", type=float, default=30.0)
+    parser.add_argument("--draw-for", type=float, default=20.0)
+    parser.add_argument("--protocol-share", type=float, default=0.0, help="share of protocol bots (1: no Chrome)")
+    parser.add_argument("--fault", action="append", default=[], metavar="NAME=VALUE",
+                        help="fault injection for the mock server, e.g. join_latency=0.5")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=JSON",
+                        help="override a top-level config.json key, e.g. ramp='{\"mode\": \"adaptive\"}'")
+    parser.add_argument("--sample-interval", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=1800.0, help="seconds before main.py is interrupted")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    args.fault = parse_assignments(args.fault, float)
+    args.set = parse_assignments(args.set, json.loads)
+
+    results = []
+    for bots in args.bots:
+        results.append(run(bots, args))
+        print(f"{bots} bots done, files in {results[-1]['directory']}", flush=True)
+
+    print(f"{'bots':>6}{'joined':>8}{'last join s':>13}{'joined/s':>10}{'cpu s/bot':>11}{'rss MB/bot':>12}"
+          f"{'tree cpu s/bot':>16}{'tree PSS MB/bot':>17}")
+    for result in results:
+        print(f"{result['bots']:>6}{result['joined']:>8}{result['time_to_last_join_seconds']!s:>13}"
+              f"{result['joined_per_second']!s:>10}{result['harness_cpu_seconds_per_bot']:>11}"
+              f"{result['harness_rss_mb_per_bot']:>12}{result['tree_cpu_seconds_per_bot']:>16}"
+              f"{result['tree_pss_mb_per_bot']:>17}")
+
+    phases = sorted({phase for result in results for phase in result['phases']})
+    print(f"\n{'phase p50 / p90 ms':<24}" + "".join(f"{str(result['bots']) + ' bots':>22}" for result in results))
+    for phase in phases:
+        cells = []
+        for result in results:
+            values = result['phases'].get(phase)
+            cells.append(f"{values['p50_ms']} / {values['p90_ms']}" if values else "-")
+        print(f"{phase:<24}" + "".join(f"{cell:>22}" for cell in cells))
+
+    if args.json:
+        with open(args.json, 'w') as output_file:
+            json.dump(results, output_file, indent=4)
+
+
+if __name__ == "__main__":
+    main_benchmark()
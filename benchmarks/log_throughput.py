@@ -0,0 +1,113 @@
+"""Log calls per second under contention: print per call, as log_with_timestamp did, against the LogPipeline.
+
+Threads call the logger as fast as they can with bot-style messages. The old
+logger prints to --output (a file by default; pass --output - for the
+terminal). The pipeline writes JSONL to a temporary file, with the console off,
+full or summarised. Reported: log calls per second seen by the callers, the
+callers' p99 per-call latency, and how long the writer needed afterwards to
+drain the queue. Run from the repository root:
+
+    python benchmarks/log_throughput.py --threads 1 16 256 --calls 2000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import LatencyHistogram  # noqa: E402
+from structured_log import LogPipeline  # noqa: E402
+
+
+def print_logger(stream):
+    def log(message, **fields):
+        print(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {message}", file=stream)
+    return log
+
+
+def hammer(log, num_threads, calls):
+    latencies = LatencyHistogram()
+    barrier = threading.Barrier(num_threads + 1)
+
+    def caller(thread_index):
+        barrier.wait()
+        for call in range(calls):
+            bot_id = thread_index * calls + call
+            if call % 16:
+                log(f"Bot_{bot_id}: Waiting for the vote time.")
+            else:
+                # Time every 16th call; timing each one would dominate the cost being measured
+                started = time.perf_counter()
+                log(f"Bot_{bot_id}: Waiting for the vote time.")
+                latencies.record(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=caller, args=(index,)) for index in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies.summary()
+
+
+def measure(label, num_threads, args):
+    with tempfile.TemporaryDirectory() as directory:
+        pipeline = None
+        if label == 'print':
+            stream = sys.stdout if args.output == '-' else open(args.output or os.path.join(directory, 'out'), 'w')
+            log = print_logger(stream)
+        else:
+            console = label.split(':')[1]
+            stream = sys.stdout if args.output == '-' else open(os.path.join(directory, 'console'), 'w')
+            pipeline = LogPipeline(path=os.path.join(directory, 'run_log.jsonl'), console=console,
+                                   summary_interval=1.0, stream=stream)
+            log = pipeline.log
+        seconds, latency = hammer(log, num_threads, args.calls)
+        drain_started = time.perf_counter()
+        if pipeline is not None:
+            pipeline.close()
+        drain_seconds = time.perf_counter() - drain_started
+        if stream is not sys.stdout:
+            stream.close()
+    calls = num_threads * args.calls
+    return {
+        "logger": label,
+        "threads": num_threads,
+        "calls": calls,
+        "calls_per_second": round(calls / seconds),
+        "call_p99_us": round(latency['p99_ms'] * 1000, 1),
+        "call_max_us": round(latency['max_ms'] * 1000, 1),
+        "drain_seconds": round(drain_seconds, 3),
+    }
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 16, 256])
+    parser.add_argument("--calls", type=int, default=2000, help="log calls per thread")
+    parser.add_argument("--loggers", nargs="+", default=["print", "pipeline:off", "pipeline:summary", "pipeline:full"])
+    parser.add_argument("--output", help="where print and the pipeline's console write; - for stdout")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = [measure(label, num_threads, args) for num_threads in args.threads for label in args.loggers]
+
+    print(f"{'logger':<18}{'threads':>8}{'calls/s':>11}{'p99 us':>9}{'max us':>10}{'drain s':>9}")
+    for result in results:
+        print(f"{result['logger']:<18}{result['threads']:>8}{result['calls_per_second']:>11}"
+              f"{result['call_p99_us']:>9}{result['call_max_us']:>10}{result['drain_seconds']:>9}")
+
+    if args.json:
+        with open(args.json, 'w') as output_file:
+            json.dump(results, output_file, indent=4)
+
+
+if __name__ == "__main__":
+    main_benchmark()
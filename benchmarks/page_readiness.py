@@ -0,0 +1,156 @@
+"""End-to-end join time and ramp time: the old fixed sleeps vs. page-signalled readiness.
+
+Needs chromedriver and Chrome. A local page shows the cookie pop-up, the join
+button and the session's camera button after configurable delays; every bot
+joins it once with the old sequence (sleep 5s after driver.get, WebDriverWait
+polling, 2s retry sleeps) and once with main.join_session/confirm_session_join.
+Run from the repository root:
+
+    python benchmarks/page_readiness.py --bots 10 --batch-size 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+import readiness  # noqa: E402
+from selenium.common.exceptions import TimeoutException  # noqa: E402
+from selenium.webdriver.common.by import By  # noqa: E402
+from selenium.webdriver.support import expected_conditions as EC  # noqa: E402
+from selenium.webdriver.support.ui import WebDriverWait  # noqa: E402
+
+PAGE = """<!DOCTYPE html>
+<html><body>
+<script>
+const params = new URLSearchParams(location.search);
+const delay = (name, fallback) => Number(params.get(name) || fallback);
+setTimeout(() => {
+    const banner = document.createElement('div');
+    banner.innerHTML = '<button id="c-p-bn">Accept</button>';
+    banner.querySelector('button').onclick = () => banner.remove();
+    document.body.appendChild(banner);
+}, delay('cookie_ms', 300));
+setTimeout(() => {
+    const join = document.createElement('div');
+    join.className = 'perculus-button';
+    join.textContent = 'Join';
+    join.onclick = () => setTimeout(() => {
+        const camera = document.createElement('button');
+        camera.dataset.action = 'open-cam';
+        camera.className = 'footer-button icon-background-image';
+        document.body.appendChild(camera);
+    }, delay('confirm_ms', 800));
+    document.body.appendChild(join);
+}, delay('join_ms', 600));
+</script>
+</body></html>
+"""
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = PAGE.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def legacy_join(driver, link):
+    """The join sequence as it was before page-signalled readiness."""
+    wait = WebDriverWait(driver, 60)
+    driver.get(link)
+    time.sleep(5)
+    try:
+        wait.until(EC.element_to_be_clickable((By.ID, "c-p-bn"))).click()
+    except TimeoutException:
+        pass
+    for attempt in range(5):
+        try:
+            wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'div.perculus-button'))).click()
+            break
+        except Exception:
+            time.sleep(2)
+    wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'button[data-action="open-cam"]')))
+
+
+def readiness_join(driver, link):
+    driver.get(link)
+    main.join_session(driver, "Bot")
+    main.confirm_session_join(driver, "Bot")
+
+
+def run_mode(join, drivers, link, batch_size):
+    latencies = []
+    ramp_started = time.monotonic()
+
+    def timed_join(driver):
+        started = time.monotonic()
+        join(driver, link)
+        return time.monotonic() - started
+
+    with ThreadPoolExecutor(max_workers=batch_size) as executor:
+        for i in range(0, len(drivers), batch_size):
+            latencies.extend(executor.map(timed_join, drivers[i:i + batch_size]))
+    ramp_seconds = time.monotonic() - ramp_started
+    latencies.sort()
+    return {
+        "join_seconds_p50": round(statistics.median(latencies), 3),
+        "join_seconds_max": round(latencies[-1], 3),
+        "ramp_seconds": round(ramp_seconds, 2),
+    }
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bots", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--cookie-ms", type=int, default=300)
+    parser.add_argument("--join-ms", type=int, default=600)
+    parser.add_argument("--confirm-ms", type=int, default=800)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    main.log_with_timestamp = lambda message, **fields: None
+    main.screenshot_pipeline.mode = 'off'
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    link = (f"http://127.0.0.1:{server.server_port}/?cookie_ms={args.cookie_ms}&join_ms={args.join_ms}"
+            f"&confirm_ms={args.confirm_ms}")
+
+    results = []
+    print(f"{'mode':<12}{'bots':>6}{'join p50 s':>12}{'join max s':>12}{'ramp s':>9}")
+    for mode, join in (("fixed-sleeps", legacy_join), ("readiness", readiness_join)):
+        drivers = [main.new_chrome_driver() for _ in range(args.bots)]
+        for driver in drivers:
+            readiness.prepare_driver(driver)
+        try:
+            result = dict(run_mode(join, drivers, link, args.batch_size), mode=mode, bots=args.bots)
+        finally:
+            for driver in drivers:
+                driver.quit()
+        results.append(result)
+        print(f"{mode:<12}{args.bots:>6}{result['join_seconds_p50']:>12}{result['join_seconds_max']:>12}"
+              f"{result['ramp_seconds']:>9}")
+    server.shutdown()
+
+    if args.json:
+        with open(args.json, 'w') as output_file:
+            json.dump(results, output_file, indent=4)
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,90 @@
+"""Per-bot join latency with screenshots off, synchronous PNGs (the old path) and the async pipeline.
+
+Needs chromedriver and Chrome. Every bot runs the join path's share of browser
+work, driver.get(url), with the two screenshots a successful join takes
+(debug_session and debug_before_action) plus --failure-shots failure screenshots.
+All bots run concurrently. Run from the repository root:
+
+    python benchmarks/screenshot_overhead.py --bots 10 --url https://example.com
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from screenshots import ScreenshotPipeline  # noqa: E402
+
+
+def directory_bytes(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def run_mode(mode, drivers, url, failure_shots):
+    directory = tempfile.mkdtemp(prefix=f"screenshots_{mode}_")
+    pipeline = ScreenshotPipeline(directory, mode='all', log=lambda message: None) if mode == "async" else None
+    labels = ["debug_session", "debug_before_action"] + [f"failure_{n}" for n in range(failure_shots)]
+
+    def join(bot_index, driver):
+        bot_name = f"Bot_{bot_index + 1}"
+        started = time.monotonic()
+        driver.get(url)
+        for label in labels:
+            if mode == "sync":
+                driver.save_screenshot(os.path.join(directory, f"{bot_name}_{label}.png"))
+            elif mode == "async":
+                pipeline.capture(driver, bot_name, label, failure=label.startswith("failure"))
+        return time.monotonic() - started
+
+    with ThreadPoolExecutor(max_workers=len(drivers)) as executor:
+        latencies = sorted(executor.map(join, range(len(drivers)), drivers))
+    if pipeline is not None:
+        pipeline.close()
+    disk_bytes = directory_bytes(directory)
+    shutil.rmtree(directory)
+
+    return {
+        "mode": mode,
+        "bots": len(drivers),
+        "join_seconds_p50": round(statistics.median(latencies), 3),
+        "join_seconds_p90": round(latencies[int(0.9 * (len(latencies) - 1))], 3),
+        "join_seconds_max": round(latencies[-1], 3),
+        "disk_kb": round(disk_bytes / 1024, 1),
+    }
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bots", type=int, default=10)
+    parser.add_argument("--url", default="about:blank")
+    parser.add_argument("--failure-shots", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    drivers = [main.new_chrome_driver() for _ in range(args.bots)]
+    try:
+        results = [run_mode(mode, drivers, args.url, args.failure_shots) for mode in ("off", "sync", "async")]
+    finally:
+        for driver in drivers:
+            driver.quit()
+
+    print(f"{'mode':<8}{'bots':>6}{'join p50 s':>12}{'join p90 s':>12}{'join max s':>12}{'disk KB':>10}")
+    for result in results:
+        print(f"{result['mode']:<8}{result['bots']:>6}{result['join_seconds_p50']:>12}{result['join_seconds_p90']:>12}"
+              f"{result['join_seconds_max']:>12}{result['disk_kb']:>10}")
+
+    if args.json:
+        with open(args.json, 'w') as output_file:
+            json.dump(results, output_file, indent=4)
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,79 @@
+"""Time to first join and total ramp time, with and without the pre-warmed driver pool.
+
+By default drivers are stand-ins with a fixed startup cost; --driver chrome starts
+real browsers (joins are still simulated, pages load --url). Run from the
+repository root:
+
+    python benchmarks/warm_pool_ramp.py --bots 100 --batch-size 25 --driver-startup 3
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from driver_pool import WarmDriverPool  # noqa: E402
+from engine import BotScheduler  # noqa: E402
+from fakes import patch_main, reset_main_state  # noqa: E402
+
+
+def run(num_bots, batch_size, use_pool, args):
+    reset_main_state(num_bots, batch_size=batch_size)
+    links = list(enumerate([args.url] * num_bots, start=1))
+    scheduler = BotScheduler(max_workers=batch_size, log=main.log_with_timestamp)
+    if use_pool:
+        main.driver_pool = WarmDriverPool(main.acquire_driver, main.quit_driver, args.pool_size or batch_size,
+                                          args.refill_rate, refill_workers=args.refill_workers,
+                                          log=main.log_with_timestamp)
+    main.launch_bots(links, scheduler)
+    timings = dict(main.ramp_timings)
+    main.shutdown_bots(scheduler)
+    return {
+        "pool": use_pool,
+        "bots": num_bots,
+        "batch_size": batch_size,
+        "time_to_first_join_seconds": round(timings['first_join'] - timings['started'], 2),
+        "ramp_seconds": round(timings['finished'] - timings['started'], 2),
+    }
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bots", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=25)
+    parser.add_argument("--driver", choices=("fake", "chrome"), default="fake")
+    parser.add_argument("--driver-startup", type=float, default=3.0, help="fake driver startup seconds")
+    parser.add_argument("--join-latency", type=float, default=1.0, help="simulated seconds per join")
+    parser.add_argument("--url", default="about:blank")
+    parser.add_argument("--pool-size", type=int, default=0, help="defaults to the batch size")
+    parser.add_argument("--refill-rate", type=float, default=main.driver_pool_refill_rate)
+    parser.add_argument("--refill-workers", type=int, default=main.driver_pool_refill_workers)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    new_chrome_driver = main.new_chrome_driver
+    patch_main(args.join_latency, args.driver_startup)
+    if args.driver == "chrome":
+        main.new_chrome_driver = new_chrome_driver
+
+    results = []
+    print(f"{'pool':<6}{'bots':>6}{'batch':>7}{'first join s':>14}{'ramp s':>9}")
+    for use_pool in (False, True):
+        started = time.monotonic()
+        result = run(args.bots, args.batch_size, use_pool, args)
+        result["wall_seconds"] = round(time.monotonic() - started, 2)
+        results.append(result)
+        print(f"{'on' if use_pool else 'off':<6}{result['bots']:>6}{result['batch_size']:>7}"
+              f"{result['time_to_first_join_seconds']:>14}{result['ramp_seconds']:>9}")
+
+    if args.json:
+        with open(args.json, 'w') as output_file:
+            json.dump(results, output_file, indent=4)
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,178 @@
+"""Whiteboard stroke throughput per dispatch mode: an ActionChains per stroke, W3C Actions batches, in-page events.
+
+Needs chromedriver and Chrome. Each bot opens a local page with a full-window
+canvas that draws the pointer events it receives and counts the strokes. Every
+bot tries to draw --rate strokes per second for --hold seconds, one batch per
+--interval seconds, and the benchmark reports the achieved rate, the strokes
+the page saw and the per-batch dispatch latency. Run from the repository root:
+
+    python benchmarks/whiteboard_strokes.py --bots 5 --rate 20 --hold 20
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from selenium import webdriver
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+import whiteboard_load  # noqa: E402
+from metrics import LatencyHistogram  # noqa: E402
+from whiteboard_load import StrokeGenerator  # noqa: E402
+
+PAGE = """<!DOCTYPE html>
+<html><body style="margin:0">
+<canvas id="board" width="1000" height="700" style="display:block"></canvas>
+<script>
+window.__board = {strokes: 0, trusted: 0, moves: 0};
+const canvas = document.getElementById('board'), context = canvas.getContext('2d');
+let drawing = false;
+canvas.addEventListener('pointerdown', (e) => {
+    drawing = true;
+    window.__board.strokes += 1;
+    if (e.isTrusted) window.__board.trusted += 1;
+    context.beginPath();
+    context.moveTo(e.offsetX, e.offsetY);
+});
+canvas.addEventListener('pointermove', (e) => {
+    if (!drawing) return;
+    window.__board.moves += 1;
+    context.lineTo(e.offsetX, e.offsetY);
+    context.stroke();
+});
+canvas.addEventListener('pointerup', () => { drawing = false; });
+</script>
+</body></html>
+"""
+
+MODES = ('per-stroke', 'actions', 'events')
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = PAGE.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def draw_per_stroke(driver, strokes, left, top):
+    # How perform_drawing used to draw: an ActionChains perform per stroke, built from relative moves
+    for points in strokes:
+        action_chains = webdriver.ActionChains(driver)
+        action_chains.w3c_actions.pointer_action.move_to_location(int(left + points[0][0]), int(top + points[0][1]))
+        action_chains.click_and_hold()
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            action_chains.move_by_offset(x1 - x0, y1 - y0)
+        action_chains.release()
+        action_chains.perform()
+
+
+def run_bot(driver, mode, args, latencies, results, index):
+    bounds = driver.execute_script("return document.getElementById('board').getBoundingClientRect();")
+    generator = StrokeGenerator(bounds['width'], bounds['height'], seed=index, points_per_stroke=args.points)
+    per_batch = args.rate * args.interval
+    carry = 0.0
+    drawn = 0
+    missed = 0
+    started = time.monotonic()
+    due = started
+    while due < started + args.hold:
+        carry += per_batch
+        count = int(carry)
+        carry -= count
+        strokes = generator.strokes(count)
+        batch_started = time.monotonic()
+        if mode == 'per-stroke':
+            draw_per_stroke(driver, strokes, bounds['left'], bounds['top'])
+        else:
+            whiteboard_load.dispatch(driver, strokes, bounds['left'], bounds['top'], mode=mode)
+        latencies.record(time.monotonic() - batch_started)
+        drawn += count
+        due += args.interval
+        # Like the harness, a batch that is already overdue is skipped rather than queued
+        while time.monotonic() > due + args.interval:
+            due += args.interval
+            missed += 1
+        time.sleep(max(0.0, due - time.monotonic()))
+    results[index] = {"drawn": drawn, "missed": missed, "seconds": time.monotonic() - started,
+                      "page": driver.execute_script("return window.__board")}
+
+
+def measure(mode, drivers, url, args):
+    for driver in drivers:
+        driver.get(url)
+    latencies = LatencyHistogram()
+    results = [None] * len(drivers)
+    threads = [threading.Thread(target=run_bot, args=(driver, mode, args, latencies, results, index))
+               for index, driver in enumerate(drivers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    summary = latencies.summary()
+    return {
+        "mode": mode,
+        "bots": len(drivers),
+        "target_strokes_per_second_per_bot": args.rate,
+        "strokes_per_second_per_bot": round(sum(r['drawn'] / r['seconds'] for r in results) / len(results), 2),
+        "page_strokes": sum(r['page']['strokes'] for r in results),
+        "page_trusted_strokes": sum(r['page']['trusted'] for r in results),
+        "missed_batches": sum(r['missed'] for r in results),
+        "batch_p50_ms": summary['p50_ms'],
+        "batch_p90_ms": summary['p90_ms'],
+        "batch_max_ms": summary['max_ms'],
+    }
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bots", type=int, default=5)
+    parser.add_argument("--rate", type=float, default=20.0, help="target strokes per second per bot")
+    parser.add_argument("--interval", type=float, default=main.stroke_batch_interval, help="seconds between batches")
+    parser.add_argument("--points", type=int, default=main.stroke_points, help="points per stroke")
+    parser.add_argument("--hold", type=float, default=20.0, help="seconds each mode draws for")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    drivers = [main.new_chrome_driver() for _ in range(args.bots)]
+    try:
+        for driver in drivers:
+            driver.set_window_size(1100, 800)
+        results = [measure(mode, drivers, url, args) for mode in args.modes]
+    finally:
+        for driver in drivers:
+            driver.quit()
+        server.shutdown()
+
+    print(f"{'mode':<10}{'bots':>6}{'strokes/s/bot':>15}{'page strokes':>14}{'trusted':>9}"
+          f"{'missed':>8}{'p50 ms':>9}{'p90 ms':>9}{'max ms':>9}")
+    for result in results:
+        print(f"{result['mode']:<10}{result['bots']:>6}{result['strokes_per_second_per_bot']:>15}"
+              f"{result['page_strokes']:>14}{result['page_trusted_strokes']:>9}{result['missed_batches']:>8}"
+              f"{result['batch_p50_ms']:>9}{result['batch_p90_ms']:>9}{result['batch_max_ms']:>9}")
+
+    if args.json:
+        with open(args.json, 'w') as output_file:
+            json.dump(results, output_file, indent=4)
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,234 @@
+"""Many bots inside one Chrome process, each in its own CDP browser context.
+
+One host webdriver.Chrome launches the browser. Every bot gets a fresh browser
+context (separate cookies, storage and cache, like an incognito window) with a
+single page in it, and its own WebDriver session attached to the same browser
+through the host's chromedriver. The bot's session is switched to its page, so
+the rest of the harness drives it like any other driver.
+
+When a host browser crashes or hangs, every bot in it is lost. retire_dead_host
+takes such a host out of the pool, so the next bots (the recycled ones among
+them) launch a new host instead of attaching to the dead one.
+"""
+import json
+import urllib.error
+import urllib.request
+from threading import Event, Lock
+
+import websocket  # websocket-client, installed as a selenium dependency
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
+
+
+class DevToolsConnection:
+    """Browser-level DevTools websocket.
+
+    Target.createBrowserContext and Target.disposeBrowserContext are rejected on
+    the page-level sessions that execute_cdp_cmd talks to, so they go here.
+    """
+
+    def __init__(self, debugger_address):
+        with urllib.request.urlopen(f"http://{debugger_address}/json/version", timeout=10) as response:
+            websocket_url = json.load(response)["webSocketDebuggerUrl"]
+        self._socket = websocket.create_connection(websocket_url, timeout=60, suppress_origin=True)
+        self._next_id = 0
+        self._lock = Lock()
+
+    def send(self, method, params=None):
+        with self._lock:
+            self._next_id += 1
+            message_id = self._next_id
+            self._socket.send(json.dumps({"id": message_id, "method": method, "params": params or {}}))
+            while True:
+                message = json.loads(self._socket.recv())
+                if message.get("id") != message_id:
+                    continue  # an event, not our reply
+                if "error" in message:
+                    raise RuntimeError(f"{method} failed: {message['error']}")
+                return message.get("result", {})
+
+    def close(self):
+        self._socket.close()
+
+
+class SharedBrowser:
+    def __init__(self, host_driver, window_size=(1920, 1080)):
+        self.host_driver = host_driver
+        self.window_size = window_size
+        self.debugger_address = host_driver.capabilities["goog:chromeOptions"]["debuggerAddress"]
+        self.devtools = DevToolsConnection(self.debugger_address)
+        self.reserved = 0  # guarded by the owning SharedBrowserPool's lock
+        self.retired = False  # taken out of the pool by retire_dead_host
+
+    def alive(self, timeout=5):
+        """True if the browser still answers on its DevTools HTTP endpoint."""
+        try:
+            with urllib.request.urlopen(f"http://{self.debugger_address}/json/version", timeout=timeout):
+                return True
+        except urllib.error.HTTPError:
+            return True  # it answered
+        except OSError:
+            return False
+
+    def new_bot_driver(self):
+        """Create an isolated browser context and return a driver attached to its page."""
+        context_id = self.devtools.send("Target.createBrowserContext", {"disposeOnDetach": False})["browserContextId"]
+        try:
+            width, height = self.window_size
+            target_id = self.devtools.send("Target.createTarget", {
+                "url": "about:blank",
+                "browserContextId": context_id,
+                "width": width,
+                "height": height,
+            })["targetId"]
+
+            options = Options()
+            options.debugger_address = self.debugger_address
+            connection = ChromiumRemoteConnection(
+                remote_server_addr=self.host_driver.service.service_url, vendor_prefix="goog", browser_name="chrome")
+            driver = webdriver.Remote(command_executor=connection, options=options)
+            # chromedriver window handles are DevTools target ids
+            handle = next(handle for handle in driver.window_handles if handle.endswith(target_id))
+            driver.switch_to.window(handle)
+        except Exception:
+            self.devtools.send("Target.disposeBrowserContext", {"browserContextId": context_id})
+            raise
+        return driver, context_id
+
+    def release(self, driver, context_id):
+        try:
+            # Ending a session that attached through debuggerAddress leaves the browser running
+            driver.quit()
+        finally:
+            self.devtools.send("Target.disposeBrowserContext", {"browserContextId": context_id})
+
+    def close(self):
+        try:
+            self.devtools.close()
+        finally:
+            self.host_driver.quit()
+
+
+class PendingHost:
+    """A host browser being launched; bots reserve its slots before it exists."""
+
+    def __init__(self):
+        self.reserved = 0  # guarded by the owning SharedBrowserPool's lock
+        self.ready = Event()
+        self.browser = None
+        self.error = None
+
+
+class SharedBrowserPool:
+    """Hands out context-backed drivers, launching a new host browser every bots_per_browser bots.
+
+    A host is launched outside the lock: the bot that needs it reserves a slot
+    on a PendingHost and starts Chrome, the next bots for that host wait for it,
+    and every other acquire and release goes on meanwhile.
+    """
+
+    def __init__(self, bots_per_browser, launch_browser):
+        self.bots_per_browser = bots_per_browser
+        self.launch_browser = launch_browser
+        self.browsers = []
+        self.pending = []  # PendingHosts being launched
+        self.owners = {}  # driver session_id -> (SharedBrowser, browser_context_id)
+        self.lock = Lock()
+
+    def new_bot_driver(self):
+        launch = False
+        with self.lock:
+            browser = next((b for b in self.browsers + self.pending if b.reserved < self.bots_per_browser), None)
+            if browser is None:
+                browser = PendingHost()
+                self.pending.append(browser)
+                launch = True
+            browser.reserved += 1
+        if isinstance(browser, PendingHost):
+            browser = self._launch(browser) if launch else self._wait_for(browser)
+        try:
+            driver, context_id = browser.new_bot_driver()
+        except Exception:
+            with self.lock:
+                browser.reserved -= 1
+            raise
+        with self.lock:
+            self.owners[driver.session_id] = (browser, context_id)
+        return driver
+
+    def _launch(self, pending):
+        try:
+            host_driver = self.launch_browser()
+            try:
+                browser = SharedBrowser(host_driver)
+            except Exception:
+                host_driver.quit()
+                raise
+        except Exception as e:
+            # The slots reserved on the host go with it; bots waiting for it fail their attempt
+            with self.lock:
+                self.pending.remove(pending)
+            pending.error = e
+            pending.ready.set()
+            raise
+        with self.lock:
+            browser.reserved = pending.reserved
+            self.pending.remove(pending)
+            self.browsers.append(browser)
+        pending.browser = browser
+        pending.ready.set()
+        return browser
+
+    @staticmethod
+    def _wait_for(pending):
+        pending.ready.wait()
+        if pending.browser is None:
+            raise RuntimeError(f"The host browser failed to launch - {pending.error}")
+        return pending.browser
+
+    def release(self, driver):
+        """Close a driver from this pool. Returns False if the driver is not one of ours."""
+        with self.lock:
+            owner = self.owners.pop(driver.session_id, None)
+        if owner is None:
+            return False
+        browser, context_id = owner
+        if browser.retired:
+            return True
+        try:
+            browser.release(driver, context_id)
+        finally:
+            with self.lock:
+                browser.reserved -= 1
+        return True
+
+    def retire_dead_host(self, driver):
+        """Take driver's host browser out of the pool if it no longer answers; returns it, or None.
+
+        The caller kills the returned host's processes. Its bots' drivers stay
+        in owners until they are released; there is nothing left to close then.
+        """
+        with self.lock:
+            owner = self.owners.get(driver.session_id)
+        if owner is None or owner[0].alive():
+            return None
+        browser = owner[0]
+        with self.lock:
+            if browser.retired:
+                return None  # another of its bots got here first
+            browser.retired = True
+            self.browsers.remove(browser)
+        try:
+            browser.devtools.close()
+        except Exception:
+            pass  # the socket went down with the browser
+        return browser
+
+    def close(self):
+        with self.lock:
+            browsers = list(self.browsers)
+            self.browsers.clear()
+            self.owners.clear()
+        for browser in browsers:
+            browser.close()
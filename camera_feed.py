@@ -0,0 +1,213 @@
+"""Fake camera feeds for bots, generated from test-video.Y4M and shared on tmpfs.
+
+Every variant in camera_feed.variants (width, height, fps, loop_seconds) is
+rendered as feeds_per_variant Y4M files; with feeds_per_variant 0 there are as
+many feeds over all variants as bots that can open their camera. A camera bot
+streams the feed at its rank among the camera bots (variants alternate), passed
+to its own Chrome through --use-file-for-fake-video-capture, so the feed stays
+the bot's across rejoins and recycles. Other bots keep Chrome's test pattern.
+Chrome memory-maps the file, so with the files on tmpfs every bot streaming the
+same feed shares one copy in RAM.
+
+test-video.Y4M is only a few frames long, so a feed pans across it and moves a
+block over it to give the encoder real motion. Feeds of one variant differ in
+brightness, pan phase, mirroring and an id pattern in the corner, so no two bots
+send identical streams unless more bots open cameras than there are feeds.
+noise adds per-pixel grain of about that many luma levels, a different pattern
+every frame, for a higher bitrate.
+"""
+import math
+import os
+import random
+from operator import itemgetter
+from threading import Lock
+
+CHROMA_420 = ('420', '420jpeg', '420paldv', '420mpeg2')
+
+
+def read_y4m(path):
+    """Return (width, height, fps, frames); each frame is (y_rows, u_rows, v_rows) lists of bytes rows."""
+    with open(path, 'rb') as y4m_file:
+        data = y4m_file.read()
+    header_end = data.index(b'\n')
+    params = {token[:1]: token[1:] for token in data[:header_end].split()[1:]}
+    width, height = int(params[b'W']), int(params[b'H'])
+    numerator, denominator = (int(value) for value in params.get(b'F', b'30:1').split(b':'))
+    chroma = params.get(b'C', b'420jpeg').decode()
+    if chroma not in CHROMA_420:
+        raise ValueError(f"{path}: only 4:2:0 Y4M is supported, got C{chroma}")
+
+    chroma_width, chroma_height = width // 2, height // 2
+    frames = []
+    position = header_end + 1
+    while position < len(data):
+        position = data.index(b'\n', position) + 1  # FRAME line, possibly with parameters
+        planes = []
+        for plane_width, plane_height in ((width, height), (chroma_width, chroma_height),
+                                          (chroma_width, chroma_height)):
+            planes.append([data[position + row * plane_width:position + (row + 1) * plane_width]
+                           for row in range(plane_height)])
+            position += plane_width * plane_height
+        frames.append(tuple(planes))
+    return width, height, numerator / denominator, frames
+
+
+def shift_table(offset):
+    return bytes(min(255, max(0, value + offset)) for value in range(256))
+
+
+def grain_mask(noise):
+    """The smallest all-ones mask covering noise; XOR with it keeps every pixel in its byte without clamping."""
+    return (1 << noise.bit_length()) - 1 if noise > 0 else 0
+
+
+class FeedRenderer:
+    """Renders one feed: the source scaled to width x height, panned and marked for feed index."""
+
+    def __init__(self, source, width, height, fps, index, noise=0):
+        self.source_width, self.source_height, self.source_fps, self.frames = source
+        self.width = width
+        self.height = height
+        self.fps = int(fps)
+        self.index = index
+        self.mirror = index % 2 == 1
+        self.luma_table = shift_table((index * 7) % 33 - 16)
+        self.block = max(4, height // 20) & ~1
+        self.grain = None
+        self.random = random.Random(index)
+        mask = grain_mask(noise)
+        if mask:
+            # Two frames of random low bits; every frame XORs in a window at a random offset
+            self.grain = self.random.randbytes(width * height * 2).translate(bytes(v & mask for v in range(256)))
+
+    def plane(self, rows, source_width, width, height, shift, table=None):
+        # Nearest-neighbour scale with a horizontal pan that wraps around the source
+        columns = [(x * source_width // width + shift) % source_width for x in range(width)]
+        if self.mirror:
+            columns.reverse()
+        pick = itemgetter(*columns)
+        source_height = len(rows)
+        out = bytearray()
+        for y in range(height):
+            row = bytes(pick(rows[y * source_height // height]))
+            if table is not None:
+                row = row.translate(table)
+            out += row
+        return out
+
+    def frame(self, frame_index):
+        source_index = (int(frame_index * self.source_fps / self.fps) + self.index) % len(self.frames)
+        y_rows, u_rows, v_rows = self.frames[source_index]
+        # One source width per 8 seconds, offset by the feed index
+        shift = (frame_index * self.source_width // int(self.fps * 8) + self.index * 53) % self.source_width
+        luma = self.plane(y_rows, self.source_width, self.width, self.height, shift, self.luma_table)
+        if self.grain is not None:
+            luma = self.add_grain(luma)
+        chroma_width, chroma_height = self.width // 2, self.height // 2
+        u = self.plane(u_rows, self.source_width // 2, chroma_width, chroma_height, shift // 2)
+        v = self.plane(v_rows, self.source_width // 2, chroma_width, chroma_height, shift // 2)
+        self.draw_marks(luma, frame_index)
+        return bytes(luma) + bytes(u) + bytes(v)
+
+    def add_grain(self, luma):
+        size = len(luma)
+        offset = self.random.randrange(size)
+        grain = int.from_bytes(self.grain[offset:offset + size], 'little')
+        return bytearray((int.from_bytes(luma, 'little') ^ grain).to_bytes(size, 'little'))
+
+    def draw_marks(self, luma, frame_index):
+        block = self.block
+        # The feed index in binary across the top-left corner
+        for bit in range(8):
+            value = 235 if self.index >> bit & 1 else 16
+            for y in range(block):
+                start = y * self.width + bit * block
+                luma[start:start + block] = bytes([value]) * block
+        # A bright square bouncing around the frame
+        size = block * 2
+        span_x, span_y = max(1, self.width - size), max(1, self.height - size - block)
+        x = abs((frame_index * 4 + self.index * 37) % (2 * span_x) - span_x)
+        y = block + abs((frame_index * 3 + self.index * 23) % (2 * span_y) - span_y)
+        for row in range(y, y + size):
+            luma[row * self.width + x:row * self.width + x + size] = b'\xeb' * size
+
+
+def write_feed(path, renderer, frame_count):
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'wb') as feed_file:
+        header = f"YUV4MPEG2 W{renderer.width} H{renderer.height} F{renderer.fps}:1 Ip A1:1 C420jpeg\n"
+        feed_file.write(header.encode())
+        for frame_index in range(frame_count):
+            feed_file.write(b'FRAME\n')
+            feed_file.write(renderer.frame(frame_index))
+    os.replace(temporary_path, path)  # other harness processes never see a partial file
+
+
+class CameraFeeds:
+    def __init__(self, source, directory, variants, feeds_per_variant=0, noise=0, log=print):
+        self.source = source
+        self.directory = directory
+        self.variants = variants
+        self.feeds_per_variant = feeds_per_variant  # 0: enough feeds for one per camera bot
+        self.noise = noise
+        self.log = log
+        self.paths = []
+        self.variant_paths = []  # per variant, the paths of its feeds
+        self.ranks = {}  # camera bot_id -> rank among the camera bots
+        self.lock = Lock()
+
+    def feed_name(self, variant, index):
+        grain = f"_grain{self.noise}" if self.noise else ""
+        return (f"feed_{variant['width']}x{variant['height']}_{variant['fps']}fps_"
+                f"{variant['loop_seconds']}s{grain}_{index}.y4m")
+
+    def feed_count(self, camera_bots):
+        """Feeds per variant: feeds_per_variant, or enough for every camera bot to stream its own."""
+        if self.feeds_per_variant:
+            return self.feeds_per_variant
+        return max(1, math.ceil(camera_bots / max(1, len(self.variants))))
+
+    def prepare(self, camera_bots):
+        """Generate any feed the camera_bots (bot ids) need that is missing or older than the source.
+
+        Returns the feed paths.
+        """
+        camera_bots = sorted(camera_bots)
+        feed_count = self.feed_count(len(camera_bots))
+        os.makedirs(self.directory, exist_ok=True)
+        source_mtime = os.path.getmtime(self.source)
+        source = None
+        variant_paths = []
+        for variant in self.variants:
+            if variant['width'] % 2 or variant['height'] % 2:
+                raise ValueError(f"camera_feed variant {variant} needs an even width and height for 4:2:0")
+            paths = []
+            variant_paths.append(paths)
+            for index in range(feed_count):
+                path = os.path.join(self.directory, self.feed_name(variant, index))
+                paths.append(path)
+                if os.path.exists(path) and os.path.getmtime(path) >= source_mtime:
+                    continue
+                if source is None:
+                    source = read_y4m(self.source)
+                renderer = FeedRenderer(source, variant['width'], variant['height'], variant['fps'], index,
+                                        noise=self.noise)
+                write_feed(path, renderer, int(variant['fps'] * variant['loop_seconds']))
+                self.log(f"Generated camera feed {path} ({os.path.getsize(path) // (1024 * 1024)} MB).")
+        with self.lock:
+            self.variant_paths = variant_paths
+            self.paths = [path for paths in variant_paths for path in paths]
+            self.ranks = {bot_id: rank for rank, bot_id in enumerate(camera_bots)}
+        return self.paths
+
+    def feed_for(self, bot_id):
+        """bot_id's feed, or None if it is not a camera bot (or before prepare())."""
+        with self.lock:
+            rank = self.ranks.get(bot_id)
+            if rank is None or not self.variant_paths:
+                return None
+            paths = self.variant_paths[rank % len(self.variant_paths)]
+            return paths[rank // len(self.variant_paths) % len(paths)]
+
+    def total_bytes(self):
+        return sum(os.path.getsize(path) for path in self.paths if os.path.exists(path))
@@ -0,0 +1,182 @@
+"""The "lean" Chrome profile: only what a participant needs to join, vote and draw.
+
+A lean bot does not download images, fonts or analytics. The patterns in
+blocked_urls are refused over CDP (Network.setBlockedURLs) before the first
+page load, and Blink's image decoding is switched off. The browser is also
+capped at renderer_process_limit renderer processes and a js_heap_mb V8 heap.
+
+With shared_cache_dir, each bot starts from a disk cache of the app's static
+bundles instead of an empty one. Seed it once with
+
+    python chrome_profile.py --seed-cache "<session link>"
+
+and every bot's cache directory is then a tree of hard links into the seed, so
+the bundles sit on disk and in the page cache once, however many bots read them.
+The seed's files are made read-only (0444), so a bot's Chrome cannot rewrite an
+entry through its link; it replaces the entry with a file of its own instead.
+Permission bits do not stop root, so a harness running as root gives each bot
+reflinked (copy-on-write) files where the filesystem supports them and plain
+copies elsewhere. Use the seed for fingerprinted bundles and re-seed after a
+deploy. Disk caches are off in incognito, so a lean profile with a cache starts Chrome in a
+fresh temporary profile instead; chromedriver already gives every session its own.
+"""
+import argparse
+import fcntl
+import os
+import shutil
+import stat
+import tempfile
+import time
+
+DEFAULT_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*hotjar.com*",
+    "*facebook.net*", "*clarity.ms*", "*sentry.io*",
+]
+
+LEAN_ARGUMENTS = [
+    "--blink-settings=imagesEnabled=false",
+    "--disable-remote-fonts",
+    "--disable-component-update",
+    "--disable-domain-reliability",
+    "--disable-breakpad",
+    "--disable-client-side-phishing-detection",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,InterestFeedContentSuggestions",
+    "--metrics-recording-only",
+    "--no-default-browser-check",
+    "--no-pings",
+]
+
+# Index files are rewritten on every run, so each bot gets its own copy
+CACHE_INDEX_NAMES = ('index', 'index-dir', 'the-real-index')
+
+FICLONE = 0x40049409  # ioctl: share the source's extents, copy on write (btrfs, XFS)
+READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+
+class LeanProfile:
+    def __init__(self, blocked_urls=None, renderer_process_limit=1, js_heap_mb=512, shared_cache_dir=''):
+        self.blocked_urls = DEFAULT_BLOCKED_URLS if blocked_urls is None else blocked_urls
+        self.renderer_process_limit = renderer_process_limit
+        self.js_heap_mb = js_heap_mb
+        self.shared_cache_dir = shared_cache_dir
+        self.bot_cache_root = f"{os.path.abspath(shared_cache_dir)}.bots" if shared_cache_dir else None
+        self.seed_protected = False
+
+    def apply(self, chrome_options):
+        """Add the lean flags to chrome_options; returns the bot's cache directory, if it has one."""
+        for argument in LEAN_ARGUMENTS:
+            chrome_options.add_argument(argument)
+        if self.renderer_process_limit:
+            chrome_options.add_argument(f"--renderer-process-limit={self.renderer_process_limit}")
+        if self.js_heap_mb:
+            chrome_options.add_argument(f"--js-flags=--max-old-space-size={self.js_heap_mb}")
+        if not self.has_shared_cache():
+            return None
+        cache_dir = self.new_bot_cache()
+        chrome_options.add_argument(f"--disk-cache-dir={cache_dir}")
+        return cache_dir
+
+    def has_shared_cache(self):
+        return bool(self.shared_cache_dir) and os.path.isdir(self.shared_cache_dir)
+
+    def new_bot_cache(self):
+        if not self.seed_protected:
+            make_read_only(self.shared_cache_dir)  # seeds from before read-only seeding
+            self.seed_protected = True
+        os.makedirs(self.bot_cache_root, exist_ok=True)
+        cache_dir = tempfile.mkdtemp(prefix='bot-', dir=self.bot_cache_root)
+        os.rmdir(cache_dir)  # copytree creates it
+        shutil.copytree(self.shared_cache_dir, cache_dir, copy_function=link_or_copy)
+        return cache_dir
+
+    def block_urls(self, driver):
+        """Refuse blocked_urls in the driver's page; call before the first driver.get."""
+        if not self.blocked_urls:
+            return
+        execute_cdp(driver, "Network.enable", {})
+        execute_cdp(driver, "Network.setBlockedURLs", {"urls": self.blocked_urls})
+
+    def remove_bot_cache(self, cache_dir):
+        if cache_dir:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def cleanup(self):
+        if self.bot_cache_root:
+            shutil.rmtree(self.bot_cache_root, ignore_errors=True)
+
+
+def make_read_only(directory, read_only=True):
+    for root, _, names in os.walk(directory):
+        for name in names:
+            os.chmod(os.path.join(root, name), READ_ONLY if read_only else READ_ONLY | stat.S_IWUSR)
+
+
+def link_or_copy(source, destination):
+    private = os.path.basename(source) in CACHE_INDEX_NAMES or os.path.basename(os.path.dirname(source)) == 'index-dir'
+    if not private and os.geteuid() != 0:
+        try:
+            os.link(source, destination)
+            return destination
+        except OSError:  # another filesystem
+            pass
+    if private or not reflink(source, destination):
+        shutil.copy2(source, destination)
+    os.chmod(destination, READ_ONLY | stat.S_IWUSR)  # the bot's own file
+    return destination
+
+
+def reflink(source, destination):
+    """Clone source into destination sharing its blocks until either is written; False where unsupported."""
+    try:
+        with open(source, 'rb') as source_file, open(destination, 'wb') as destination_file:
+            fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+    except OSError:
+        try:
+            os.remove(destination)
+        except OSError:
+            pass
+        return False
+    shutil.copystat(source, destination)
+    return True
+
+
+def execute_cdp(driver, cmd, params):
+    # driver.execute rather than execute_cdp_cmd: context drivers (browser_contexts) are webdriver.Remote
+    return driver.execute("executeCdpCommand", {"cmd": cmd, "params": params})["value"]
+
+
+def seed_cache(url, cache_dir, settle):
+    """Load url once in a Chrome writing its disk cache to cache_dir."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    import main
+
+    os.makedirs(cache_dir, exist_ok=True)
+    make_read_only(cache_dir, read_only=False)  # re-seeding updates the entries in place
+    chrome_options = main.chrome_options_for_bot(incognito=False)
+    chrome_options.add_argument(f"--disk-cache-dir={os.path.abspath(cache_dir)}")
+    driver = webdriver.Chrome(service=Service('/usr/local/bin/chromedriver'), options=chrome_options)
+    try:
+        driver.get(url)
+        time.sleep(settle)  # let the app finish fetching its bundles
+    finally:
+        driver.quit()
+    make_read_only(cache_dir)
+    print(f"Seeded {cache_dir} from {url}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lean Chrome profile tools.")
+    parser.add_argument('--seed-cache', metavar='URL', required=True, help="page whose static assets to cache")
+    parser.add_argument('--cache-dir', help="defaults to chrome_profile.shared_cache_dir in config.json")
+    parser.add_argument('--settle', type=float, default=15.0)
+    args = parser.parse_args()
+    if args.cache_dir is None:
+        import main
+        args.cache_dir = main.lean_profile.shared_cache_dir
+    if not args.cache_dir:
+        parser.error("set chrome_profile.shared_cache_dir in config.json or pass --cache-dir")
+    seed_cache(args.seed_cache, args.cache_dir, args.settle)
@@ -0,0 +1,419 @@
+"""Coordinator/worker mode: shard session_links.txt across processes and hosts.
+
+The coordinator hands each worker a round-robin shard of (bot_id, link) pairs.
+Bot ids stay global, so group membership is the same as in a single-process run.
+Once every worker has finished ramping up, the coordinator broadcasts each group
+activation, and workers convert vote_time using their measured offset to the
+coordinator's clock so every host votes at the same instant. On Ctrl-C the
+coordinator stops all workers and merges the summaries of those still connected
+into one report. Each worker's report carries its bots' result rows, which the
+coordinator writes to its own results file, so a resume or rerun_failed run
+from the coordinator host sees the bots of every host.
+
+Messages are pickled, so whoever holds the shared secret can run code on the
+coordinator and every worker. The secret comes from $LOADTEST_AUTHKEY; without
+it the coordinator only listens on a loopback address and hands its local
+workers a random one.
+
+    python coordinator.py                                    # coordinator plus local workers
+    LOADTEST_AUTHKEY=... python coordinator.py worker --connect 10.0.0.5:6000   # a remote worker
+"""
+import argparse
+import ipaddress
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from queue import Empty, SimpleQueue
+from threading import Thread
+
+import main
+from main import log_with_timestamp
+from engine import BotScheduler
+from metrics import PhaseMetrics
+from structured_log import path_with_suffix
+import vote_barrier
+
+distributed_config = main.config_data.get('distributed', {})
+listen_address = distributed_config.get('listen', '127.0.0.1:6000')
+local_workers = distributed_config.get('local_workers', 2)
+remote_workers = distributed_config.get('remote_workers', 0)
+accept_timeout = distributed_config.get('accept_timeout', 120)  # seconds to wait for every worker to connect
+report_path = distributed_config.get('report_path', 'distributed_report.json')
+
+# Settings that must be identical on every worker, taken from the coordinator's config.json
+SHARED_SETTINGS = ('group_size', 'open_camera', 'vote', 'vote_time', 'whiteboard', 'session_duration')
+
+CLOCK_SYNC_ROUNDS = 5
+
+AUTHKEY_ENV = 'LOADTEST_AUTHKEY'
+
+
+def parse_address(address):
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+def is_loopback(host):
+    return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+
+
+def coordinator_authkey():
+    """$LOADTEST_AUTHKEY, or a random secret when the coordinator only listens on loopback."""
+    authkey = os.environ.get(AUTHKEY_ENV, '')
+    if authkey:
+        return authkey.encode()
+    if not is_loopback(parse_address(listen_address)[0]):
+        raise ValueError(f"Coordinator: set {AUTHKEY_ENV} to listen on {listen_address}; anyone who can connect "
+                         f"without it could run code on the coordinator and its workers")
+    return secrets.token_hex(16).encode()
+
+
+def shard_links(bots, num_shards):
+    """Split (bot_id, link) pairs into round-robin shards; bot ids stay global."""
+    shards = [[] for _ in range(num_shards)]
+    for index, bot in enumerate(bots):
+        shards[index % num_shards].append(bot)
+    return shards
+
+
+def merge_summaries(summaries):
+    """Combine per-worker run summaries (main.run_summary) into one fleet-wide summary."""
+    merged = {
+        "workers": len(summaries),
+        "bots": sum(summary['bots'] for summary in summaries.values()),
+        "protocol_bots": sum(summary.get('protocol_bots', 0) for summary in summaries.values()),
+        "join_attempts": sum(summary['join_attempts'] for summary in summaries.values()),
+        "joined": sum(summary['joined'] for summary in summaries.values()),
+        "joined_bot_ids": sorted(bot_id for summary in summaries.values() for bot_id in summary['joined_bot_ids']),
+    }
+    first_joins = [s['time_to_first_join_seconds'] for s in summaries.values() if 'time_to_first_join_seconds' in s]
+    if first_joins:
+        merged['time_to_first_join_seconds'] = min(first_joins)
+    last_joins = [s['time_to_last_join_seconds'] for s in summaries.values() if 'time_to_last_join_seconds' in s]
+    if last_joins:
+        merged['time_to_last_join_seconds'] = max(last_joins)
+    ramps = [s['ramp_seconds'] for s in summaries.values() if 'ramp_seconds' in s]
+    if ramps:
+        merged['ramp_seconds'] = max(ramps)
+    # Fire times are already on the coordinator's clock, so the fleet-wide skew is comparable
+    fire_times = {bot_id: fired_at
+                  for summary in summaries.values() for bot_id, fired_at in summary.get('vote_fire_times', {}).items()}
+    deadlines = {bot_id: deadline
+                 for summary in summaries.values() for bot_id, deadline in summary.get('vote_deadlines', {}).items()}
+    if fire_times:
+        merged['vote_skew'] = vote_barrier.skew_summary(fire_times, deadlines)
+    whiteboards = [s['whiteboard'] for s in summaries.values() if 'whiteboard' in s]
+    if whiteboards:
+        merged['whiteboard'] = {key: sum(w[key] for w in whiteboards)
+                                for key in ('bots', 'strokes', 'batches', 'failed_batches', 'missed_batches')}
+        # Workers draw over the same session, so their rates add up
+        merged['whiteboard']['strokes_per_second'] = round(sum(w.get('strokes_per_second', 0) for w in whiteboards), 2)
+    healths = [s['health'] for s in summaries.values() if 'health' in s]
+    if healths:
+        # Percentiles do not merge: keep each metric's highest per-worker p90, the full figures are in per_worker
+        merged['health'] = {key: sum(h[key] for h in healths)
+                            for key in ('rounds', 'skipped_rounds', 'bots_sampled', 'samples', 'errors', 'timeouts',
+                                        'skipped_busy')}
+        merged['health']['fleet_p90_max_over_workers'] = {
+            metric: max(h['fleet'][metric]['p90'] for h in healths if metric in h['fleet'])
+            for metric in {metric for h in healths for metric in h['fleet']}
+        }
+    watchdogs = [s['watchdog'] for s in summaries.values() if 'watchdog' in s]
+    if watchdogs:
+        merged['watchdog'] = {key: sum(w[key] for w in watchdogs)
+                              for key in ('heartbeats', 'heartbeat_errors', 'heartbeat_timeouts', 'action_timeouts',
+                                          'skipped_busy', 'failures')}
+        merged['watchdog']['failed_bots'] = sorted(bot_id for w in watchdogs for bot_id in w['failed_bots'])
+    results = [s['results'] for s in summaries.values() if 'results' in s]
+    if results:
+        merged['results'] = {key: results[0][key] for key in ('run_id', 'mode', 'source_run')}
+        merged['results']['bots'] = sum(r['bots'] for r in results)
+        merged['results']['statuses'] = {}
+        for r in results:
+            for status, count in r['statuses'].items():
+                merged['results']['statuses'][status] = merged['results']['statuses'].get(status, 0) + count
+    merged['per_worker'] = summaries
+    return merged
+
+
+class Coordinator:
+    def __init__(self, address, expected_workers, authkey):
+        self.listener = Listener(parse_address(address), authkey=authkey)
+        self.expected_workers = expected_workers
+        self.workers = {}  # worker name -> Connection
+        self.t0 = None  # the timeline's T0, epoch seconds
+
+    def accept_workers(self, timeout, local_processes=()):
+        """Wait for every worker; raises TimeoutError after timeout seconds or once a local worker has exited."""
+        log_with_timestamp(f"Coordinator: waiting for {self.expected_workers} workers on {listen_address}.")
+        deadline = time.monotonic() + timeout
+        accepted = SimpleQueue()
+        Thread(target=self._accept, args=(accepted,), name="coordinator-accept", daemon=True).start()
+        while len(self.workers) < self.expected_workers:
+            try:
+                name, connection = accepted.get(timeout=1.0)
+            except Empty:
+                exited = [process.args[-1] for process in local_processes if process.poll() is not None]
+                if exited:
+                    raise TimeoutError(f"Coordinator: local workers {exited} exited before connecting.")
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Coordinator: only {len(self.workers)}/{self.expected_workers} workers "
+                                       f"connected in {timeout}s.")
+                continue
+            self.workers[name] = connection
+            log_with_timestamp(f"Coordinator: worker {name} connected ({len(self.workers)}/{self.expected_workers}).")
+
+    def _accept(self, accepted):
+        # A blocking accept has no timeout; this thread ends once close() shuts the listener
+        for _ in range(self.expected_workers):
+            while True:
+                try:
+                    connection = self.listener.accept()
+                    accepted.put((self._handshake(connection), connection))
+                    break
+                except (AuthenticationError, EOFError) as e:
+                    log_with_timestamp(f"Coordinator: rejected a connection - {e!r}.")
+                except OSError:
+                    return
+
+    def _handshake(self, connection):
+        # Answer clock probes until the worker introduces itself
+        while True:
+            message = connection.recv()
+            if message['type'] == 'clock':
+                connection.send({'type': 'clock', 'time': time.time()})
+            elif message['type'] == 'hello':
+                log_with_timestamp(
+                    f"Coordinator: worker {message['worker']} clock offset {message['clock_offset'] * 1000:.1f} ms.")
+                return message['worker']
+
+    def drop_worker(self, name, error):
+        log_with_timestamp(f"Coordinator: lost worker {name} - {error!r}.")
+        self.workers.pop(name).close()
+
+    def broadcast(self, message):
+        for name, connection in list(self.workers.items()):
+            try:
+                connection.send(message)
+            except OSError as e:
+                self.drop_worker(name, e)
+
+    def receive_all(self, expected_type, skip=()):
+        """One expected_type message from each worker, passing over message types in skip.
+
+        A worker whose connection is gone is dropped, and the others' replies are returned.
+        """
+        replies = {}
+        for name, connection in list(self.workers.items()):
+            try:
+                message = connection.recv()
+                while message['type'] in skip:
+                    message = connection.recv()
+            except (EOFError, OSError) as e:
+                self.drop_worker(name, e)
+                continue
+            if message['type'] != expected_type:
+                raise RuntimeError(f"Worker {name} sent {message['type']!r}, expected {expected_type!r}.")
+            replies[name] = message
+        return replies
+
+    def run(self, bots, max_bots):
+        """Run the (bot_id, link) pairs main.select_bots picked; max_bots is the highest line it read."""
+        shards = shard_links(bots, len(self.workers))
+        settings = {key: main.config_data[key] for key in SHARED_SETTINGS if key in main.config_data}
+        # Workers get the scenario itself, so the scenario file only has to exist here
+        scenario = main.load_timeline_scenario()
+        store = main.results_store
+        # Workers record their bots under this run and send the rows back with their report
+        results = {'run_id': store.run_id, 'mode': store.mode, 'source_run': store.source_run} if store else None
+        for (name, connection), shard in zip(self.workers.items(), shards):
+            connection.send({'type': 'assign', 'bots': shard, 'settings': settings, 'scenario': scenario,
+                             'total_bots': max_bots, 'results': results})
+            log_with_timestamp(f"Coordinator: assigned {len(shard)} bots to worker {name}.")
+
+        ramp_reports = self.receive_all('ramp_done')
+        joined = sum(report['summary']['joined'] for report in ramp_reports.values())
+        log_with_timestamp(f"Coordinator: all workers finished ramping up, {joined}/{len(bots)} bots joined.")
+
+        # Every worker runs the timeline from the same T0, on the coordinator's clock
+        self.t0 = time.time()
+        self.broadcast({'type': 'start_timeline', 't0': self.t0})
+
+        # Activate each group at group_interval intervals on every worker at once
+        group_interval = scenario.get('group_interval', 1.0)
+        for group_id in range(main.count_groups(max_bots)):
+            self.broadcast({'type': 'activate_group', 'group': group_id})
+            log_with_timestamp(f"Coordinator: group {group_id} has been activated.")
+            time.sleep(group_interval)
+        log_with_timestamp("Coordinator: all groups have been activated.")
+
+    def stop(self, completed=False):
+        """Stop every worker (completed: the session ran to its end); returns the merged summary and metrics."""
+        self.broadcast({'type': 'stop', 'completed': completed})
+        # A worker stopped during its ramp-up finishes it and reports ramp_done first
+        reports = self.receive_all('report', skip=('ramp_done',))
+        phase_metrics = PhaseMetrics()
+        for report in reports.values():
+            phase_metrics.merge(report['metrics'])
+        store = main.results_store
+        if store is not None:
+            # Rows of local workers are in the shared file already; writing them again changes nothing
+            rows = [row for report in reports.values() for row in report.get('results', ())]
+            for row in rows:
+                store.put(row)
+            log_with_timestamp(f"Coordinator: {len(rows)} result rows from the workers queued for {store.path}.")
+        return merge_summaries({name: report['summary'] for name, report in reports.items()}), phase_metrics
+
+    def close(self):
+        for connection in self.workers.values():
+            connection.close()
+        self.listener.close()
+
+
+def measure_clock_offset(connection):
+    """Estimate coordinator clock minus local clock from the probe with the shortest round trip."""
+    best_round_trip = None
+    offset = 0.0
+    for _ in range(CLOCK_SYNC_ROUNDS):
+        sent = time.time()
+        connection.send({'type': 'clock'})
+        coordinator_time = connection.recv()['time']
+        received = time.time()
+        round_trip = received - sent
+        if best_round_trip is None or round_trip < best_round_trip:
+            best_round_trip = round_trip
+            offset = coordinator_time - (sent + received) / 2
+    return offset
+
+
+def apply_settings(settings):
+    for key, value in settings.items():
+        setattr(main, key, value)
+    if 'vote_time' in settings:
+        main.vote_time_strp = datetime.strptime(settings['vote_time'], "%Y-%m-%d %H:%M:%S")
+
+
+def run_worker(address, name):
+    if main.log_path:
+        # Local workers share the coordinator's directory, so each writes its own log
+        main.log_pipeline.reopen(path_with_suffix(main.log_path, name))
+    if main.health_series_path:
+        main.health_series_path = path_with_suffix(main.health_series_path, name)
+    authkey = os.environ.get(AUTHKEY_ENV, '')
+    if not authkey:
+        raise ValueError(f"Worker {name}: set {AUTHKEY_ENV} to the coordinator's secret.")
+    connection = Client(parse_address(address), authkey=authkey.encode())
+    main.clock_offset = measure_clock_offset(connection)
+    connection.send({'type': 'hello', 'worker': name, 'clock_offset': main.clock_offset})
+
+    assignment = connection.recv()
+    if assignment['type'] == 'stop':
+        # Stopped before the bots were handed out
+        connection.send({'type': 'report', 'summary': main.run_summary(), 'metrics': main.run_metrics.export()})
+        connection.close()
+        return
+    apply_settings(assignment['settings'])
+    if assignment.get('results'):
+        main.open_results_store(**assignment['results'])
+    bots = [tuple(bot) for bot in assignment['bots']]
+    scenario = assignment['scenario']
+    total_bots = assignment['total_bots']
+    log_with_timestamp(f"Worker {name}: received {len(bots)} bots.")
+
+    scheduler = BotScheduler(max_workers=main.max_workers, log=log_with_timestamp)
+    main.prepare_camera_feeds()
+    main.start_driver_pool()
+    main.start_protocol_engine()
+    try:
+        main.start_driver_watchdog(scheduler)
+        main.ramp_up(bots, scheduler)
+        connection.send({'type': 'ramp_done', 'summary': main.run_summary()})
+
+        while True:
+            message = connection.recv()
+            if message['type'] == 'start_timeline':
+                main.start_timeline(scheduler, total_bots, t0_epoch=message['t0'] - main.clock_offset,
+                                    scenario=scenario)
+                main.start_health_sampler(scheduler)
+            elif message['type'] == 'activate_group':
+                main.activate_group(message['group'], scheduler)
+            elif message['type'] == 'stop':
+                main.session_completed = main.session_completed or message.get('completed', False)
+                break
+    finally:
+        main.shutdown_bots(scheduler)
+        log_with_timestamp(f"Worker {name}: all bots have been closed.")
+
+    connection.send({'type': 'report', 'summary': main.run_summary(), 'metrics': main.run_metrics.export(),
+                     'results': main.result_rows()})
+    connection.close()
+
+
+def start_local_workers(count, authkey):
+    workers = []
+    for index in range(count):
+        # A new session keeps Ctrl-C on the coordinator's terminal away from the workers;
+        # the coordinator stops them itself so they can report.
+        workers.append(subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), 'worker', '--connect', listen_address,
+             '--name', f"local-{index + 1}"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=dict(os.environ, **{AUTHKEY_ENV: authkey.decode()}),
+            start_new_session=True,
+        ))
+    return workers
+
+
+def run_coordinator(num_local_workers):
+    authkey = coordinator_authkey()
+    main.open_results_store()
+    bots = list(main.select_bots(main.read_links_from_file('session_links.txt')))
+    if not bots:
+        log_with_timestamp("Coordinator: no links to launch.")
+        return
+    coordinator = Coordinator(listen_address, num_local_workers + remote_workers, authkey)
+    workers = start_local_workers(num_local_workers, authkey)
+    completed = False
+    try:
+        try:
+            coordinator.accept_workers(accept_timeout, workers)
+            coordinator.run(bots, main.links_read)
+
+            # Keep the coordinator alive until the session ends
+            main.stop_event.wait(max(0.0, coordinator.t0 + main.session_duration - time.time()))
+            completed = True
+            log_with_timestamp("Coordinator: session has ended, stopping workers.")
+        except KeyboardInterrupt:
+            log_with_timestamp("KeyboardInterrupt detected, stopping workers.")
+        summary, phase_metrics = coordinator.stop(completed)
+        log_with_timestamp(
+            f"Coordinator: {summary['joined']}/{summary['bots']} bots joined across {summary['workers']} workers.")
+        main.write_run_report(report_path, summary=summary, phase_metrics=phase_metrics)
+    finally:
+        coordinator.close()
+        for worker in workers:
+            worker.wait()
+        if main.results_store is not None:
+            main.results_store.close()
+        log_with_timestamp("Coordinator exiting.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed load test coordinator and worker.")
+    subparsers = parser.add_subparsers(dest='role')
+    worker_parser = subparsers.add_parser('worker', help="run bots for a coordinator")
+    worker_parser.add_argument('--connect', default=listen_address, help="coordinator host:port")
+    worker_parser.add_argument('--name', default=f"{os.uname().nodename}-{os.getpid()}")
+    parser.add_argument('--local-workers', type=int, default=local_workers)
+    args = parser.parse_args()
+
+    if args.role == 'worker':
+        run_worker(args.connect, args.name)
+    else:
+        run_coordinator(args.local_workers)
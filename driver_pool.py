@@ -0,0 +1,123 @@
+import time
+import traceback
+from collections import deque
+from threading import Condition, Thread
+
+
+def ping(driver):
+    driver.execute_script("return 1;")
+
+
+class WarmDriverPool:
+    """Keeps up to `size` started drivers ready so bots skip cold Chrome startup.
+
+    A few refill threads create drivers in the background, no faster than
+    refill_rate per second, whenever ready + in-flight drivers drop below size.
+    Sized at one batch, the pool starts the next batch's browsers while the
+    current batch is still joining. It is meant for the ramp-up only: close() it
+    once the ramp-up is over, so idle browsers do not sit out the session.
+
+    take() never waits. A bot that finds the pool empty starts a cold driver
+    rather than holding a scheduler worker, and a ready driver that no longer
+    answers ping is closed instead of handed out.
+    """
+
+    def __init__(self, new_driver, close_driver, size, refill_rate, refill_workers=4, ping=ping, log=print):
+        self.new_driver = new_driver
+        self.close_driver = close_driver
+        self.size = size
+        self.min_interval = 1.0 / refill_rate if refill_rate > 0 else 0.0
+        self.ping = ping
+        self.log = log
+        self.ready = deque()  # (driver, monotonic time it became ready)
+        self.in_flight = 0
+        self.created = 0
+        self.failed = 0
+        self.taken = 0
+        self.stale = 0
+        self.next_start = time.monotonic()
+        self.running = True
+        self.condition = Condition()
+        self.threads = [Thread(target=self._refill, name=f"driver-pool-{i}", daemon=True)
+                        for i in range(refill_workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def take(self):
+        """Return a ready driver that still answers, or None at once if there is none."""
+        while True:
+            with self.condition:
+                if not self.ready:
+                    return None
+                driver, ready_since = self.ready.popleft()
+                self.condition.notify_all()  # room for one more
+            try:
+                self.ping(driver)
+            except Exception as e:
+                self.log(f"Driver pool: a pre-warmed browser idle for {time.monotonic() - ready_since:.0f}s "
+                         f"stopped answering, closing it - {e}")
+                with self.condition:
+                    self.stale += 1
+                self._close(driver)
+                continue
+            with self.condition:
+                self.taken += 1
+            return driver
+
+    def ready_count(self):
+        with self.condition:
+            return len(self.ready)
+
+    def close(self):
+        """Stop refilling and quit the ready drivers; take() returns None from here on."""
+        with self.condition:
+            self.running = False
+            drivers = [driver for driver, _ in self.ready]
+            self.ready.clear()
+            self.condition.notify_all()
+        for driver in drivers:
+            self._close(driver)
+        for thread in self.threads:
+            thread.join()
+
+    def _refill(self):
+        while True:
+            with self.condition:
+                while self.running and len(self.ready) + self.in_flight >= self.size:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                self.in_flight += 1
+                start_at = max(self.next_start, time.monotonic())
+                self.next_start = start_at + self.min_interval
+
+            delay = start_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)  # refill_rate limit
+
+            driver = None
+            try:
+                driver = self.new_driver()
+            except Exception as e:
+                traceback_str = ''.join(traceback.format_exception(None, e, e.__traceback__))
+                self.log(f"Driver pool: driver creation failed. Retrying in 5 seconds.\n{traceback_str}")
+
+            with self.condition:
+                self.in_flight -= 1
+                if driver is None:
+                    self.failed += 1
+                    self.next_start = max(self.next_start, time.monotonic() + 5)  # Wait before retrying
+                elif self.running:
+                    self.created += 1
+                    self.ready.append((driver, time.monotonic()))
+                    self.condition.notify_all()
+                    driver = None
+            if driver is not None:
+                # Pool was closed while this driver was starting
+                self._close(driver)
+
+    def _close(self, driver):
+        try:
+            self.close_driver(driver)
+        except Exception as e:
+            self.log(f"Driver pool: exception while closing a pre-warmed browser - {e}")
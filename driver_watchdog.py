@@ -0,0 +1,185 @@
+"""Driver watchdog: find joined bots whose browser hung or crashed, so they can be recycled.
+
+Every interval seconds each idle joined bot gets a heartbeat, a trivial
+execute_script run by a pool of `workers` threads. A heartbeat that raises
+(crashed tab, dead chromedriver) or has not answered after timeout seconds marks
+the browser as failed. So does an action of the bot's that has been running for
+more than action_timeout seconds, since a hung renderer blocks the action's own
+WebDriver call. Busy bots get no heartbeat: chromedriver runs a session's
+commands one at a time, so a heartbeat queued behind a long wait would look hung.
+A bot is busy while it runs an action or has a health sample out, and the busy
+callable is asked again just before the heartbeat is sent, since an action can
+start between the tick and the heartbeat worker picking the bot up.
+
+A failed browser is handed to on_failure(bot_id, driver, reason) once, on the
+watchdog's own thread, never on the scheduler. The harness then kills the
+browser's process tree with kill_driver_tree and sends the bot back through the
+join steps. A heartbeat stuck on a hung browser holds its worker until the
+browser is killed, so the pool is never waiting on a browser nobody will kill.
+"""
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import procstats
+from metrics import LatencyHistogram
+
+HEARTBEAT_JS = "return document.readyState;"
+
+
+def kill_driver_tree(driver):
+    """SIGKILL the driver's chromedriver and every browser process under it; returns the number killed.
+
+    Bots hosted as browser contexts (bots_per_browser > 1) share a Chrome and
+    have no chromedriver of their own, so nothing is killed for them; the
+    harness kills their host instead when the host itself stopped answering.
+    """
+    process = getattr(getattr(driver, 'service', None), 'process', None)
+    if process is None:
+        return 0
+    killed = 0
+    # Children first, so none is left running under init once chromedriver is gone
+    for pid in reversed(procstats.process_tree(process.pid)):
+        try:
+            os.kill(pid, signal.SIGKILL)
+            killed += 1
+        except OSError:
+            pass  # already exited
+    return killed
+
+
+class DriverWatchdog:
+    def __init__(self, interval, timeout, bots, on_failure, workers=4, action_timeout=180, busy=None, log=print):
+        self.interval = interval
+        self.timeout = timeout
+        self.bots = bots  # callable returning [(bot_id, driver, busy_since)]; busy_since is monotonic, or None if idle
+        self.busy = busy  # callable returning True while anything else is using bot_id's driver
+        self.on_failure = on_failure
+        self.action_timeout = action_timeout
+        self.log = log
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="driver-watchdog")
+        self.reporter = ThreadPoolExecutor(max_workers=1, thread_name_prefix="driver-watchdog-report")
+        self.lock = Lock()
+        self.in_flight = {}  # bot_id -> (driver, monotonic start) of the heartbeat being waited for
+        self.reported = {}  # bot_id -> the last driver handed to on_failure
+        self.latencies = LatencyHistogram()
+        self.heartbeats = 0
+        self.heartbeat_errors = 0
+        self.heartbeat_timeouts = 0
+        self.action_timeouts = 0
+        self.skipped_busy = 0
+        self.failures = 0
+        self.stopped = False
+
+    def start(self, scheduler):
+        self.scheduler = scheduler
+        self.log(f"Driver watchdog: heartbeat every {self.interval}s, {self.timeout}s timeout.")
+        due = time.monotonic() + self.interval
+        scheduler.call_at(due, self.tick, due)
+
+    def tick(self, due):
+        if self.stopped:
+            return
+        self.scheduler.call_at(due + self.interval, self.tick, due + self.interval)
+        now = time.monotonic()
+        for bot_id, driver, busy_since in self.bots():
+            if busy_since is not None:
+                if now - busy_since > self.action_timeout:
+                    with self.lock:
+                        self.action_timeouts += 1
+                    self.fail(bot_id, driver, f"an action has been running for {now - busy_since:.0f}s")
+                else:
+                    with self.lock:
+                        self.skipped_busy += 1
+                continue
+            if self.busy is not None and self.busy(bot_id):
+                with self.lock:
+                    self.skipped_busy += 1
+                continue
+            with self.lock:
+                if bot_id in self.in_flight:
+                    continue  # the last heartbeat is still out; its own timer judges it
+                self.in_flight[bot_id] = (driver, None)
+            self.executor.submit(self.heartbeat, bot_id, driver)
+
+    def heartbeat(self, bot_id, driver):
+        started = time.monotonic()
+        with self.lock:
+            if self.stopped:
+                self.in_flight.pop(bot_id, None)
+                return
+        if self.busy is not None and self.busy(bot_id):
+            with self.lock:
+                self.in_flight.pop(bot_id, None)
+                self.skipped_busy += 1
+            return
+        with self.lock:
+            self.in_flight[bot_id] = (driver, started)
+        self.scheduler.call_at(started + self.timeout, self.check, bot_id, started)
+        try:
+            driver.execute_script(HEARTBEAT_JS)
+            error = None
+        except Exception as e:
+            error = e
+        seconds = time.monotonic() - started
+        with self.lock:
+            self.in_flight.pop(bot_id, None)
+            if error is None:
+                self.heartbeats += 1
+            else:
+                self.heartbeat_errors += 1
+        if error is None:
+            self.latencies.record(seconds)
+        else:
+            self.fail(bot_id, driver, f"heartbeat failed - {type(error).__name__}: {str(error).splitlines()[0]}")
+
+    def check(self, bot_id, started):
+        # Runs on a scheduler worker (call_at callbacks do); fail() only queues the report
+        with self.lock:
+            driver, heartbeat_started = self.in_flight.get(bot_id, (None, None))
+            if heartbeat_started != started:
+                return
+            self.heartbeat_timeouts += 1
+        self.fail(bot_id, driver, f"no heartbeat answer in {self.timeout}s")
+
+    def fail(self, bot_id, driver, reason):
+        with self.lock:
+            if self.stopped or self.reported.get(bot_id) is driver:
+                return
+            self.reported[bot_id] = driver
+            self.failures += 1
+        self.reporter.submit(self.report, bot_id, driver, reason)
+
+    def report(self, bot_id, driver, reason):
+        self.log(f"Bot_{bot_id}: Browser is unresponsive ({reason}).")
+        try:
+            self.on_failure(bot_id, driver, reason)
+        except Exception as e:
+            self.log(f"Bot_{bot_id}: Could not recycle the browser - {type(e).__name__}: {e}")
+
+    def stop(self):
+        # Do not wait: a heartbeat stuck on a hung browser returns only once the browser is closed
+        self.stopped = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.reporter.shutdown(wait=False, cancel_futures=True)
+
+    def summary(self):
+        with self.lock:
+            summary = {
+                "interval": self.interval,
+                "timeout": self.timeout,
+                "heartbeats": self.heartbeats,
+                "heartbeat_errors": self.heartbeat_errors,
+                "heartbeat_timeouts": self.heartbeat_timeouts,
+                "action_timeouts": self.action_timeouts,
+                "skipped_busy": self.skipped_busy,
+                "failures": self.failures,
+                "failed_bots": sorted(self.reported),
+            }
+        latency = self.latencies.summary()
+        if latency['count']:
+            summary['heartbeat_p50_ms'] = latency['p50_ms']
+            summary['heartbeat_p99_ms'] = latency['p99_ms']
+        return summary
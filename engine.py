@@ -0,0 +1,84 @@
+import heapq
+import itertools
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition, Thread, local
+
+_worker = local()
+
+
+def current_step():
+    """The step function the calling worker thread is running, or None outside a step."""
+    return getattr(_worker, 'step', None)
+
+
+class BotScheduler:
+    """Runs bot steps on a bounded worker pool and fires delayed steps from a single timer thread.
+
+    Bots never own a thread: a step either finishes, schedules the next step with
+    call_later/call_at, or parks the bot until something else submits it again.
+    """
+
+    def __init__(self, max_workers, log=print):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bot-worker")
+        self._log = log
+        self._timers = []  # heap of (deadline, sequence, fn, args)
+        self._sequence = itertools.count()
+        self._timer_condition = Condition()
+        self._running = True
+        self._timer_thread = Thread(target=self._run_timers, name="bot-timers", daemon=True)
+        self._timer_thread.start()
+
+    def submit(self, fn, *args):
+        return self._executor.submit(self._run_step, fn, args)
+
+    def call_later(self, delay, fn, *args):
+        self.call_at(time.monotonic() + delay, fn, *args)
+
+    def call_at(self, deadline, fn, *args):
+        """Run fn on the worker pool once time.monotonic() reaches deadline."""
+        with self._timer_condition:
+            if not self._running:
+                return
+            sequence = next(self._sequence)
+            heapq.heappush(self._timers, (deadline, sequence, fn, args))
+            # Only wake the timer thread if the new entry is now the earliest one.
+            if self._timers[0][1] == sequence:
+                self._timer_condition.notify()
+
+    def pending_timers(self):
+        with self._timer_condition:
+            return len(self._timers)
+
+    def shutdown(self, wait=True):
+        with self._timer_condition:
+            self._running = False
+            self._timers.clear()
+            self._timer_condition.notify()
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+        self._timer_thread.join()
+
+    def _run_step(self, fn, args):
+        _worker.step = fn
+        try:
+            fn(*args)
+        except Exception as e:
+            traceback_str = ''.join(traceback.format_exception(None, e, e.__traceback__))
+            self._log(f"Unhandled exception in scheduled step {getattr(fn, '__qualname__', fn)}:\n{traceback_str}")
+        finally:
+            _worker.step = None
+
+    def _run_timers(self):
+        with self._timer_condition:
+            while self._running:
+                if not self._timers:
+                    self._timer_condition.wait()
+                    continue
+                deadline = self._timers[0][0]
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    self._timer_condition.wait(timeout=remaining)
+                    continue
+                _, _, fn, args = heapq.heappop(self._timers)
+                self._executor.submit(self._run_step, fn, args)
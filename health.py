@@ -0,0 +1,349 @@
+"""In-session health sampling: WebRTC stats, JS heap and long tasks from every joined bot.
+
+install() adds a script to every new document of a driver, before the app loads.
+It records each RTCPeerConnection the page creates and counts long tasks
+(main-thread tasks over 50 ms). Every interval seconds the sampler takes the
+bots in bot_map and splits them into batches of batch_size. A pool of `workers`
+threads samples the batches, one execute_async_script per bot. The sampling
+cost is bounded by the pool, not the fleet. When a round is still running at
+the next tick, that tick is skipped, so a large fleet is sampled less often
+instead of piling up work. A bot that is running an action when its turn comes
+is skipped, since its sample would queue behind the action's WebDriver calls,
+and a sample whose stats have not come back after sample_timeout seconds is
+dropped, so one slow page cannot hold a worker for the whole round.
+
+Each sample becomes a point of rates and levels since the bot's previous sample:
+
+    rx_kbps, tx_kbps    media bytes received / sent, all peer connections
+    rtt_ms              mean round trip of the nominated ICE candidate pairs
+    loss_percent        inbound packets lost / (lost + received)
+    fps_decoded         inbound video frames decoded per second
+    heap_mb             performance.memory.usedJSHeapSize
+    long_tasks_per_min  long tasks per minute
+
+Per-bot series are downsampled to at most max_points points; once a series is
+full, neighbouring points are averaged. Fleet-wide p50/p90/p99 come from a
+uniform reservoir of every sample, and each round's percentiles across bots form
+a fleet series.
+"""
+import json
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from chrome_profile import execute_cdp
+
+METRICS = ('rx_kbps', 'tx_kbps', 'rtt_ms', 'loss_percent', 'fps_decoded', 'heap_mb', 'long_tasks_per_min')
+RESERVOIR_SIZE = 20000
+
+HOOK_JS = """
+(() => {
+    if (window.__health) return;
+    const health = window.__health = {pcs: [], longTasks: 0};
+    const Native = window.RTCPeerConnection;
+    if (Native) {
+        const Tracked = function (...args) {
+            const pc = new Native(...args);
+            health.pcs.push(pc);
+            return pc;
+        };
+        Tracked.prototype = Native.prototype;
+        Object.setPrototypeOf(Tracked, Native);
+        window.RTCPeerConnection = Tracked;
+        if (window.webkitRTCPeerConnection) window.webkitRTCPeerConnection = Tracked;
+    }
+    try {
+        new PerformanceObserver((list) => { health.longTasks += list.getEntries().length; })
+            .observe({entryTypes: ['longtask']});
+    } catch (e) {}
+})();
+"""
+
+SAMPLE_JS = """
+const [timeoutMs, done] = arguments;
+let finished = false;
+const finish = (result) => { if (!finished) { finished = true; clearTimeout(timer); done(result); } };
+const timer = setTimeout(() => finish(null), timeoutMs);
+const health = window.__health;
+const memory = performance.memory;
+const result = {hooked: !!health, heap: memory ? memory.usedJSHeapSize : null,
+                longTasks: health ? health.longTasks : null, pcs: 0,
+                rx: 0, tx: 0, lost: 0, received: 0, framesDecoded: 0, rtt: null};
+if (!health) { finish(result); return; }
+health.pcs = health.pcs.filter((pc) => pc.connectionState !== 'closed');
+result.pcs = health.pcs.length;
+Promise.all(health.pcs.map((pc) => pc.getStats())).then((reports) => {
+    const rtts = [];
+    for (const stats of reports) {
+        stats.forEach((report) => {
+            if (report.type === 'inbound-rtp') {
+                result.rx += report.bytesReceived || 0;
+                result.lost += Math.max(0, report.packetsLost || 0);
+                result.received += report.packetsReceived || 0;
+                if (report.kind === 'video') result.framesDecoded += report.framesDecoded || 0;
+            } else if (report.type === 'outbound-rtp') {
+                result.tx += report.bytesSent || 0;
+            } else if (report.type === 'candidate-pair' && report.nominated
+                       && report.currentRoundTripTime !== undefined) {
+                rtts.push(report.currentRoundTripTime);
+            }
+        });
+    }
+    if (rtts.length) result.rtt = rtts.reduce((a, b) => a + b, 0) / rtts.length;
+    finish(result);
+}).catch((e) => { result.error = String(e); finish(result); });
+"""
+
+
+def install(driver):
+    """Track the page's peer connections and long tasks; call before the first driver.get."""
+    execute_cdp(driver, "Page.enable", {})
+    execute_cdp(driver, "Page.addScriptToEvaluateOnNewDocument", {"source": HOOK_JS})
+
+
+def average(points):
+    merged = {"t": round(sum(point['t'] for point in points) / len(points), 1)}
+    for metric in METRICS:
+        values = [point[metric] for point in points if point.get(metric) is not None]
+        merged[metric] = round(sum(values) / len(values), 2) if values else None
+    return merged
+
+
+def percentile(values, p):
+    return values[max(0, math.ceil(len(values) * p / 100) - 1)]
+
+
+class Series:
+    """A time series of at most max_points points; when full, each point starts to cover twice as many samples."""
+
+    def __init__(self, max_points):
+        self.max_points = max_points
+        self.points = []
+        self.pending = []
+        self.stride = 1
+
+    def add(self, point):
+        self.pending.append(point)
+        if len(self.pending) < self.stride:
+            return
+        self.points.append(average(self.pending))
+        self.pending = []
+        if len(self.points) > self.max_points:
+            self.points = [average(self.points[i:i + 2]) for i in range(0, len(self.points), 2)]
+            self.stride *= 2
+
+    def export(self):
+        return self.points + ([average(self.pending)] if self.pending else [])
+
+
+class Reservoir:
+    """A uniform random sample of at most size values (algorithm R)."""
+
+    def __init__(self, size, seed=None):
+        self.size = size
+        self.values = []
+        self.seen = 0
+        self.random = random.Random(seed)
+
+    def add(self, value):
+        self.seen += 1
+        if len(self.values) < self.size:
+            self.values.append(value)
+        else:
+            index = self.random.randrange(self.seen)
+            if index < self.size:
+                self.values[index] = value
+
+
+class HealthSampler:
+    def __init__(self, interval, bots, workers=4, batch_size=25, max_points=180, busy=None, sample_timeout=5,
+                 log=print):
+        self.interval = interval
+        self.bots = bots  # callable returning [(bot_id, driver)] for the bots to sample
+        self.busy = busy  # callable returning True while bot_id is running an action, checked again per sample
+        self.sample_timeout = sample_timeout
+        self.batch_size = batch_size
+        self.max_points = max_points
+        self.log = log
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="health-sampler")
+        self.lock = Lock()
+        self.started = None
+        self.previous = {}  # bot_id -> (monotonic, raw sample)
+        self.series = {}  # bot_id -> Series
+        self.fleet_series = Series(max_points)
+        self.reservoirs = {metric: Reservoir(RESERVOIR_SIZE, seed=metric) for metric in METRICS}
+        self.latest = {}  # metric -> this round's values across bots, for live gauges
+        self.failed_bots = set()
+        self.in_flight = set()  # bot_ids whose sample is running, for the driver watchdog
+        self.rounds = 0
+        self.skipped_rounds = 0
+        self.samples = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.skipped_busy = 0
+        self.round_seconds = []
+        self.round_running = False
+        self.round = None
+        self.stopped = False
+
+    def start(self, scheduler):
+        self.started = time.monotonic()
+        self.scheduler = scheduler
+        self.log(f"Health sampling every {self.interval}s.")
+        scheduler.call_at(self.started + self.interval, self.tick, self.started + self.interval)
+
+    def tick(self, due):
+        if self.stopped:
+            return
+        self.scheduler.call_at(due + self.interval, self.tick, due + self.interval)
+        with self.lock:
+            if self.round_running:
+                self.skipped_rounds += 1
+                return
+            self.round_running = True
+        bots = self.bots()
+        if not bots:
+            with self.lock:
+                self.round_running = False
+            return
+        batches = [bots[i:i + self.batch_size] for i in range(0, len(bots), self.batch_size)]
+        self.round = {"started": time.monotonic(), "pending": len(batches), "values": {m: [] for m in METRICS}}
+        for batch in batches:
+            self.executor.submit(self.sample_batch, batch)
+
+    def sample_batch(self, batch):
+        for bot_id, driver in batch:
+            if self.stopped:
+                break
+            if self.busy is not None and self.busy(bot_id):
+                with self.lock:
+                    self.skipped_busy += 1
+                continue
+            with self.lock:
+                self.in_flight.add(bot_id)
+            try:
+                raw = driver.execute_async_script(SAMPLE_JS, int(self.sample_timeout * 1000))
+            except Exception as e:
+                self.record_error(bot_id, e)
+                continue
+            finally:
+                with self.lock:
+                    self.in_flight.discard(bot_id)
+            if raw is None:
+                with self.lock:
+                    self.timeouts += 1
+                continue
+            self.record(bot_id, time.monotonic(), raw)
+        with self.lock:
+            self.round['pending'] -= 1
+            if self.round['pending']:
+                return
+            self.finish_round()
+
+    def sampling(self, bot_id):
+        with self.lock:
+            return bot_id in self.in_flight
+
+    def record_error(self, bot_id, error):
+        with self.lock:
+            self.errors += 1
+            first = bot_id not in self.failed_bots
+            self.failed_bots.add(bot_id)
+        if first:
+            self.log(f"Bot_{bot_id}: Health sample failed - {error}")
+
+    def record(self, bot_id, now, raw):
+        with self.lock:
+            previous = self.previous.get(bot_id)
+            self.previous[bot_id] = (now, raw)
+            self.samples += 1
+            if previous is None:
+                return  # rates need two samples
+            point = self.point(now, raw, *previous)
+            self.series.setdefault(bot_id, Series(self.max_points)).add(point)
+            for metric in METRICS:
+                if point[metric] is not None:
+                    self.reservoirs[metric].add(point[metric])
+                    self.round['values'][metric].append(point[metric])
+
+    def point(self, now, raw, previous_time, previous):
+        seconds = now - previous_time
+        point = {"t": round(now - self.started, 1)}
+        # Cumulative counters go backwards when the page reloads or replaces a connection
+        restarted = raw['rx'] < previous['rx'] or raw['tx'] < previous['tx'] or raw['received'] < previous['received']
+        if restarted or not raw['pcs']:
+            point.update(rx_kbps=None, tx_kbps=None, loss_percent=None, fps_decoded=None)
+        else:
+            lost = raw['lost'] - previous['lost']
+            received = raw['received'] - previous['received']
+            point['rx_kbps'] = round((raw['rx'] - previous['rx']) * 8 / 1000 / seconds, 1)
+            point['tx_kbps'] = round((raw['tx'] - previous['tx']) * 8 / 1000 / seconds, 1)
+            point['loss_percent'] = round(100 * lost / (lost + received), 2) if lost + received > 0 else None
+            point['fps_decoded'] = round((raw['framesDecoded'] - previous['framesDecoded']) / seconds, 1)
+        point['rtt_ms'] = round(raw['rtt'] * 1000, 1) if raw['rtt'] is not None else None
+        point['heap_mb'] = round(raw['heap'] / (1024 * 1024), 1) if raw['heap'] is not None else None
+        if raw['longTasks'] is not None and previous['longTasks'] is not None \
+                and raw['longTasks'] >= previous['longTasks']:
+            point['long_tasks_per_min'] = round((raw['longTasks'] - previous['longTasks']) * 60 / seconds, 1)
+        else:
+            point['long_tasks_per_min'] = None
+        return point
+
+    def finish_round(self):
+        # Called with the lock held by the worker that sampled the round's last batch
+        now = time.monotonic()
+        self.rounds += 1
+        self.round_seconds.append(now - self.round['started'])
+        fleet_point = {"t": round(now - self.started, 1)}
+        for metric, values in self.round['values'].items():
+            values.sort()
+            fleet_point[metric] = percentile(values, 90) if values else None
+        self.fleet_series.add(fleet_point)
+        self.latest = self.round['values']
+        self.round_running = False
+
+    def latest_percentile(self, metric, p):
+        values = self.latest.get(metric)
+        return percentile(values, p) if values else 0.0
+
+    def stop(self):
+        self.stopped = True
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def summary(self):
+        with self.lock:
+            fleet = {}
+            for metric, reservoir in self.reservoirs.items():
+                values = sorted(reservoir.values)
+                if values:
+                    fleet[metric] = {"p50": percentile(values, 50), "p90": percentile(values, 90),
+                                     "p99": percentile(values, 99), "max": values[-1]}
+            round_seconds = sorted(self.round_seconds)
+            return {
+                "interval": self.interval,
+                "rounds": self.rounds,
+                "skipped_rounds": self.skipped_rounds,
+                "bots_sampled": len(self.previous),
+                "samples": self.samples,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "skipped_busy": self.skipped_busy,
+                "round_seconds_p50": round(percentile(round_seconds, 50), 3) if round_seconds else None,
+                "round_seconds_max": round(round_seconds[-1], 3) if round_seconds else None,
+                "fleet": fleet,
+            }
+
+    def write_series(self, path):
+        """Per-bot series and the fleet's per-round p90s, t in seconds since sampling started."""
+        with self.lock:
+            data = {
+                "interval": self.interval,
+                "metrics": list(METRICS),
+                "fleet_p90": self.fleet_series.export(),
+                "bots": {str(bot_id): series.export() for bot_id, series in sorted(self.series.items())},
+            }
+        with open(path, 'w') as series_file:
+            json.dump(data, series_file)
+        self.log(f"Health series written to {path}.")
@@ -1,19 +1,39 @@
 import json
+import math
 import os
 import time
 import traceback
 import random
+from collections import deque
 from datetime import datetime
-from threading import Thread, Lock, Condition, Event
+from itertools import islice
+from threading import Lock, Condition, Event
 
 from selenium import webdriver
-from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys  # Added for key presses
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
+
+from browser_contexts import SharedBrowserPool
+from camera_feed import CameraFeeds
+from chrome_profile import LeanProfile
+from driver_pool import WarmDriverPool
+from driver_watchdog import DriverWatchdog, kill_driver_tree
+import engine
+from engine import BotScheduler
+import health
+from health import HealthSampler
+import readiness
+import vote_barrier
+from metrics import PhaseMetrics, serve_prometheus
+from ramp_controller import RampController
+from results_store import FINISHED_STATUSES, ResultsStore
+from scenario import Timeline, bots_with_action, default_scenario, load_scenario
+from screenshots import ScreenshotPipeline
+from structured_log import LogPipeline
+import whiteboard_load
+from whiteboard_load import StrokeGenerator, StrokeStats
 
 # Global variables and synchronization primitives
 bots_in_session = 0
@@ -29,6 +49,9 @@ bots_completed_lock = Lock()
 bot_map = {}
 bot_map_lock = Lock()
 
+# Every BotTask started by launch_bots, keyed by bot_id
+bot_tasks = {}
+
 # Event to signal threads to stop
 stop_event = Event()
 
@@ -37,9 +60,66 @@ current_group = -1  # Initialize to -1 so that no group proceeds until set
 group_condition = Condition()
 bot_join_condition = Condition()
 
+# Joined bots waiting for their group, keyed by group_id (guarded by group_condition)
+parked_bots = {}
+
+# Pre-warmed drivers for the ramp-up, started by main() when driver_pool.size > 0 and closed by ramp_up
+driver_pool = None
+
+# Monotonic timestamps of the ramp-up, filled in by ramp_up and BotTask.join
+ramp_timings = {}
+
+# Every bot that confirmed its join during this run (guarded by bot_map_lock)
+joined_bot_ids = set()
+
+# Seconds to add to the local wall clock; a distributed worker sets it to the coordinator's clock
+clock_offset = 0.0
+
+# Latency histograms and outcome counters for every bot phase
+run_metrics = PhaseMetrics()
+
+# When each bot's vote fired, as epoch seconds on the coordinator's clock (guarded by vote_fire_times_lock)
+vote_fire_times = {}
+vote_deadlines = {}  # bot_id -> the vote deadline it aimed at, epoch seconds on the coordinator's clock
+vote_fire_times_lock = Lock()
+
+# Runs protocol bots on its own asyncio loop, started by main() when protocol_bots.share > 0
+protocol_engine = None
+
+# Bot ids handed to protocol_engine instead of a browser
+protocol_bot_ids = set()
+
+# Adjusts the number of concurrent join attempts while ramp_up runs in adaptive mode
+ramp_controller = None
+
+# Scenario timeline driving the bots' actions once their group is activated
+timeline = None
+
+# Samples WebRTC stats and page health from the joined bots
+health_sampler = None
+
+# Heartbeats the joined bots' browsers and recycles the ones that hung or crashed
+driver_watchdog = None
+
+# Per-link outcomes persisted across runs, opened by main() unless results.path is empty
+results_store = None
+
+# Each started bot's result row, as last queued to results_store (guarded by bot_results_lock)
+bot_results = {}
+bot_results_lock = Lock()
+
+# Line number of the last link of session_links.txt taken into this run (at most num_bots links), set by select_bots
+links_read = 0
+
+# Set once the timeline ran the session to its end, so bots still in it are completed, not interrupted
+session_completed = False
 
-def log_with_timestamp(message):
-    print(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {message}")
+
+def log_with_timestamp(message, **fields):
+    """Queue message for the log writer; fields (event, error, ...) are added to its JSONL record."""
+    log_pipeline.log(message, **fields)
+    if 'error' in fields and results_store is not None:
+        record_bot_error(fields['error'])
 
 
 # Read configuration from config.json
@@ -53,122 +133,608 @@ open_camera = config_data['open_camera']
 vote = config_data['vote']
 vote_time = config_data['vote_time']
 group_size = config_data.get('group_size', 20)  # Read group_size from config
+logging_config = config_data.get('logging', {})
+log_path = logging_config.get('path', 'run_log.jsonl')  # JSONL records, see structured_log.py; empty: no file
+log_pipeline = LogPipeline(
+    path=log_path,
+    max_bytes=logging_config.get('max_mb', 100) * 1024 * 1024,  # rotate at this size
+    backup_count=logging_config.get('backup_count', 3),
+    console=logging_config.get('console', 'full'),  # full, summary or off
+    summary_interval=logging_config.get('summary_interval', 5.0),
+    rate_limit_per_event=logging_config.get('rate_limit_per_event', 0),  # records per second, 0: no limit
+    rate_limits=logging_config.get('rate_limits', {}),  # per event, overriding rate_limit_per_event
+    group_size=group_size,
+)
 whiteboard = config_data.get('whiteboard', False)  # Read whiteboard parameter
+max_workers = config_data.get('max_workers', batch_size)  # Bot steps that may run at the same time
+bots_per_browser = config_data.get('bots_per_browser', 1)  # >1 hosts bots as browser contexts in one Chrome
+driver_pool_config = config_data.get('driver_pool', {})
+driver_pool_size = driver_pool_config.get('size', 0)  # 0 disables the pre-warmed pool
+driver_pool_refill_rate = driver_pool_config.get('refill_rate', 2.0)  # drivers started per second
+driver_pool_refill_workers = driver_pool_config.get('refill_workers', 4)
+metrics_config = config_data.get('metrics', {})
+run_report_path = metrics_config.get('report_path', 'run_report.json')
+prometheus_port = metrics_config.get('prometheus_port', 0)  # 0 disables the live /metrics endpoint
+protocol_config = config_data.get('protocol_bots', {})
+protocol_share = protocol_config.get('share', 0.0)  # fraction of bots that replay traffic instead of running Chrome
+protocol_flow_path = protocol_config.get('flow', 'protocol_flow.json')
+protocol_max_concurrent_joins = protocol_config.get('max_concurrent_joins', 200)
+chrome_profile_config = config_data.get('chrome_profile', {})
+chrome_profile_mode = chrome_profile_config.get('mode', 'default')  # default, or lean: see chrome_profile.py
+lean_profile = LeanProfile(
+    blocked_urls=chrome_profile_config.get('blocked_urls'),  # CDP URL patterns; None blocks the built-in list
+    renderer_process_limit=chrome_profile_config.get('renderer_process_limit', 1),
+    js_heap_mb=chrome_profile_config.get('js_heap_mb', 512),
+    shared_cache_dir=chrome_profile_config.get('shared_cache_dir', ''),  # seeded with chrome_profile.py
+)
+camera_feed_config = config_data.get('camera_feed', {})
+camera_feeds = CameraFeeds(
+    camera_feed_config.get('source', 'test-video.Y4M'),
+    camera_feed_config.get('directory', '/dev/shm/loadtest-camera'),  # tmpfs, so Chrome's mappings share RAM
+    camera_feed_config.get('variants', [{"width": 560, "height": 320, "fps": 15, "loop_seconds": 8}]),
+    feeds_per_variant=camera_feed_config.get('feeds_per_variant', 0),  # 0: one stream per camera bot
+    noise=camera_feed_config.get('noise', 0),
+    log=log_with_timestamp,
+)
+ramp_config = config_data.get('ramp', {})
+ramp_mode = ramp_config.get('mode', 'batch')  # batch: fixed batch_size batches, adaptive: RampController
+scenario_file = config_data.get('scenario_file', '')  # empty: the open_camera/vote/whiteboard sequence
+whiteboard_config = config_data.get('whiteboard_load', {})
+strokes_per_second = whiteboard_config.get('strokes_per_second', 2.0)  # per drawing bot, see whiteboard_load.py
+stroke_batch_interval = whiteboard_config.get('batch_interval', 1.0)  # seconds between a bot's batches
+stroke_dispatch = whiteboard_config.get('dispatch', 'actions')  # actions (W3C Actions) or events (in-page)
+stroke_points = whiteboard_config.get('points_per_stroke', 16)
+stroke_move_ms = whiteboard_config.get('move_ms', 0)  # pointer move duration in actions mode
+stroke_mix = whiteboard_config.get('mix', {'curve': 0.5, 'shape': 0.3, 'text': 0.2})
+stroke_stats = StrokeStats(stroke_batch_interval)
+health_config = config_data.get('health', {})
+health_interval = health_config.get('interval', 10)  # seconds between sampling rounds, 0 disables
+health_workers = health_config.get('workers', 4)  # threads sampling, however many bots there are
+health_batch_size = health_config.get('batch_size', 25)
+health_max_points = health_config.get('max_points', 180)  # per-bot series are downsampled to this
+health_series_path = health_config.get('series_path', 'health_series.json')
+health_sample_timeout = health_config.get('sample_timeout', 5)  # seconds before a bot's sample is dropped
+watchdog_config = config_data.get('watchdog', {})
+watchdog_interval = watchdog_config.get('interval', 15)  # seconds between heartbeats, 0 disables
+watchdog_timeout = watchdog_config.get('timeout', 10)  # a heartbeat slower than this marks the browser hung
+watchdog_action_timeout = watchdog_config.get('action_timeout', 180)  # so does an action running this long
+watchdog_workers = watchdog_config.get('workers', 4)
+results_config = config_data.get('results', {})
+results_path = results_config.get('path', 'results.db')  # SQLite file, see results_store.py; empty: no store
+results_mode = results_config.get('mode', 'new')  # new, resume or rerun_failed
+results_run_id = results_config.get('run_id', '')  # the run to resume or rerun; empty: the latest run
+results_flush_interval = results_config.get('flush_interval', 1.0)  # seconds between batched writes
 
 vote_time_strp = datetime.strptime(vote_time, "%Y-%m-%d %H:%M:%S")
 
+# Longest wait for each step of joining a session
+JOIN_TIMEOUT = 60
+
+# The cookie pop-up's accept button, and how long it may take to show up after the join button
+COOKIE_BUTTON = '#c-p-bn'
+COOKIE_GRACE_SECONDS = 3
+
 # Define screenshot_dir as a global variable
 screenshot_dir = "screenshots"
 os.makedirs(screenshot_dir, exist_ok=True)
 
+# Screenshots are grabbed as base64 on the bot's thread and written by a background pool
+screenshot_config = config_data.get('screenshots', {})
+screenshot_pipeline = ScreenshotPipeline(
+    screenshot_dir,
+    mode=screenshot_config.get('mode', 'all'),  # all, failures or off
+    sample_rate=screenshot_config.get('sample_rate', 1.0),  # share of non-failure screenshots kept
+    disk_budget_mb=screenshot_config.get('disk_budget_mb', 500),
+    scale=screenshot_config.get('scale', 0.5),
+    jpeg_quality=screenshot_config.get('jpeg_quality', 60),
+    writer_threads=screenshot_config.get('writer_threads', 2),
+    log=log_with_timestamp,
+)
+
+
+# Settings recorded with each run in the results store
+RESULT_SETTINGS = ('num_bots', 'batch_size', 'group_size', 'session_duration', 'open_camera', 'vote', 'vote_time',
+                   'whiteboard', 'scenario_file')
+
+# Phases whose success sets an outcome flag on the bot's result row
+OUTCOME_PHASES = {
+    'join_click': 'joined',
+    'join_confirmation': 'confirmed',
+    'vote_click': 'voted',
+    'stroke_batch': 'drew',
+    'protocol_vote': 'voted',
+    'protocol_draw': 'drew',
+}
+
 
 def read_links_from_file(file_path):
+    """Yield (line_number, link) one line at a time; blank lines keep their number but yield nothing."""
     with open(file_path, 'r') as file:
-        return [line.strip() for line in file.readlines()]
+        for line_number, line in enumerate(file, start=1):
+            link = line.strip()
+            if link:
+                yield line_number, link
+
+
+def select_bots(links):
+    """Yield the (bot_id, link) pairs this run launches out of the first num_bots links; bot_id is the line number.
+
+    A resumed run skips the links its earlier attempts finished; a rerun_failed run
+    launches only the links that failed in its source run. A link is matched by
+    its line number and text, so a line that was edited since counts as a new link.
+    """
+    global links_read
+    skip = keep = None
+    if results_store is not None and results_store.mode == 'resume':
+        skip = results_store.bot_links(results_store.source_run, FINISHED_STATUSES)
+        log_with_timestamp(f"Results: resuming run {results_store.run_id}, {len(skip)} links already finished.")
+    elif results_store is not None and results_store.mode == 'rerun_failed':
+        keep = results_store.bot_links(results_store.source_run, ('failed',))
+        log_with_timestamp(f"Results: rerunning the {len(keep)} failed links of run {results_store.source_run}.")
+    links_read = 0
+    for bot_id, link in islice(links, num_bots):
+        links_read = bot_id
+        if skip is not None and (bot_id, link) in skip:
+            continue
+        if keep is not None and (bot_id, link) not in keep:
+            continue
+        yield bot_id, link
+
+
+def chrome_options_for_bot(incognito=True):
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    if incognito:
+        chrome_options.add_argument("--incognito")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--window-size=1920x1080")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-popup-blocking")
+    chrome_options.add_argument("--disable-application-cache")
+    chrome_options.add_argument("--disable-infobars")
+    chrome_options.add_argument("--disable-logging")
+    chrome_options.add_argument("--disable-notifications")
+    chrome_options.add_argument("--disable-translate")
+    chrome_options.add_argument("--no-first-run")
+    chrome_options.add_argument("--disable-background-networking")
+    chrome_options.add_argument("--disable-sync")
+    # Keep page timers on time so armed votes fire at the deadline
+    chrome_options.add_argument("--disable-background-timer-throttling")
+    chrome_options.add_argument("--disable-renderer-backgrounding")
+    chrome_options.add_argument("--disable-backgrounding-occluded-windows")
+    chrome_options.add_argument("--disable-default-apps")
+    chrome_options.add_argument("--mute-audio")
+    chrome_options.add_argument("--use-fake-device-for-media-stream")
+    chrome_options.add_argument("--use-fake-ui-for-media-stream")
+    chrome_options.add_experimental_option("prefs", {
+        "profile.default_content_setting_values.media_stream_camera": 1,
+        "profile.default_content_setting_values.media_stream_mic": 1,
+        "profile.default_content_setting_values.geolocation": 1,
+        "profile.default_content_setting_values.notifications": 1
+    })
+    chrome_options.add_experimental_option("useAutomationExtension", False)
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    return chrome_options
+
+
+def new_chrome_driver(camera_feed_path=None):
+    service = Service('/usr/local/bin/chromedriver')
+    cache_dir = None
+    if chrome_profile_mode == 'lean':
+        # Incognito has no disk cache, so a bot reading the shared cache runs in a fresh profile instead
+        chrome_options = chrome_options_for_bot(incognito=not lean_profile.has_shared_cache())
+        cache_dir = lean_profile.apply(chrome_options)
+    else:
+        chrome_options = chrome_options_for_bot()
+    if camera_feed_path is not None:
+        chrome_options.add_argument(f"--use-file-for-fake-video-capture={camera_feed_path}")
+    try:
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    except Exception:
+        lean_profile.remove_bot_cache(cache_dir)
+        raise
+    driver.bot_cache_dir = cache_dir
+    return driver
 
 
-def perform_action(bot_id, driver, bot_name):
-    global screenshot_dir, open_camera, vote, vote_time_strp, whiteboard
-    wait = WebDriverWait(driver, 15)
-    max_retries = 3
+# With bots_per_browser > 1, bots are browser contexts inside shared Chrome processes
+shared_browsers = SharedBrowserPool(bots_per_browser, new_chrome_driver) if bots_per_browser > 1 else None
 
-    screenshot_path = os.path.join(screenshot_dir, f"{bot_name}_debug_before_action.png")
-    driver.save_screenshot(screenshot_path)
-    log_with_timestamp(f"{bot_name}: Screenshot saved to {screenshot_path}")
 
-    # Open camera if needed
-    if open_camera and bot_id <= 15:
+def acquire_driver(bot_id=None):
+    camera_feed_path = camera_feeds.feed_for(bot_id)
+    if camera_feed_path is not None:
+        # A camera bot gets a Chrome of its own: a shared host has a single fake camera for all its bots
+        driver = new_chrome_driver(camera_feed_path)
+    elif shared_browsers is not None:
+        driver = shared_browsers.new_bot_driver()
+    else:
+        driver = new_chrome_driver()
+    readiness.prepare_driver(driver)
+    if chrome_profile_mode == 'lean':
+        lean_profile.block_urls(driver)
+    if health_interval:
         try:
-            time.sleep(5)
-            camera_button = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'button.footer-button.icon-background-image[data-action="open-cam"]')))
-
-            # Make the button visible
-            driver.execute_script("arguments[0].scrollIntoView(true);", camera_button)
-
-            # Try clicking via JavaScript
-            for _ in range(5):
-                try:
-                    driver.execute_script("arguments[0].click();", camera_button)
-                    time.sleep(3)
-                    log_with_timestamp(f"{bot_name}: Opened camera.")
-                    break
-                except ElementClickInterceptedException:
-                    screenshot_path = os.path.join(screenshot_dir, f"{bot_name}_couldnt_open_camera.png")
-                    driver.save_screenshot(screenshot_path)
-                    log_with_timestamp(f"{bot_name}: Screenshot saved to {screenshot_path}")
-                    log_with_timestamp(f"{bot_name}: Retrying camera button click.")
-                    time.sleep(1)
+            health.install(driver)
         except Exception as e:
-            screenshot_path = os.path.join(screenshot_dir, f"{bot_name}_couldnt_open_camera.png")
-            driver.save_screenshot(screenshot_path)
-            log_with_timestamp(f"{bot_name}: Screenshot saved to {screenshot_path}")
-            log_with_timestamp(f"{bot_name}: Exception while opening camera - {e}")
-
-    # Wait until it's time to vote
-    if vote:
-        # Wait for the voting interface to be ready
-        log_with_timestamp(f"{bot_name}: Waiting for voting interface to be ready.")
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.custom-quiz")))
-        log_with_timestamp(f"{bot_name}: Voting interface is ready.")
-
-        if datetime.now() < vote_time_strp:
-            while datetime.now() < vote_time_strp:
-                log_with_timestamp(f"{bot_name}: Waiting for the vote time.")
-                time.sleep(1)  # Reduced sleep time for responsiveness
-
-        log_with_timestamp(f"{bot_name}: Ready to vote.")
-        retry_attempts = 3  # Number of retry attempts
-        for attempt in range(retry_attempts):
-            try:
-                option_css = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "div.custom-quiz:first-of-type")))
-                option_css.click()
-                log_with_timestamp(f"{bot_name}: Option A selected.")
-
-                send_button_css = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button.answer-button")))
-                send_button_css.click()
-                log_with_timestamp(f"{bot_name}: Sent the answer.")
-                break  # If successful, exit the loop
-            except Exception as e:
-                if attempt < retry_attempts - 1:
-                    log_with_timestamp(
-                        f"{bot_name}: Attempt {attempt + 1} failed, retrying... Exception: {type(e).__name__} - {repr(e)}")
-                    screenshot_path = os.path.join(screenshot_dir, f"{bot_name}_failed_to_vote_attempt_{attempt}.png")
-                    driver.save_screenshot(screenshot_path)
-                    log_with_timestamp(f"{bot_name}: Screenshot saved to {screenshot_path}")
-                    time.sleep(2)
-                else:
-                    traceback_str = ''.join(traceback.format_exception(None, e, e.__traceback__))
-                    log_with_timestamp(f"{bot_name}: Failed to vote after {retry_attempts} attempts.\n{traceback_str}")
+            log_with_timestamp(f"Could not install the health hooks, only heap and long tasks are sampled - {e}",
+                               error=e)
+    return driver
+
+
+def quit_driver(driver):
+    if shared_browsers is not None and shared_browsers.release(driver):
+        return
+    driver.quit()
+    lean_profile.remove_bot_cache(getattr(driver, 'bot_cache_dir', None))
+
+
+def start_protocol_engine():
+    global protocol_engine
+    if protocol_share <= 0:
+        return
+    # aiohttp is only needed when protocol bots are enabled
+    from protocol_bot import ProtocolBotEngine, load_flow
+    protocol_engine = ProtocolBotEngine(
+        load_flow(protocol_flow_path),
+        run_metrics,
+        on_join_attempt=protocol_join_attempted,
+        on_vote=protocol_vote_fired,
+        attach=lambda bot: timeline.attach(bot),  # the scenario's actions, as for browser bots
+        max_concurrent_joins=protocol_max_concurrent_joins,
+        on_phase=protocol_phase_recorded,
+        on_error=protocol_error,
+        log=log_with_timestamp,
+    )
+    log_with_timestamp(f"Protocol bots enabled for {protocol_share:.0%} of bots, flow {protocol_flow_path}.")
+
+
+def is_protocol_bot(bot_id):
+    # Spread protocol bots evenly over the bot ids so every batch and group gets its share
+    return math.floor(round(bot_id * protocol_share, 9)) > math.floor(round((bot_id - 1) * protocol_share, 9))
+
+
+def prepare_camera_feeds():
+    # Any cohort of the scenario may open the camera, not only the default one that open_camera adds
+    camera_bots = [bot_id for bot_id in bots_with_action(load_timeline_scenario(), 'open_camera', num_bots)
+                   if not is_protocol_bot(bot_id)]
+    if not camera_bots:
+        return
+    try:
+        camera_feeds.prepare(camera_bots)
+        log_with_timestamp(f"Camera feeds ready for {len(camera_bots)} camera bots: "
+                           f"{len(camera_feeds.paths)} files, "
+                           f"{camera_feeds.total_bytes() // (1024 * 1024)} MB in {camera_feeds.directory}.")
+    except Exception as e:
+        log_with_timestamp(f"Could not prepare camera feeds, bots will use Chrome's test pattern - {e}", error=e)
+
 
-    # If whiteboard is True, perform drawing
-    if whiteboard:
-        perform_drawing(bot_id, driver, bot_name)
+def bot_busy(bot_id):
+    """True while the bot runs an action: its WebDriver session is in use, so probes would queue behind it."""
+    task = bot_tasks.get(bot_id)
+    return task is not None and task.action_started is not None
+
+
+def start_health_sampler(scheduler):
+    global health_sampler
+    if not health_interval:
+        return
+
+    def live_bots():
+        with bot_map_lock:
+            joined = list(bot_map.items())
+        return [(bot_id, driver) for bot_id, driver in joined if not bot_busy(bot_id)]
 
+    health_sampler = HealthSampler(health_interval, live_bots, workers=health_workers, batch_size=health_batch_size,
+                                   max_points=health_max_points, busy=bot_busy,
+                                   sample_timeout=health_sample_timeout, log=log_with_timestamp)
+    health_sampler.start(scheduler)
 
-def perform_drawing(bot_id, driver, bot_name):
-    import random  # Ensure the random module is imported
-    wait = WebDriverWait(driver, 30)
+
+def start_driver_watchdog(scheduler):
+    global driver_watchdog
+    if not watchdog_interval:
+        return
+
+    def watched_bots():
+        with bot_map_lock:
+            joined = list(bot_map.items())
+        return [(bot_id, driver, bot_tasks[bot_id].action_started) for bot_id, driver in joined]
+
+    def driver_in_use(bot_id):
+        return bot_busy(bot_id) or (health_sampler is not None and health_sampler.sampling(bot_id))
+
+    driver_watchdog = DriverWatchdog(watchdog_interval, watchdog_timeout, watched_bots, recycle_bot,
+                                     workers=watchdog_workers, action_timeout=watchdog_action_timeout,
+                                     busy=driver_in_use, log=log_with_timestamp)
+    driver_watchdog.start(scheduler)
+
+
+def recycle_bot(bot_id, driver, reason):
+    """Watchdog callback: kill a hung or crashed browser and send its bot back through the join steps."""
+    detected_at = time.monotonic()
+    task = bot_tasks.get(bot_id)
+    with bot_map_lock:
+        if task is None or bot_map.get(bot_id) is not driver:
+            return  # the bot left or closed since its heartbeat
+        bot_map.pop(bot_id)
+    killed = kill_driver_tree(driver)
+    if not killed and shared_browsers is not None:
+        # A context driver has no processes of its own; a crashed host takes all of its bots with it
+        host = shared_browsers.retire_dead_host(driver)
+        if host is not None:
+            killed = kill_driver_tree(host.host_driver)
+            log_with_timestamp(f"{task.bot_name}: Its host browser is not answering, replacing the host.")
+    log_with_timestamp(f"{task.bot_name}: Killed {killed} browser processes ({reason}), recycling the bot.")
+    task.recycle(detected_at)
+
+
+def open_results_store(run_id=None, mode='new', source_run=None):
+    """Open results_path and register a run per results_mode, or write to run_id, registered by a coordinator."""
+    global results_store
+    if not results_path:
+        return
+    results_store = ResultsStore(results_path, flush_interval=results_flush_interval, log=log_with_timestamp)
+    if run_id is None:
+        mode = results_mode
+        if mode != 'new':
+            source_run = results_run_id or results_store.latest_run()
+        settings = {key: config_data[key] for key in RESULT_SETTINGS if key in config_data}
+        run_id = results_store.begin_run(mode, source_run, settings=settings)
+    else:
+        results_store.join_run(run_id, mode, source_run)
+    run_metrics.observer = record_bot_phase
+    log_with_timestamp(f"Results: run {run_id} ({mode}) in {results_path}.")
+
+
+def new_result(bot_id, link, kind):
+    if results_store is None:
+        return
+    with bot_results_lock:
+        row = bot_results[bot_id] = {
+            'bot_id': bot_id, 'link': link, 'kind': kind, 'status': 'started', 'joined': 0, 'confirmed': 0,
+            'voted': 0, 'drew': 0, 'recycles': 0, 'phases': {}, 'started_at': time.time(),
+        }
+        queue_result(row)
+
+
+def update_result(bot_id, **fields):
+    """Set fields (status, outcome flags, ...) on bot_id's result row and queue the row."""
+    if results_store is None:
+        return
+    with bot_results_lock:
+        row = bot_results.get(bot_id)
+        if row is not None:
+            row.update(fields)
+            queue_result(row)
+
+
+def queue_result(row):
+    # Called with bot_results_lock held; the writer thread gets a copy, the row keeps changing
+    results_store.put(dict(row, phases=dict(row['phases'])))
+
+
+def note_phase(bot_id, phase, seconds, ok):
+    with bot_results_lock:
+        row = bot_results.get(bot_id)
+        if row is None:
+            return
+        row['phases'][phase] = round(seconds, 3)
+        if not ok:
+            row.setdefault('failed_phase', phase)  # the first, not the join_total wrapped around it
+        elif phase in OUTCOME_PHASES:
+            row[OUTCOME_PHASES[phase]] = 1
+        queue_result(row)
+
+
+def record_bot_phase(phase, seconds, ok):
+    """run_metrics observer: keep the phase on the result row of the bot whose step recorded it."""
+    task = getattr(engine.current_step(), '__self__', None)
+    if isinstance(task, BotTask):
+        note_phase(task.bot_id, phase, seconds, ok)
+
+
+def record_bot_error(error):
+    task = getattr(engine.current_step(), '__self__', None)
+    if isinstance(task, BotTask):
+        note_error(task.bot_id, error)
+
+
+def note_error(bot_id, error):
+    lines = str(error).splitlines()
+    update_result(bot_id, error_type=type(error).__name__, error=lines[0] if lines else '')
+
+
+def result_rows():
+    """Copies of this process's result rows, for a coordinator worker's report."""
+    with bot_results_lock:
+        return [dict(row) for row in bot_results.values()]
+
+
+def finish_results():
+    """Settle the rows of bots still starting or in the session, then flush and close the store."""
+    if results_store is None:
+        return
+    with bot_results_lock:
+        for row in bot_results.values():
+            if row['status'] == 'started' or (row['status'] == 'joined' and not session_completed):
+                row['status'] = 'interrupted'
+            elif row['status'] == 'joined':
+                row['status'] = 'completed'
+            else:
+                continue
+            queue_result(row)
+    results_store.close()
+    log_with_timestamp(f"Results: {results_store.summary()['statuses']} written to {results_path}.")
+
+
+def start_driver_pool():
+    global driver_pool
+    if driver_pool_size > 0:
+        driver_pool = WarmDriverPool(acquire_driver, quit_driver, driver_pool_size, driver_pool_refill_rate,
+                                     refill_workers=driver_pool_refill_workers, log=log_with_timestamp)
+        log_with_timestamp(f"Started a pool of {driver_pool_size} pre-warmed browser instances.")
+
+
+def dismiss_cookie_pop_up(driver, bot_name, timeout):
+    """Accept the cookie pop-up if it is up or shows up within timeout seconds; False if it did not."""
+    cookies_button = readiness.wait_for_element(driver, COOKIE_BUTTON, timeout)
+    if cookies_button is None:
+        return False
+    cookies_button.click()
+    log_with_timestamp(f"{bot_name}: Accepted cookies.")
+    return True
+
+
+def join_session(driver, bot_name, batch=None):
+    # Handle cookies pop-up if it appears; it can show up before or shortly after the join button
+    with run_metrics.time_phase('cookie_dismissal', batch) as timing:
+        index, cookies_button = readiness.wait_for_any(driver, [COOKIE_BUTTON, 'div.perculus-button'], JOIN_TIMEOUT)
+        if index == 0:
+            cookies_button.click()
+            log_with_timestamp(f"{bot_name}: Accepted cookies.")
+        elif index == 1:
+            if not dismiss_cookie_pop_up(driver, bot_name, COOKIE_GRACE_SECONDS):
+                screenshot_pipeline.capture(driver, bot_name, "no_cookies_pop_up")
+                log_with_timestamp(f"{bot_name}: No cookies pop-up appeared.")
+        else:
+            timing.ok = False  # neither the pop-up nor the join button: the page did not load
+            screenshot_pipeline.capture(driver, bot_name, "no_join_page", failure=True)
+            log_with_timestamp(f"{bot_name}: The join page did not appear.")
+
+    with run_metrics.time_phase('join_click', batch) as timing:
+        # A pop-up that shows up late can intercept the click; accept it before each retry
+        timing.ok = click_element_with_retries(driver, 'div.perculus-button', JOIN_TIMEOUT, retries=5, delay=2,
+                                               bot_name=bot_name,
+                                               before_retry=lambda: dismiss_cookie_pop_up(driver, bot_name, 0))
+    if not timing.ok:
+        return False
+    dismiss_cookie_pop_up(driver, bot_name, 0)
+
+    # Click 'Join Session' button via JavaScript if 'open_camera' is True
+    if open_camera:
+        try:
+            join_button = readiness.wait_for_element(driver, 'div.perculus-button-container', 5, state='present')
+            if join_button is None:
+                raise TimeoutException("div.perculus-button-container did not appear")
+            driver.execute_script("arguments[0].click();", join_button)
+            log_with_timestamp(f"{bot_name}: Clicked 'Join Session' button via JavaScript.")
+        except Exception as e:
+            screenshot_pipeline.capture(driver, bot_name, "no_join_session_button", failure=True)
+            log_with_timestamp(f"{bot_name}: 'Join Session' button not present - {e}", error=e)
+
+    screenshot_pipeline.capture(driver, bot_name, "debug_session")
+    return True
+
+
+def confirm_session_join(driver, bot_name, batch=None):
+    with run_metrics.time_phase('join_confirmation', batch) as timing:
+        timing.ok = _confirm_session_join(driver, bot_name)
+    return timing.ok
+
+
+def _confirm_session_join(driver, bot_name):
+    confirmation_attempts = 5
+    for attempt in range(confirmation_attempts):
+        # Wait for a reliable indicator of session join
+        if readiness.wait_for_element(driver, 'button[data-action="open-cam"]', JOIN_TIMEOUT, state='present'):
+            log_with_timestamp(f"{bot_name}: Confirmed session join.")
+            return True
+        screenshot_pipeline.capture(driver, bot_name, "cannot_confirm_session", failure=True)
+        log_with_timestamp(
+            f"{bot_name}: Retry {attempt + 1}/{confirmation_attempts} - Waiting for session confirmation.")
+    log_with_timestamp(f"{bot_name}: Failed to confirm session join after retries.")
+    return False
+
+
+def open_camera_in_session(driver, bot_name):
+    try:
+        camera_button = readiness.wait_for_element(
+            driver, 'button.footer-button.icon-background-image[data-action="open-cam"]', 15)
+        if camera_button is None:
+            raise TimeoutException("camera button did not become clickable")
+
+        # Make the button visible
+        driver.execute_script("arguments[0].scrollIntoView(true);", camera_button)
+
+        # Click via JavaScript; the page reacting to the click within 3 seconds is the signal
+        for _ in range(5):
+            if readiness.click_and_wait_for_change(driver, camera_button, 3):
+                log_with_timestamp(f"{bot_name}: Opened camera.")
+                return True
+            screenshot_pipeline.capture(driver, bot_name, "couldnt_open_camera", failure=True)
+            log_with_timestamp(f"{bot_name}: Camera button click had no effect, retrying.")
+            # The button may have been re-rendered
+            camera_button = readiness.wait_for_element(
+                driver, 'button.footer-button.icon-background-image[data-action="open-cam"]', 5)
+            if camera_button is None:
+                raise TimeoutException("camera button is gone")
+        log_with_timestamp(f"{bot_name}: Could not open the camera.")
+    except Exception as e:
+        screenshot_pipeline.capture(driver, bot_name, "couldnt_open_camera", failure=True)
+        log_with_timestamp(f"{bot_name}: Exception while opening camera - {e}", error=e)
+    return False
+
+
+def wait_for_voting_interface(driver, bot_name):
+    log_with_timestamp(f"{bot_name}: Waiting for voting interface to be ready.")
+    if readiness.wait_for_element(driver, "div.custom-quiz", 15, state='present') is None:
+        log_with_timestamp(f"{bot_name}: Voting interface did not appear in time.")
+        return False
+    log_with_timestamp(f"{bot_name}: Voting interface is ready.")
+    return True
+
+
+def cast_vote(driver, bot_name):
+    log_with_timestamp(f"{bot_name}: Ready to vote.")
+    retry_attempts = 3  # Number of retry attempts
+    for attempt in range(retry_attempts):
+        try:
+            option_css = readiness.wait_for_element(driver, "div.custom-quiz:first-of-type", 15)
+            if option_css is None:
+                raise TimeoutException("div.custom-quiz:first-of-type did not become clickable")
+            option_css.click()
+            log_with_timestamp(f"{bot_name}: Option A selected.")
+
+            send_button_css = readiness.wait_for_element(driver, "button.answer-button", 15)
+            if send_button_css is None:
+                raise TimeoutException("button.answer-button did not become clickable")
+            send_button_css.click()
+            log_with_timestamp(f"{bot_name}: Sent the answer.")
+            return True
+        except Exception as e:
+            if attempt < retry_attempts - 1:
+                log_with_timestamp(
+                    f"{bot_name}: Attempt {attempt + 1} failed, retrying... Exception: {type(e).__name__} - {repr(e)}")
+                screenshot_pipeline.capture(driver, bot_name, f"failed_to_vote_attempt_{attempt}", failure=True)
+                readiness.wait_for_change(driver, 2)  # retry as soon as the page changes
+            else:
+                traceback_str = ''.join(traceback.format_exception(None, e, e.__traceback__))
+                log_with_timestamp(f"{bot_name}: Failed to vote after {retry_attempts} attempts.\n{traceback_str}",
+                                   error=e)
+    return False
+
+
+def open_whiteboard(driver, bot_name):
+    """Select the pen tool; returns the canvas position and size in the viewport, or None."""
     try:
         # Step 1: Wait for the whiteboard to be visible
-        time.sleep(10)
         log_with_timestamp(f"{bot_name}: Waiting for the whiteboard to be visible.")
-        canvas = wait.until(EC.visibility_of_element_located((By.XPATH, "//div[@class='puppy-app-container']")))
+        canvas = readiness.wait_for_element(driver, "div[class='puppy-app-container']", 30, state='visible')
+        if canvas is None:
+            raise TimeoutException("whiteboard is not visible")
         log_with_timestamp(f"{bot_name}: Whiteboard is visible.")
-
         # Get canvas dimensions via JavaScript to ensure accuracy
         canvas_bounds = driver.execute_script("return arguments[0].getBoundingClientRect();", canvas)
         canvas_width = canvas_bounds['width']
         canvas_height = canvas_bounds['height']
         log_with_timestamp(f"{bot_name}: Canvas dimensions - width: {canvas_width}, height: {canvas_height}")
 
-        # Set maximum drawing size based on canvas dimensions
-        max_drawing_size = min(100, canvas_width / 2 - 1, canvas_height / 2 - 1)
-
-        # Step 2: Generate random starting position within safe bounds
-        start_x = random.uniform(max_drawing_size, canvas_width - max_drawing_size)
-        start_y = random.uniform(max_drawing_size, canvas_height - max_drawing_size)
-
-        # Move to the random starting position and click to focus
+        # Step 2: Click at a random position to focus the canvas
+        start_x = random.uniform(canvas_width / 4, canvas_width * 3 / 4)
+        start_y = random.uniform(canvas_height / 4, canvas_height * 3 / 4)
         action_chains = webdriver.ActionChains(driver)
         action_chains.move_to_element_with_offset(canvas, int(start_x), int(start_y))
         action_chains.click()
@@ -180,305 +746,831 @@ def perform_drawing(bot_id, driver, bot_name):
         action_chains.send_keys('x')
         action_chains.perform()
         log_with_timestamp(f"{bot_name}: Pressed 'x' to select the pen tool.")
-
-        # Step 4: Calculate drawing offsets within bounds
-        # Calculate maximum allowable offsets
-        max_offset_right = canvas_width - start_x - 1
-        max_offset_down = canvas_height - start_y - 1
-        max_offset_left = start_x - 1
-        max_offset_up = start_y - 1
-
-        # Set drawing size and limit offsets to prevent out-of-bounds movement
-        drawing_size = 200  # Adjust the size as needed for larger drawings
-        offset_right = min(drawing_size, max_offset_right)
-        offset_down = min(drawing_size, max_offset_down)
-        offset_left = -min(drawing_size, max_offset_left)
-        offset_up = -min(drawing_size, max_offset_up)
-
-        # Perform drawing within the canvas bounds
-        action_chains.reset_actions()
-        action_chains.move_to_element_with_offset(canvas, int(start_x), int(start_y))
-        action_chains.click_and_hold()
-        action_chains.move_by_offset(offset_right, 0)
-        action_chains.move_by_offset(0, offset_down)
-        action_chains.move_by_offset(offset_left, 0)
-        action_chains.move_by_offset(0, offset_up)
-        action_chains.release()
-        action_chains.perform()
-        log_with_timestamp(f"{bot_name}: Performed larger drawing on the whiteboard.")
+        return canvas_bounds
 
     except TimeoutException:
         log_with_timestamp(f"{bot_name}: Whiteboard did not become visible in time.")
     except Exception as e:
-        screenshot_path = os.path.join(screenshot_dir, f"{bot_name}_drawing_exception.png")
-        driver.save_screenshot(screenshot_path)
-        log_with_timestamp(f"{bot_name}: Exception during drawing - {e}")
-        log_with_timestamp(f"{bot_name}: Screenshot saved to {screenshot_path}")
-
+        log_with_timestamp(f"{bot_name}: Exception during drawing - {e}", error=e)
+        screenshot_pipeline.capture(driver, bot_name, "drawing_exception", failure=True)
+    return None
 
 
+def draw_stroke_batch(bot_id, driver, bot_name, canvas_bounds, strokes, batch=None):
+    """Draw strokes in one WebDriver round trip, recording the dispatch latency and the strokes drawn."""
+    started = time.monotonic()
+    try:
+        drawn = whiteboard_load.dispatch(driver, strokes, canvas_bounds['left'], canvas_bounds['top'],
+                                         mode=stroke_dispatch, move_ms=stroke_move_ms)
+        ok = True
+    except Exception as e:
+        log_with_timestamp(f"{bot_name}: Exception while drawing strokes - {e}", error=e)
+        drawn = 0
+        ok = False
+    run_metrics.record('stroke_batch', time.monotonic() - started, ok=ok, batch=batch)
+    stroke_stats.record(bot_id, drawn, started, ok=ok)
+    return ok
+
+
+def mark_join_attempt_completed():
+    global bots_completed
+    with bots_completed_lock:
+        bots_completed += 1
+    # Notify the main thread that this bot has completed its attempt
+    with bot_join_condition:
+        bot_join_condition.notify()
+
+
+def protocol_join_attempted(bot_id, ok, seconds):
+    if ramp_controller is not None:
+        ramp_controller.record_attempt(ok, seconds)
+    if ok:
+        with bot_map_lock:
+            if bot_id not in joined_bot_ids:
+                ramp_timings['last_join'] = time.monotonic()
+            joined_bot_ids.add(bot_id)
+            ramp_timings.setdefault('first_join', time.monotonic())
+    mark_join_attempt_completed()
+
+
+def protocol_vote_fired(bot_id, fired_at, deadline):
+    fired_at += clock_offset
+    deadline += clock_offset
+    with vote_fire_times_lock:
+        vote_fire_times[bot_id] = fired_at
+        vote_deadlines[bot_id] = deadline
+    run_metrics.record('vote_fire_lateness', max(0.0, fired_at - deadline))
+
+
+def protocol_phase_recorded(bot_id, phase, seconds, ok):
+    # Protocol bots run on the engine's asyncio thread, where record_bot_phase cannot tell whose phase it is
+    if results_store is None:
+        return
+    note_phase(bot_id, phase, seconds, ok)
+    if phase == 'protocol_join':  # the first join or a rejoin
+        update_result(bot_id, status='joined' if ok else 'failed', joined=int(ok), confirmed=int(ok))
+    elif phase == 'protocol_leave' and ok:
+        update_result(bot_id, status='left')
+
+
+def protocol_error(bot_id, error):
+    if results_store is not None:
+        note_error(bot_id, error)
+
+
+class BotTask:
+    """One bot's join -> confirm -> group wait -> scenario actions lifecycle.
+
+    Each method is a single step run on a scheduler worker. Fixed delays between
+    steps are scheduler timers. Once its group is activated the bot's actions come
+    from the scenario timeline, which queues them on the bot as they fall due;
+    they run one at a time, and an idle bot holds no thread until it is closed.
+    """
+
+    def __init__(self, bot_id, link, scheduler, batch=None):
+        self.bot_id = bot_id
+        self.link = link
+        self.scheduler = scheduler
+        self.batch = batch
+        self.bot_name = f"Bot_{bot_id}"
+        self.group_id = (bot_id - 1) // group_size
+        self.started_at = None
+        self.driver = None
+        self.driver_attempt = 0
+        self.closed = False
+        self.lock = Lock()
+        self.actions = deque()  # (action, deadline) pairs from the timeline, oldest first
+        self.action_running = False
+        self.left = False  # the bot left the session and has no browser
+        self.rejoining = False
+        self.vote_deadline = None
+        self.canvas_bounds = None  # set once the whiteboard is open in this browser
+        self.strokes = None
+        self.stroke_stream = 0  # bumped for every new stream, so an older stream's timer stops
+        self.stroke_rate = 0.0
+        self.stroke_until = None
+        self.stroke_carry = 0.0
+        self.stroke_batch_queued = False
+        self.action_started = None  # when the running action started, for the watchdog
+        self.camera_open = False
+        self.recycling_since = None  # when the watchdog found the browser dead, until the bot has rejoined
+        self.reopen_whiteboard = False
+        self.recycles = 0
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self.scheduler.submit(self.create_driver)
+
+    def create_driver(self):
+        if self.should_stop():
+            return
+        max_driver_retries = 3
+        self.driver_attempt += 1
+        try:
+            with run_metrics.time_phase('driver_creation', self.batch):
+                # Pre-warmed browsers have no camera feed, so camera bots always start their own
+                if driver_pool is not None and camera_feeds.feed_for(self.bot_id) is None:
+                    self.driver = driver_pool.take()
+                if self.driver is not None:
+                    log_with_timestamp(f"{self.bot_name}: Took a pre-warmed browser instance.")
+                else:
+                    self.driver = acquire_driver(self.bot_id)
+                    log_with_timestamp(f"{self.bot_name}: Created a new browser instance.")
+        except Exception as e:
+            if self.driver_attempt < max_driver_retries:
+                log_with_timestamp(
+                    f"{self.bot_name}: Driver creation failed on attempt {self.driver_attempt}. Retrying...")
+                self.scheduler.call_later(5, self.create_driver)  # Wait before retrying
+            else:
+                log_with_timestamp(
+                    f"{self.bot_name}: Driver creation failed after {max_driver_retries} attempts. Exception: {e}",
+                    error=e)
+                self.finish_join_attempt(False)
+                self.close()
+            return
+        self.scheduler.submit(self.open_link)
+
+    def open_link(self):
+        if self.should_stop():
+            return
+        try:
+            with run_metrics.time_phase('driver_get', self.batch):
+                self.driver.get(self.link)
+            log_with_timestamp(f"{self.bot_name}: Opened link: {self.link}")
+        except Exception as e:
+            traceback_str = ''.join(traceback.format_exception(None, e, e.__traceback__))
+            log_with_timestamp(f"{self.bot_name}: An error occurred:\n{traceback_str}", error=e)
+            self.finish_join_attempt(False)
+            self.close()
+            return
+        # The join step waits for the page to show the cookie pop-up or the join button
+        self.scheduler.submit(self.join)
+
+    def join(self):
+        if self.should_stop():
+            return
+        isJoined = False
+        isConfirmed = False
+        try:
+            isJoined = join_session(self.driver, self.bot_name, batch=self.batch)
+            if isJoined:
+                # Confirm that the bot has fully joined the session
+                isConfirmed = confirm_session_join(self.driver, self.bot_name, batch=self.batch)
+            else:
+                log_with_timestamp(f"{self.bot_name}: Failed to join the session.")
+        except Exception as e:
+            traceback_str = ''.join(traceback.format_exception(None, e, e.__traceback__))
+            log_with_timestamp(f"{self.bot_name}: An error occurred:\n{traceback_str}", error=e)
+        finally:
+            self.finish_join_attempt(isJoined and isConfirmed)
 
-def create_browser_instance(bot_id, link, open_camera):
-    global bots_in_session, current_group, bots_completed
+        if not (isJoined and isConfirmed):
+            # Bot did not join; close the driver
+            self.close()
+            return
 
-    isConfirmed = False
-    isJoined = False
-    bot_name = f"Bot_{bot_id}"
+        with bot_map_lock:
+            bot_map[self.bot_id] = self.driver
+            if self.bot_id not in joined_bot_ids:
+                ramp_timings['last_join'] = time.monotonic()  # rejoins do not count
+            joined_bot_ids.add(self.bot_id)
+            ramp_timings.setdefault('first_join', time.monotonic())
+            log_with_timestamp(f"{self.bot_name}: Bot has fully joined and is ready.")
+        if self.rejoining:
+            self.rejoining = False
+            self.left = False
+            self.action_done()
+            return
+        self.wait_for_group()
+
+    def wait_for_group(self):
+        log_with_timestamp(f"{self.bot_name}: Waiting for group {self.group_id} to be activated.")
+        with group_condition:
+            if current_group < self.group_id:
+                # Parked until activate_group() hands the bot back to the scheduler
+                parked_bots.setdefault(self.group_id, []).append(self)
+                return
+        self.on_group_activated()
+
+    def on_group_activated(self):
+        if self.should_stop():
+            return
+        log_with_timestamp(f"{self.bot_name}: Group {self.group_id} activated.")
+        timeline.attach(self)
+
+    def enqueue_action(self, action, deadline):
+        """Called by the timeline when an action falls due (deadline is time.monotonic())."""
+        with self.lock:
+            self.actions.append((action, deadline))
+            if self.action_running:
+                return
+            self.action_running = True
+        self.scheduler.submit(self.next_action)
+
+    def next_action(self):
+        if self.should_stop():
+            return
+        with self.lock:
+            if not self.actions:
+                self.action_running = False
+                self.action_started = None
+                return
+            action, deadline = self.actions.popleft()
+            self.action_started = time.monotonic()
+        if self.left and action['action'] not in ('rejoin', 'recycle'):
+            log_with_timestamp(f"{self.bot_name}: Skipping {action['action']}, the bot has left the session.")
+            self.action_done()
+            return
+        handlers = {
+            'screenshot': self.screenshot_action,
+            'open_camera': self.open_camera_action,
+            'vote': self.vote_action,
+            'draw': self.draw_action,
+            'leave': self.leave_action,
+            'rejoin': self.rejoin_action,
+            'stroke_batch': self.stroke_batch_action,
+            'recycle': self.recycle_action,
+        }
+        try:
+            handlers[action['action']](action, deadline)
+        except Exception as e:
+            traceback_str = ''.join(traceback.format_exception(None, e, e.__traceback__))
+            log_with_timestamp(f"{self.bot_name}: {action['action']} failed:\n{traceback_str}", error=e)
+            self.action_done()
+
+    def action_done(self):
+        self.scheduler.submit(self.next_action)
+
+    def screenshot_action(self, action, deadline):
+        screenshot_pipeline.capture(self.driver, self.bot_name, action.get('label', 'scenario'))
+        self.action_done()
+
+    def open_camera_action(self, action, deadline):
+        with run_metrics.time_phase('camera_open', self.batch) as timing:
+            timing.ok = open_camera_in_session(self.driver, self.bot_name)
+        self.camera_open = self.camera_open or timing.ok
+        self.action_done()
+
+    def vote_action(self, action, deadline):
+        if not wait_for_voting_interface(self.driver, self.bot_name):
+            self.action_done()
+            return
+
+        # Arm the page to fire the vote itself at the deadline (on this host's clock)
+        local_vote_time = time.time() + (deadline - time.monotonic())
+        self.vote_deadline = local_vote_time + clock_offset
+        try:
+            with run_metrics.time_phase('vote_arm', self.batch) as timing:
+                armed = timing.ok = vote_barrier.arm(self.driver, max(local_vote_time, time.time()))
+        except Exception as e:
+            log_with_timestamp(f"{self.bot_name}: Could not arm the vote - {e}", error=e)
+            armed = False
+
+        if armed:
+            log_with_timestamp(f"{self.bot_name}: Vote armed, waiting for the vote time.")
+            self.scheduler.call_at(deadline, self.collect_vote_step)
+        elif deadline > time.monotonic():
+            log_with_timestamp(f"{self.bot_name}: Waiting for the vote time.")
+            self.scheduler.call_at(deadline, self.cast_vote_step)
+        else:
+            self.cast_vote_step()
 
-    max_driver_retries = 3
-    driver = None
-    wait = None
+    def collect_vote_step(self):
+        if self.should_stop():
+            return
+        try:
+            result = vote_barrier.collect(self.driver, timeout=30)
+        except Exception as e:
+            log_with_timestamp(f"{self.bot_name}: Could not read the armed vote - {e}", error=e)
+            result = None
+        if result is None or result['fired_at'] is None:
+            log_with_timestamp(f"{self.bot_name}: Armed vote did not fire, voting directly. "
+                               f"Error: {result and result['error']}")
+            self.cast_vote_step()
+            return
+
+        fired_at = result['fired_at'] + clock_offset
+        with vote_fire_times_lock:
+            vote_fire_times[self.bot_id] = fired_at
+            vote_deadlines[self.bot_id] = self.vote_deadline
+        run_metrics.record('vote_fire_lateness', max(0.0, fired_at - self.vote_deadline), batch=self.batch)
+        log_with_timestamp(f"{self.bot_name}: Option A selected.")
+        if result['sent_at'] is not None:
+            run_metrics.record('vote_click', result['sent_at'] - result['fired_at'], batch=self.batch)
+            log_with_timestamp(f"{self.bot_name}: Sent the answer.")
+        else:
+            run_metrics.record('vote_click', 0.0, ok=False, batch=self.batch)
+            log_with_timestamp(f"{self.bot_name}: Failed to send the answer - {result['error']}")
+        self.action_done()
+
+    def cast_vote_step(self):
+        if self.should_stop():
+            return
+        with run_metrics.time_phase('vote_click', self.batch) as timing:
+            timing.ok = cast_vote(self.driver, self.bot_name)
+        self.action_done()
+
+    def draw_action(self, action, deadline):
+        """Open the whiteboard and draw at strokes_per_second for duration seconds (default: the session)."""
+        if self.canvas_bounds is None:
+            with run_metrics.time_phase('drawing', self.batch) as timing:
+                self.canvas_bounds = open_whiteboard(self.driver, self.bot_name)
+                timing.ok = self.canvas_bounds is not None
+            if self.canvas_bounds is None:
+                self.action_done()
+                return
+            self.strokes = StrokeGenerator(self.canvas_bounds['width'], self.canvas_bounds['height'],
+                                           seed=self.bot_id, points_per_stroke=stroke_points, mix=stroke_mix)
+
+        self.stroke_rate = action.get('strokes_per_second', strokes_per_second)
+        duration = action.get('duration')
+        self.stroke_until = time.monotonic() + duration if duration is not None else None
+        self.stroke_carry = 0.0
+        self.stroke_stream += 1
+        log_with_timestamp(f"{self.bot_name}: Drawing {self.stroke_rate} strokes per second.")
+        self.draw_strokes()
+        if self.stroke_rate > 0 and duration != 0:
+            due = time.monotonic() + stroke_batch_interval
+            self.scheduler.call_at(due, self.stroke_tick, self.stroke_stream, due)
+        self.action_done()
+
+    def stroke_tick(self, stream, due):
+        # Runs on a scheduler worker, like every call_at callback: queue the batch behind any running action
+        if stream != self.stroke_stream or self.closed or (self.left and self.recycling_since is None):
+            return  # a recycled bot's batches wait behind its rejoin instead
+        if self.stroke_until is not None and due > self.stroke_until:
+            log_with_timestamp(f"{self.bot_name}: Finished drawing.")
+            return
+        self.scheduler.call_at(due + stroke_batch_interval, self.stroke_tick, stream, due + stroke_batch_interval)
+        with self.lock:
+            if self.stroke_batch_queued:
+                # The last batch has not run yet; do not let batches pile up behind a slow browser
+                stroke_stats.missed()
+                return
+            self.stroke_batch_queued = True
+        self.enqueue_action({'action': 'stroke_batch'}, due)
+
+    def stroke_batch_action(self, action, deadline):
+        with self.lock:
+            self.stroke_batch_queued = False
+        if self.canvas_bounds is None and self.reopen_whiteboard:
+            # The bot was drawing when its browser was recycled
+            self.reopen_whiteboard = False
+            self.canvas_bounds = open_whiteboard(self.driver, self.bot_name)
+        if self.canvas_bounds is not None:
+            self.draw_strokes()
+        self.action_done()
+
+    def draw_strokes(self):
+        # Carry the fraction, so e.g. 0.5 strokes per batch draws one stroke every other batch
+        self.stroke_carry += max(self.stroke_rate * stroke_batch_interval, 0.0 if self.stroke_rate > 0 else 1.0)
+        count = int(self.stroke_carry)
+        if count == 0:
+            return
+        self.stroke_carry -= count
+        draw_stroke_batch(self.bot_id, self.driver, self.bot_name, self.canvas_bounds, self.strokes.strokes(count),
+                          batch=self.batch)
+
+    def leave_action(self, action, deadline):
+        self.leave()
+        update_result(self.bot_id, status='left')
+        self.action_done()
+
+    def rejoin_action(self, action, deadline):
+        if not self.left:
+            self.leave()
+        # Back through create_driver -> open_link -> join, which resumes the actions
+        self.rejoining = True
+        self.started_at = time.monotonic()
+        self.driver_attempt = 0
+        update_result(self.bot_id, status='started')
+        log_with_timestamp(f"{self.bot_name}: Rejoining the session.")
+        self.create_driver()
+
+    def recycle(self, detected_at):
+        """Called by the watchdog once the browser is killed: rejoin ahead of any queued action."""
+        with self.lock:
+            self.actions.appendleft(({'action': 'recycle'}, detected_at))
+            if self.action_running:
+                return  # after the running action, which fails fast now that its browser is gone
+            self.action_running = True
+        self.scheduler.submit(self.next_action)
+
+    def recycle_action(self, action, deadline):
+        # Same link, same group: back through create_driver -> open_link -> join on a fresh browser
+        self.recycling_since = deadline
+        self.reopen_whiteboard = self.canvas_bounds is not None
+        if self.camera_open:
+            self.camera_open = False
+            with self.lock:
+                self.actions.appendleft(({'action': 'open_camera'}, time.monotonic()))
+        self.leave()
+        self.rejoining = True
+        self.started_at = time.monotonic()
+        self.driver_attempt = 0
+        self.recycles += 1
+        update_result(self.bot_id, status='started', recycles=self.recycles)
+        log_with_timestamp(f"{self.bot_name}: Rejoining the session on a new browser.")
+        self.create_driver()
+
+    def leave(self):
+        with bot_map_lock:
+            bot_map.pop(self.bot_id, None)
+        driver, self.driver = self.driver, None
+        self.left = True
+        self.canvas_bounds = None
+        if driver is not None:
+            try:
+                quit_driver(driver)
+            except Exception as e:
+                log_with_timestamp(f"{self.bot_name}: Exception while closing browser - {e}", error=e)
+        log_with_timestamp(f"{self.bot_name}: Left the session.")
+
+    def finish_join_attempt(self, ok):
+        # End-to-end join latency, from the bot being started to a confirmed join
+        seconds = time.monotonic() - self.started_at
+        update_result(self.bot_id, status='joined' if ok else 'failed')
+        if self.recycling_since is not None:
+            # Recovery time, from the watchdog finding the browser dead to the bot back in the session
+            run_metrics.record('recycle', time.monotonic() - self.recycling_since, ok=ok, batch=self.batch)
+            self.recycling_since = None
+            return
+        if self.rejoining:
+            # Rejoins are not part of the ramp-up
+            run_metrics.record('rejoin_total', seconds, ok=ok, batch=self.batch)
+            return
+        run_metrics.record('join_total', seconds, ok=ok, batch=self.batch)
+        if ramp_controller is not None:
+            ramp_controller.record_attempt(ok, seconds)
+        mark_join_attempt_completed()
+
+    def should_stop(self):
+        if self.closed:
+            return True
+        if stop_event.is_set():
+            self.close()
+            return True
+        return False
 
-    try:
-        for driver_attempt in range(max_driver_retries):
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        with bot_map_lock:
+            bot_map.pop(self.bot_id, None)
+        if self.driver is not None:
             try:
-                chrome_options = Options()
-                chrome_options.add_argument("--headless")
-                chrome_options.add_argument("--incognito")
-                chrome_options.add_argument("--disable-gpu")
-                chrome_options.add_argument("--no-sandbox")
-                chrome_options.add_argument("--window-size=1920x1080")
-                chrome_options.add_argument("--disable-dev-shm-usage")
-                chrome_options.add_argument("--disable-extensions")
-                chrome_options.add_argument("--disable-popup-blocking")
-                chrome_options.add_argument("--disable-application-cache")
-                chrome_options.add_argument("--disable-infobars")
-                chrome_options.add_argument("--disable-logging")
-                chrome_options.add_argument("--disable-notifications")
-                chrome_options.add_argument("--disable-translate")
-                chrome_options.add_argument("--no-first-run")
-                chrome_options.add_argument("--disable-background-networking")
-                chrome_options.add_argument("--disable-sync")
-                chrome_options.add_argument("--disable-default-apps")
-                chrome_options.add_argument("--mute-audio")
-                chrome_options.add_argument("--use-fake-device-for-media-stream")
-                chrome_options.add_argument("--use-fake-ui-for-media-stream")
-                chrome_options.add_experimental_option("prefs", {
-                    "profile.default_content_setting_values.media_stream_camera": 1,
-                    "profile.default_content_setting_values.media_stream_mic": 1,
-                    "profile.default_content_setting_values.geolocation": 1,
-                    "profile.default_content_setting_values.notifications": 1
-                })
-                chrome_options.add_experimental_option("useAutomationExtension", False)
-                chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-
-                service = Service('/usr/local/bin/chromedriver')
-                driver = webdriver.Chrome(service=service, options=chrome_options)
-                wait = WebDriverWait(driver, 60)
-                log_with_timestamp(f"{bot_name}: Created a new browser instance.")
-                break
+                quit_driver(self.driver)
             except Exception as e:
-                if driver_attempt < max_driver_retries - 1:
-                    log_with_timestamp(
-                        f"{bot_name}: Driver creation failed on attempt {driver_attempt + 1}. Retrying...")
-                    time.sleep(5)  # Wait before retrying
-                else:
-                    log_with_timestamp(
-                        f"{bot_name}: Driver creation failed after {max_driver_retries} attempts. Exception: {e}")
-                    with bots_completed_lock:
-                        bots_completed += 1
-                    with bot_join_condition:
-                        bot_join_condition.notify()
-                    return
-
-        driver.get(link)
-        log_with_timestamp(f"{bot_name}: Opened link: {link}")
-        time.sleep(5)
-
-        # Handle cookies pop-up if it appears
-        try:
-            cookies_button = wait.until(EC.element_to_be_clickable((By.ID, "c-p-bn")))
-            cookies_button.click()
-            log_with_timestamp(f"{bot_name}: Accepted cookies.")
-        except TimeoutException:
-            screenshot_path = os.path.join(screenshot_dir, f"{bot_name}_no_cookies_pop_up.png")
-            driver.save_screenshot(screenshot_path)
-            log_with_timestamp(f"{bot_name}: Screenshot saved to {screenshot_path}")
-            log_with_timestamp(f"{bot_name}: No cookies pop-up appeared.")
-
-        if click_element_with_retries(driver, wait, (By.CSS_SELECTOR, 'div.perculus-button'), retries=5, delay=2,
-                                      bot_name=bot_name):
-            isJoined = True
-        else:
-            isJoined = False
-
-        if isJoined:
-            # Click 'Join Session' button via JavaScript if 'open_camera' is True
-            if open_camera:
-                try:
-                    time.sleep(1)
-                    driver.execute_script("document.querySelector('div.perculus-button-container').click();")
-                    log_with_timestamp(f"{bot_name}: Clicked 'Join Session' button via JavaScript.")
-                except Exception as e:
-                    screenshot_path = os.path.join(screenshot_dir, f"{bot_name}_no_join_session_button.png")
-                    driver.save_screenshot(screenshot_path)
-                    log_with_timestamp(f"{bot_name}: Screenshot saved to {screenshot_path}")
-                    log_with_timestamp(f"{bot_name}: 'Join Session' button not present - {e}")
-
-            screenshot_path = os.path.join(screenshot_dir, f"{bot_name}_debug_session.png")
-            driver.save_screenshot(screenshot_path)
-            log_with_timestamp(f"{bot_name}: Screenshot saved to {screenshot_path}")
-
-            # Confirm that the bot has fully joined the session
-            confirmation_attempts = 5
-            for attempt in range(confirmation_attempts):
-                try:
-                    # Wait for a reliable indicator of session join
-                    session_confirm_element = wait.until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, 'button[data-action="open-cam"]')))
-                    log_with_timestamp(f"{bot_name}: Confirmed session join.")
-
-                    isConfirmed = True
-                    break
-                except TimeoutException:
-                    screenshot_path = os.path.join(screenshot_dir, f"{bot_name}_cannot_confirm_session.png")
-                    driver.save_screenshot(screenshot_path)
-                    log_with_timestamp(f"{bot_name}: Screenshot saved to {screenshot_path}")
-                    log_with_timestamp(
-                        f"{bot_name}: Retry {attempt + 1}/{confirmation_attempts} - Waiting for session confirmation.")
-                    if attempt == confirmation_attempts - 1:
-                        log_with_timestamp(
-                            f"{bot_name}: Failed to confirm session join after retries.")
-                        driver.quit()
+                log_with_timestamp(f"{self.bot_name}: Exception while closing browser - {e}", error=e)
+            log_with_timestamp(f"{self.bot_name}: Browser instance closed.")
+        log_with_timestamp(f"{self.bot_name}: Task completed.")
+
+
+def activate_group(group_id, scheduler):
+    global current_group
+    with group_condition:
+        current_group = group_id
+        released = parked_bots.pop(group_id, [])
+        log_with_timestamp(f"Group {group_id} has been activated.")
+    for task in released:
+        scheduler.submit(task.on_group_activated)
+    if protocol_engine is not None:
+        protocol_engine.activate_group(group_id)
+
+
+def start_bot(bot_id, link, scheduler, batch=None):
+    protocol = protocol_engine is not None and is_protocol_bot(bot_id)
+    new_result(bot_id, link, 'protocol' if protocol else 'browser')
+    try:
+        if protocol:
+            log_with_timestamp(f"Starting protocol Bot {bot_id} for link: {link}")
+            protocol_bot_ids.add(bot_id)
+            protocol_engine.start_bot(bot_id, link, (bot_id - 1) // group_size, batch=batch)
         else:
-            log_with_timestamp(f"{bot_name}: Failed to join the session.")
-
+            log_with_timestamp(f"Starting Bot {bot_id} for link: {link}")
+            task = BotTask(bot_id, link, scheduler, batch=batch)
+            bot_tasks[bot_id] = task
+            task.start()
     except Exception as e:
         traceback_str = ''.join(traceback.format_exception(None, e, e.__traceback__))
-        log_with_timestamp(f"{bot_name}: An error occurred:\n{traceback_str}")
+        log_with_timestamp(f"Exception occurred while starting Bot {bot_id}:\n{traceback_str}", error=e)
+        update_result(bot_id, status='failed', error_type=type(e).__name__, error=str(e))
+        mark_join_attempt_completed()
 
-    finally:
-        with bots_completed_lock:
-            bots_completed += 1
-        # Notify the main thread that this bot has completed its attempt
+
+def ramp_up(bots, scheduler):
+    """Start (bot_id, link) pairs, read as they are started, and wait until every bot has attempted to join.
+
+    Returns the number of bots started.
+    """
+    ramp_timings.clear()
+    ramp_timings['started'] = time.monotonic()
+
+    if ramp_mode == 'adaptive':
+        started = ramp_up_adaptive(iter(bots), scheduler)
+    else:
+        started = ramp_up_batches(iter(bots), scheduler)
+
+    ramp_timings['finished'] = time.monotonic()
+    if driver_pool is not None:
+        # Joins from here on are rejoins and recycles; idle browsers would only hold memory for the session
+        log_with_timestamp(f"Ramp-up over, closing the pool's {driver_pool.ready_count()} idle browsers.")
+        driver_pool.close()
+    if 'first_join' in ramp_timings:
+        log_with_timestamp(
+            f"Time to first join: {ramp_timings['first_join'] - ramp_timings['started']:.1f}s.")
+    log_with_timestamp(f"Total ramp time: {ramp_timings['finished'] - ramp_timings['started']:.1f}s.")
+    return started
+
+
+def ramp_up_batches(bots, scheduler):
+    """Start batch_size bots at a time, waiting for each batch's joining attempts."""
+    attempts_before = bots_completed
+    started = 0
+    batch_number = 0
+
+    while True:
+        batch = list(islice(bots, batch_size))
+        if not batch:
+            break
+        batch_number += 1
+        started += len(batch)
+        batch_end = attempts_before + started
+
+        # Start the current batch of bots
+        for bot_id, link in batch:
+            start_bot(bot_id, link, scheduler, batch=batch_number)
+
+        log_with_timestamp(f"Batch {batch_number} has been started.")
+
+        # Wait for all bots in the current batch to complete their joining attempt
         with bot_join_condition:
-            bot_join_condition.notify()
+            log_with_timestamp(
+                f"Waiting for batch {batch_number} bots to attempt joining. "
+                f"Currently {bots_completed} bots have completed their attempt."
+            )
+            while bots_completed < batch_end:
+                bot_join_condition.wait()
+
+        log_with_timestamp(f"Batch {batch_number} has completed joining attempts.")
+    return started
+
+
+def ramp_up_adaptive(bots, scheduler):
+    """Keep up to ramp_controller.limit joining attempts in flight, re-tuning the limit as joins finish.
+
+    Bots are reported in batches by control window: batch N holds the bots started
+    after the controller's (N-1)th update.
+    """
+    global ramp_controller
+    maximum = ramp_config.get('max_concurrency', max_workers)
+    if protocol_share < 1 and maximum > max_workers:
+        # Joins beyond max_workers would only queue for a worker, and the controller would steer on that queue
+        log_with_timestamp(f"Ramp: max_concurrency {maximum} capped at max_workers {max_workers}.")
+        maximum = max_workers
+    ramp_controller = RampController(
+        initial=ramp_config.get('initial_concurrency', 5),
+        minimum=ramp_config.get('min_concurrency', 1),
+        maximum=maximum,
+        target_join_rate=ramp_config.get('target_join_rate', 2.0),  # joined bots per second
+        max_join_seconds=ramp_config.get('max_join_seconds', 30),  # p90 ceiling
+        min_success_rate=ramp_config.get('min_success_rate', 0.9),
+        latency_growth=ramp_config.get('latency_growth', 2.0),  # median join time vs the best seen
+        max_cpu_percent=ramp_config.get('max_cpu_percent', 85),
+        min_free_memory_mb=ramp_config.get('min_free_memory_mb', 1024),
+        max_shm_percent=ramp_config.get('max_shm_percent', 80),
+        window_seconds=ramp_config.get('window_seconds', 20),
+    )
+    update_interval = ramp_config.get('update_interval', 2.0)
+    attempts_before = bots_completed
+    next_update = time.monotonic() + update_interval
+    started = 0
+    window = 1
+    exhausted = False  # every pair has been read from bots
+    log_with_timestamp(f"Adaptive ramp-up starting with {ramp_controller.limit} concurrent joins.")
+
+    while True:
+        with bot_join_condition:
+            while (started - (bots_completed - attempts_before) >= ramp_controller.limit or exhausted) \
+                    and bots_completed - attempts_before < started and time.monotonic() < next_update:
+                bot_join_condition.wait(next_update - time.monotonic())
+            finished = bots_completed - attempts_before
+        if exhausted and finished >= started:
+            break
+        if time.monotonic() >= next_update:
+            previous = ramp_controller.limit
+            limit, reason = ramp_controller.update()
+            if limit != previous:
+                log_with_timestamp(f"Ramp: concurrent joins {previous} -> {limit} ({reason}).")
+            next_update = time.monotonic() + update_interval
+            window += 1
+        # Top up to the current limit
+        while not exhausted and started - finished < ramp_controller.limit:
+            bot = next(bots, None)
+            if bot is None:
+                exhausted = True
+                break
+            ramp_controller.record_start()
+            start_bot(*bot, scheduler, batch=window)
+            started += 1
 
-    # If the bot successfully joined and confirmed, proceed to perform actions
-    if isJoined and isConfirmed:
-        with bot_map_lock:
-            bot_map[bot_id] = driver
-            log_with_timestamp(f"{bot_name}: Bot has fully joined and is ready.")
+    log_with_timestamp(f"Adaptive ramp-up finished: {ramp_controller.summary()}.")
+    return started
 
-        # Calculate group_id based on bot_id
-        group_id = (bot_id - 1) // group_size
-        log_with_timestamp(f"{bot_name}: Waiting for group {group_id} to be activated.")
 
-        # Wait for the bot's group to be activated
-        with group_condition:
-            while current_group != group_id:
-                group_condition.wait()
-            log_with_timestamp(f"{bot_name}: Group {group_id} activated.")
+def count_groups(max_bots):
+    return (max_bots + group_size - 1) // group_size
 
-        # Perform the action after the group is activated
-        perform_action(bot_id, driver, bot_name)
 
-        # Keep the driver open or close it as needed
-        while not stop_event.is_set():
-            time.sleep(1)
+def load_timeline_scenario():
+    if scenario_file:
+        return load_scenario(scenario_file)
+    return default_scenario(open_camera, vote, whiteboard)
 
-        # Clean up after stop_event is set
-        driver.quit()
-        log_with_timestamp(f"{bot_name}: Browser instance closed.")
-    else:
-        # Bot did not join; close the driver
-        driver.quit()
-        log_with_timestamp(f"{bot_name}: Browser instance closed.")
 
-    log_with_timestamp(f"{bot_name}: Task completed.")
+def end_session():
+    global session_completed
+    log_with_timestamp("Session has ended, stopping the bots.")
+    session_completed = True
+    stop_event.set()
+
+
+def start_timeline(scheduler, total_bots, t0_epoch=None, scenario=None):
+    """Start the scenario clock (T0 is now unless t0_epoch, local epoch seconds, is given)."""
+    global timeline
+    timeline = Timeline(
+        scenario or load_timeline_scenario(), scheduler, total_bots, session_duration,
+        vote_epoch=lambda: vote_time_strp.timestamp() - clock_offset,
+        on_end=end_session,
+        log=log_with_timestamp,
+    )
+    timeline.start(t0_epoch)
+    return timeline
+
+
+def activate_scheduled_group(group_id, total_groups, scheduler):
+    activate_group(group_id, scheduler)
+    if group_id == total_groups - 1:
+        log_with_timestamp("All groups have been activated.")
+
+
+def activate_groups(total_groups, scheduler):
+    # Activate each group group_interval seconds after the previous one, on the scheduler's timer
+    for group_id in range(total_groups):
+        scheduler.call_later(group_id * timeline.group_interval, activate_scheduled_group,
+                             group_id, total_groups, scheduler)
+
+
+def launch_bots(links, scheduler):
+    start_driver_watchdog(scheduler)
+    if not ramp_up(select_bots(links), scheduler):
+        log_with_timestamp("No links to launch.")
+        stop_event.set()
+        return 0
+    # Bot ids are line numbers, so groups and cohorts match a run of every link
+    max_bots = links_read
+
+    # Proceed with the bots that have successfully joined
+    log_with_timestamp("Proceeding with the bots that have successfully joined.")
+    start_timeline(scheduler, max_bots)
+    start_health_sampler(scheduler)
+    activate_groups(count_groups(max_bots), scheduler)
+    return max_bots
+
+
+def run_summary():
+    with bot_map_lock:
+        joined = sorted(joined_bot_ids)
+    summary = {
+        "bots": len(bot_tasks) + len(protocol_bot_ids),
+        "protocol_bots": len(protocol_bot_ids),
+        "join_attempts": bots_completed,
+        "joined": len(joined),
+        "joined_bot_ids": joined,
+        "screenshots": screenshot_pipeline.stats(),
+    }
+    with vote_fire_times_lock:
+        if vote_fire_times:
+            summary['vote_fire_times'] = {str(bot_id): fired_at for bot_id, fired_at in sorted(vote_fire_times.items())}
+            summary['vote_deadlines'] = {str(bot_id): deadline for bot_id, deadline in sorted(vote_deadlines.items())}
+            summary['vote_skew'] = vote_barrier.skew_summary(vote_fire_times, vote_deadlines)
+    if 'first_join' in ramp_timings:
+        summary['time_to_first_join_seconds'] = round(ramp_timings['first_join'] - ramp_timings['started'], 3)
+        summary['time_to_last_join_seconds'] = round(ramp_timings['last_join'] - ramp_timings['started'], 3)
+    if 'finished' in ramp_timings:
+        summary['ramp_seconds'] = round(ramp_timings['finished'] - ramp_timings['started'], 3)
+    if ramp_controller is not None:
+        summary['ramp'] = ramp_controller.summary()
+    whiteboard_summary = stroke_stats.summary()
+    if whiteboard_summary['batches'] or whiteboard_summary['failed_batches']:
+        summary['whiteboard'] = whiteboard_summary
+    if health_sampler is not None:
+        summary['health'] = health_sampler.summary()
+    if driver_watchdog is not None:
+        summary['watchdog'] = driver_watchdog.summary()
+    if results_store is not None:
+        summary['results'] = results_store.summary()
+    return summary
+
+
+def write_run_report(path, summary=None, phase_metrics=None):
+    report = {"summary": summary or run_summary()}
+    report.update((phase_metrics or run_metrics).report())
+    with open(path, 'w') as report_file:
+        json.dump(report, report_file, indent=4)
+    log_with_timestamp(f"Run report written to {path}.")
+
+
+def start_prometheus_endpoint():
+    if not prometheus_port:
+        return None
+    run_metrics.add_gauge('bots_live', "Bots holding a joined browser or a running protocol bot.",
+                          lambda: len(bot_map) + (protocol_engine.live_bots() if protocol_engine is not None else 0))
+    run_metrics.add_gauge('bots_joined', "Bots that confirmed their join this run.", lambda: len(joined_bot_ids))
+    run_metrics.add_gauge('join_attempts', "Bots that finished their joining attempt.", lambda: bots_completed)
+    run_metrics.add_gauge('whiteboard_strokes', "Whiteboard strokes drawn so far.", stroke_stats.strokes)
+    run_metrics.add_gauge('browsers_recycled', "Hung or crashed browsers the watchdog has recycled.",
+                          lambda: driver_watchdog.failures if driver_watchdog is not None else 0)
+    for metric, p, help_text in (('rtt_ms', 90, "p90 round trip time over the last health round, ms."),
+                                 ('loss_percent', 90, "p90 inbound packet loss over the last health round, %."),
+                                 ('rx_kbps', 50, "p50 inbound media bitrate over the last health round, kbps.")):
+        run_metrics.add_gauge(f"health_{metric}_p{p}", help_text,
+                              lambda metric=metric, p=p: health_sampler.latest_percentile(metric, p)
+                              if health_sampler is not None else 0.0)
+    server = serve_prometheus(run_metrics, prometheus_port)
+    log_with_timestamp(f"Serving live metrics on port {prometheus_port} at /metrics.")
+    return server
+
+
+def shutdown_bots(scheduler):
+    stop_event.set()
+    if driver_watchdog is not None:
+        driver_watchdog.stop()
+    if health_sampler is not None:
+        health_sampler.stop()
+        if health_series_path:
+            health_sampler.write_series(health_series_path)
+    for task in list(bot_tasks.values()):
+        scheduler.submit(task.close)
+    if protocol_engine is not None:
+        protocol_engine.stop()
+    scheduler.shutdown(wait=True)
+    finish_results()
+    if driver_pool is not None:
+        driver_pool.close()
+    if shared_browsers is not None:
+        shared_browsers.close()
+    lean_profile.cleanup()
+    screenshot_pipeline.close()
 
 
 def main():
     file_path = 'session_links.txt'
+    open_results_store()
     links = read_links_from_file(file_path)
-    global screenshot_dir, current_group, bots_completed
-    max_bots = min(len(links), num_bots)
-
-    bot_threads = []
+    scheduler = BotScheduler(max_workers=max_workers, log=log_with_timestamp)
+    prepare_camera_feeds()
+    start_driver_pool()
+    start_protocol_engine()
+    start_prometheus_endpoint()
 
     try:
-        for i in range(0, max_bots, batch_size):
-            batch_end = min(i + batch_size, max_bots)
-
-            # Start the current batch of bots
-            for bot_id in range(i + 1, batch_end + 1):
-                try:
-                    link = links[bot_id - 1]  # Adjust index for 0-based list indexing
-                    log_with_timestamp(f"Starting Bot {bot_id} for link: {link}")
-                    bot_thread = Thread(target=create_browser_instance, args=(bot_id, link, open_camera))
-                    bot_threads.append(bot_thread)
-                    bot_thread.start()
-                except Exception as e:
-                    traceback_str = ''.join(traceback.format_exception(None, e, e.__traceback__))
-                    log_with_timestamp(f"Exception occurred while starting Bot {bot_id}:\n{traceback_str}")
-                    # Increment bots_completed counter
-                    with bots_completed_lock:
-                        bots_completed += 1
-                    # Notify the bot_join_condition
-                    with bot_join_condition:
-                        bot_join_condition.notify()
-                    continue  # Move on to the next bot
-
-            log_with_timestamp(f"Batch {i // batch_size + 1} has been started.")
-
-            # Wait for all bots in the current batch to complete their joining attempt
-            with bot_join_condition:
-                while bots_completed < batch_end:
-                    log_with_timestamp(
-                        f"Waiting for batch {i // batch_size + 1} bots to attempt joining. "
-                        f"Currently {bots_completed} bots have completed their attempt."
-                    )
-                    bot_join_condition.wait(timeout=5)
-
-            log_with_timestamp(f"Batch {i // batch_size + 1} has completed joining attempts.")
-
-        # Proceed with the bots that have successfully joined
-        log_with_timestamp("Proceeding with the bots that have successfully joined.")
-
-        # Activate each group at 1-second intervals
-        total_groups = (max_bots + group_size - 1) // group_size
-        for group_id in range(total_groups):
-            with group_condition:
-                current_group = group_id
-                group_condition.notify_all()
-                log_with_timestamp(f"Group {group_id} has been activated.")
-            time.sleep(1)  # Wait 1 second between groups
-
-        log_with_timestamp("All groups have been activated.")
+        launch_bots(links, scheduler)
 
-        # Keep the main thread alive while the bots are running
-        while not stop_event.is_set():
-            time.sleep(1)
+        # Keep the main thread alive until the timeline ends the session
+        stop_event.wait()
 
     except KeyboardInterrupt:
         log_with_timestamp("KeyboardInterrupt detected, shutting down.")
-        stop_event.set()
-        # Ensure all bot threads are stopped
-        for bot_thread in bot_threads:
-            bot_thread.join()
-        log_with_timestamp("All bot threads have been closed.")
     finally:
+        shutdown_bots(scheduler)
+        log_with_timestamp("All bots have been closed.")
+        write_run_report(run_report_path)
         log_with_timestamp("Main function exiting.")
 
 
-def click_element_with_retries(driver, wait, by_locator, retries=5, delay=2, bot_name="Bot"):
+def click_element_with_retries(driver, selector, timeout, retries=5, delay=2, bot_name="Bot", before_retry=None):
     for attempt in range(retries):
         try:
-            element = wait.until(EC.element_to_be_clickable(by_locator))
+            element = readiness.wait_for_element(driver, selector, timeout)
+            if element is None:
+                raise TimeoutException(f"{selector} did not become clickable")
             element.click()
-            log_with_timestamp(f"{bot_name}: Clicked element {by_locator}.")
+            log_with_timestamp(f"{bot_name}: Clicked element {selector}.")
             return True
         except Exception as e:
             if attempt < retries - 1:
                 log_with_timestamp(
-                    f"{bot_name}: Failed to click element {by_locator} on attempt {attempt + 1}. Retrying... Exception: {e}")
-                time.sleep(delay)
+                    f"{bot_name}: Failed to click element {selector} on attempt {attempt + 1}. Retrying... Exception: {e}")
+                if before_retry is not None:
+                    before_retry()
+                readiness.wait_for_change(driver, delay)  # retry as soon as the page changes, at most delay seconds
             else:
                 log_with_timestamp(
-                    f"{bot_name}: Failed to click element {by_locator} after {retries} attempts. Exception: {e}")
-                screenshot_path = os.path.join(screenshot_dir, f"{bot_name}_failed_to_click_element_{attempt}.png")
-                driver.save_screenshot(screenshot_path)
-                log_with_timestamp(f"{bot_name}: Screenshot saved to {screenshot_path}")
+                    f"{bot_name}: Failed to click element {selector} after {retries} attempts. Exception: {e}")
+                screenshot_pipeline.capture(driver, bot_name, f"failed_to_click_element_{attempt}", failure=True)
                 return False
 
 
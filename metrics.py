@@ -0,0 +1,215 @@
+"""Per-phase latency histograms, outcome counters and their exports.
+
+Latencies are kept in log-linear buckets in the style of HdrHistogram: exact
+below 128 microseconds, then 64 buckets per power of two (better than 1.6%
+relative error). A histogram is a small dict, recording is one lock and one
+increment, and histograms from different processes merge by adding counts.
+"""
+import math
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_HALF = 1 << (SUB_BUCKET_BITS - 1)
+
+PERCENTILES = (50, 90, 99)
+
+
+def bucket_index(value):
+    shift = max(0, value.bit_length() - SUB_BUCKET_BITS)
+    return shift * SUB_BUCKET_HALF + (value >> shift)
+
+
+def bucket_upper_value(index):
+    """Highest value that lands in bucket index."""
+    if index < 2 * SUB_BUCKET_HALF:
+        return index
+    shift = index // SUB_BUCKET_HALF - 1
+    mantissa = index - shift * SUB_BUCKET_HALF
+    return ((mantissa + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = {}  # bucket index -> count, values in microseconds
+        self.total = 0
+        self.sum_us = 0
+        self.max_us = 0
+        self.lock = Lock()
+
+    def record(self, seconds):
+        value = max(0, int(seconds * 1_000_000))
+        index = bucket_index(value)
+        with self.lock:
+            self.counts[index] = self.counts.get(index, 0) + 1
+            self.total += 1
+            self.sum_us += value
+            if value > self.max_us:
+                self.max_us = value
+
+    def merge(self, exported):
+        with self.lock:
+            for index, count in exported['counts'].items():
+                index = int(index)  # JSON turns keys into strings
+                self.counts[index] = self.counts.get(index, 0) + count
+            self.total += exported['total']
+            self.sum_us += exported['sum_us']
+            self.max_us = max(self.max_us, exported['max_us'])
+
+    def export(self):
+        with self.lock:
+            return {"counts": dict(self.counts), "total": self.total, "sum_us": self.sum_us, "max_us": self.max_us}
+
+    def percentile_seconds(self, percentile):
+        with self.lock:
+            if not self.total:
+                return 0.0
+            rank = max(1, math.ceil(self.total * percentile / 100))
+            seen = 0
+            for index in sorted(self.counts):
+                seen += self.counts[index]
+                if seen >= rank:
+                    return min(bucket_upper_value(index), self.max_us) / 1_000_000
+        return self.max_us / 1_000_000
+
+    def summary(self):
+        summary = {"count": self.total}
+        if self.total:
+            summary["mean_ms"] = round(self.sum_us / self.total / 1000, 2)
+            for percentile in PERCENTILES:
+                summary[f"p{percentile}_ms"] = round(self.percentile_seconds(percentile) * 1000, 2)
+            summary["max_ms"] = round(self.max_us / 1000, 2)
+        return summary
+
+
+class PhaseTiming:
+    """Times a with-block; the phase counts as failed on an exception or if ok is set to False."""
+
+    def __init__(self, metrics, phase, batch):
+        self.metrics = metrics
+        self.phase = phase
+        self.batch = batch
+        self.ok = True
+
+    def __enter__(self):
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(self.phase, time.monotonic() - self.started, ok=self.ok and exc_type is None,
+                            batch=self.batch)
+        return False
+
+
+class PhaseMetrics:
+    def __init__(self):
+        self.histograms = {}  # (phase, batch or None) -> LatencyHistogram
+        self.outcomes = {}  # (phase, "ok" | "failed") -> count
+        self.gauges = {}  # name -> (help, callable)
+        self.observer = None  # called as observer(phase, seconds, ok) on the recording thread
+        self.lock = Lock()
+
+    def time_phase(self, phase, batch=None):
+        return PhaseTiming(self, phase, batch)
+
+    def record(self, phase, seconds, ok=True, batch=None):
+        self._histogram(phase, None).record(seconds)
+        if batch is not None:
+            self._histogram(phase, batch).record(seconds)
+        outcome = (phase, "ok" if ok else "failed")
+        with self.lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        if self.observer is not None:
+            self.observer(phase, seconds, ok)
+
+    def add_gauge(self, name, help_text, read_value):
+        self.gauges[name] = (help_text, read_value)
+
+    def _histogram(self, phase, batch):
+        key = (phase, batch)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def export(self):
+        """Raw histograms and counters, for merging in another process."""
+        with self.lock:
+            histograms = list(self.histograms.items())
+            outcomes = list(self.outcomes.items())
+        return {
+            "histograms": [[phase, batch, histogram.export()] for (phase, batch), histogram in histograms],
+            "outcomes": [[phase, outcome, count] for (phase, outcome), count in outcomes],
+        }
+
+    def merge(self, exported):
+        for phase, batch, histogram in exported['histograms']:
+            self._histogram(phase, batch).merge(histogram)
+        with self.lock:
+            for phase, outcome, count in exported['outcomes']:
+                self.outcomes[(phase, outcome)] = self.outcomes.get((phase, outcome), 0) + count
+
+    def report(self):
+        """p50/p90/p99/max per phase and per batch, with ok/failed counts per phase."""
+        with self.lock:
+            histograms = sorted(self.histograms.items(), key=lambda item: (item[0][1] is not None, item[0]))
+            outcomes = dict(self.outcomes)
+        phases = {}
+        batches = {}
+        for (phase, batch), histogram in histograms:
+            if batch is None:
+                phases[phase] = dict(histogram.summary(), ok=outcomes.get((phase, "ok"), 0),
+                                     failed=outcomes.get((phase, "failed"), 0))
+            else:
+                batches.setdefault(str(batch), {})[phase] = histogram.summary()
+        return {"phases": phases, "batches": batches}
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP loadtest_phase_seconds Latency of each bot phase.",
+            "# TYPE loadtest_phase_seconds summary",
+        ]
+        with self.lock:
+            histograms = [(phase, histogram) for (phase, batch), histogram in self.histograms.items() if batch is None]
+            outcomes = sorted(self.outcomes.items())
+            gauges = sorted(self.gauges.items())
+        for phase, histogram in sorted(histograms, key=lambda item: item[0]):
+            for percentile in PERCENTILES:
+                lines.append(f'loadtest_phase_seconds{{phase="{phase}",quantile="{percentile / 100}"}} '
+                             f'{histogram.percentile_seconds(percentile)}')
+            lines.append(f'loadtest_phase_seconds_sum{{phase="{phase}"}} {histogram.sum_us / 1_000_000}')
+            lines.append(f'loadtest_phase_seconds_count{{phase="{phase}"}} {histogram.total}')
+        lines.append("# HELP loadtest_phase_total Completed bot phases by outcome.")
+        lines.append("# TYPE loadtest_phase_total counter")
+        for (phase, outcome), count in outcomes:
+            lines.append(f'loadtest_phase_total{{phase="{phase}",outcome="{outcome}"}} {count}')
+        for name, (help_text, read_value) in gauges:
+            lines.append(f"# HELP loadtest_{name} {help_text}")
+            lines.append(f"# TYPE loadtest_{name} gauge")
+            lines.append(f"loadtest_{name} {read_value()}")
+        return "\n".join(lines) + "\n"
+
+
+def serve_prometheus(metrics, port, host='0.0.0.0'):
+    """Serve metrics.prometheus_text() on http://host:port/metrics from a daemon thread."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # keep scrapes out of the run log
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    Thread(target=server.serve_forever, name="prometheus", daemon=True).start()
+    return server
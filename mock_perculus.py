@@ -0,0 +1,421 @@
+"""Local stand-in for a Perculus session server.
+
+Serves a session page with the elements the Chrome bots look for, and speaks
+the messages in protocol_flow.json, so both kinds of bot can be run and
+measured without touching a real session:
+
+    GET  /app/       the page: cookie pop-up (#c-p-bn), join button (div.perculus-button),
+                     device prompt (div.perculus-button-container) and, once joined, the camera
+                     button (button[data-action="open-cam"]), the quiz (div.custom-quiz,
+                     button.answer-button) and the whiteboard (.puppy-app-container)
+    POST /api/join   {"session", "name", "surname"} -> {"token", "participant_id"}
+    GET  /ws?token=  join -> joined (then the open quiz, if any), answer -> answer_ack,
+                     stroke -> stroke_ack, camera, ping -> pong, leave -> socket closed
+    POST /api/quiz   {"options": [...]} opens a quiz and broadcasts it to every participant
+    POST /api/faults {"join_latency": 2.0, ...} changes fault injection while running
+    GET  /api/stats  counters
+
+The page joins over the same /api/join and /ws as a protocol bot. Opening the
+camera streams the fake capture device through a loopback peer connection, so
+the browser pays for encoding and decoding as it would against a real media
+server. Fault injection (FAULTS) delays or fails page loads, joins and socket
+messages; latencies are seconds, scaled by a random factor in [1 - jitter, 1 + jitter].
+
+    python mock_perculus.py --port 8080 --join-latency 0.5 --join-failure-rate 0.05
+    # session_links.txt: http://127.0.0.1:8080/app/?c=TEST&name=kullanici&surname=1
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import uuid
+from threading import Event, Thread
+
+from aiohttp import WSMsgType, web
+
+# name -> (default, help)
+FAULTS = {
+    'page_latency': (0.0, "seconds before /app/ answers"),
+    'join_latency': (0.0, "seconds before /api/join answers"),
+    'message_latency': (0.0, "seconds before each socket message is answered"),
+    'jitter': (0.0, "latencies are scaled by a random factor in [1 - jitter, 1 + jitter]"),
+    'page_failure_rate': (0.0, "share of page loads answered with 503"),
+    'join_failure_rate': (0.0, "share of joins answered with 503"),
+    'disconnect_rate': (0.0, "chance the server drops a participant's socket after each message"),
+    'ui_delay': (0.0, "seconds the page takes to show the join button after loading"),
+    'cookie_banner': (1.0, "share of page loads that show the cookie pop-up"),
+}
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>Perculus stand-in</title>
+<style>
+body {margin: 0; font-family: sans-serif; height: 100vh; display: flex; flex-direction: column;}
+#lobby, .footer, #quiz {flex: none; display: flex; align-items: center; gap: 12px; padding: 0 12px;}
+#lobby {height: 48px;} .footer {height: 48px;} #quiz {height: 56px;}
+.perculus-button, .perculus-button-container div {padding: 8px 20px; background: #2a6; color: #fff; cursor: pointer;}
+#session {flex: 1; display: flex; flex-direction: column; min-height: 0;}
+.puppy-app-container {flex: 1; margin: 0 12px 12px; border: 1px solid #999; min-height: 0;}
+.puppy-app-container canvas {display: block; width: 100%; height: 100%;}
+.custom-quiz {padding: 8px 16px; border: 1px solid #999; cursor: pointer;}
+.custom-quiz.selected {background: #cde;}
+#cookie-banner {position: fixed; left: 0; right: 0; bottom: 0; padding: 12px; background: #333; color: #fff;}
+</style></head>
+<body>
+<div id="lobby"><span id="status">Loading...</span></div>
+<script>
+const config = __CONFIG__;
+const params = new URLSearchParams(location.search);
+const state = {token: null, socket: null, joined: false, left: false, camera: false, media: null,
+               tool: 'select', option: null, strokes: 0};
+const lobby = document.getElementById('lobby');
+const showStatus = (text) => { document.getElementById('status').textContent = text; };
+const send = (message) => {
+    if (state.socket && state.socket.readyState === WebSocket.OPEN) state.socket.send(JSON.stringify(message));
+};
+
+if (config.cookieBanner) {
+    const banner = document.createElement('div');
+    banner.id = 'cookie-banner';
+    banner.innerHTML = 'This site uses cookies. <button id="c-p-bn">Accept</button>';
+    document.body.appendChild(banner);
+    document.getElementById('c-p-bn').addEventListener('click', () => banner.remove());
+}
+
+setTimeout(() => {
+    const button = document.createElement('div');
+    button.className = 'perculus-button';
+    button.textContent = 'Join';
+    button.addEventListener('click', join);
+    lobby.prepend(button);
+    showStatus('');
+}, config.uiDelay * 1000);
+
+async function join() {
+    if (state.token) return;
+    showStatus('Joining...');
+    if (!lobby.querySelector('.perculus-button-container')) {
+        // The device prompt; the session loads behind it whether or not it is clicked
+        const prompt = document.createElement('div');
+        prompt.className = 'perculus-button-container';
+        prompt.innerHTML = '<div>Join Session</div>';
+        prompt.addEventListener('click', () => prompt.remove());
+        lobby.appendChild(prompt);
+    }
+    try {
+        const response = await fetch('/api/join', {
+            method: 'POST', headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({session: params.get('c'), name: params.get('name'), surname: params.get('surname')}),
+        });
+        if (!response.ok) throw new Error(`join failed with ${response.status}`);
+        state.token = (await response.json()).token;
+        lobby.querySelector('.perculus-button').remove();
+        connect();
+    } catch (e) {
+        showStatus(String(e));
+    }
+}
+
+function connect() {
+    const socket = state.socket = new WebSocket(
+        `${location.protocol === 'https:' ? 'wss' : 'ws'}://${location.host}/ws?token=${state.token}`);
+    socket.onopen = () => send({type: 'join', token: state.token});
+    socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type === 'joined') showSession();
+        else if (message.type === 'quiz') showQuiz(message);
+        else if (message.type === 'answer_ack') document.querySelector('button.answer-button').textContent = 'Sent';
+    };
+    socket.onclose = () => {
+        // Like the app: reconnect a dropped socket after a second
+        if (!state.left) { showStatus('Reconnecting...'); setTimeout(connect, 1000); }
+    };
+}
+
+function showSession() {
+    showStatus('');
+    if (state.joined) return;
+    state.joined = true;
+    const session = document.createElement('div');
+    session.id = 'session';
+    session.innerHTML = '<div class="footer"><button class="footer-button icon-background-image" '
+        + 'data-action="open-cam">Camera</button></div><div id="quiz"></div>'
+        + '<div class="puppy-app-container"><canvas></canvas></div>';
+    document.body.insertBefore(session, lobby.nextSibling);
+    session.querySelector('button[data-action="open-cam"]').addEventListener('click', toggleCamera);
+    setUpWhiteboard(session.querySelector('canvas'));
+    setInterval(() => send({type: 'ping'}), 15000);
+}
+
+function showQuiz(quiz) {
+    const panel = document.getElementById('quiz');
+    panel.innerHTML = '';
+    state.option = null;
+    for (const option of quiz.options) {
+        const choice = document.createElement('div');
+        choice.className = 'custom-quiz';
+        choice.textContent = option;
+        choice.addEventListener('click', () => {
+            panel.querySelectorAll('.custom-quiz').forEach((other) => other.classList.remove('selected'));
+            choice.classList.add('selected');
+            state.option = option;
+        });
+        panel.appendChild(choice);
+    }
+    const answer = document.createElement('button');
+    answer.className = 'answer-button';
+    answer.textContent = 'Send';
+    answer.addEventListener('click', () => {
+        if (state.option !== null) send({type: 'answer', quiz_id: quiz.quiz_id, option: state.option});
+    });
+    panel.appendChild(answer);
+}
+
+async function toggleCamera(event) {
+    const button = event.currentTarget;
+    state.camera = !state.camera;
+    button.classList.toggle('active', state.camera);
+    button.textContent = state.camera ? 'Camera on' : 'Camera';
+    send({type: 'camera', on: state.camera});
+    if (!state.camera) {
+        if (state.media) {
+            state.media.stream.getTracks().forEach((track) => track.stop());
+            state.media.pcs.forEach((pc) => pc.close());
+            state.media = null;
+        }
+        return;
+    }
+    try {
+        const stream = await navigator.mediaDevices.getUserMedia({video: true});
+        const sender = new RTCPeerConnection(), receiver = new RTCPeerConnection();
+        sender.onicecandidate = (e) => e.candidate && receiver.addIceCandidate(e.candidate);
+        receiver.onicecandidate = (e) => e.candidate && sender.addIceCandidate(e.candidate);
+        stream.getTracks().forEach((track) => sender.addTrack(track, stream));
+        await sender.setLocalDescription(await sender.createOffer());
+        await receiver.setRemoteDescription(sender.localDescription);
+        await receiver.setLocalDescription(await receiver.createAnswer());
+        await sender.setRemoteDescription(receiver.localDescription);
+        state.media = {stream: stream, pcs: [sender, receiver]};
+    } catch (e) {
+        showStatus(`camera: ${e}`);
+    }
+}
+
+function setUpWhiteboard(canvas) {
+    canvas.width = canvas.clientWidth;
+    canvas.height = canvas.clientHeight;
+    const context = canvas.getContext('2d');
+    let points = null;
+    document.addEventListener('keydown', (e) => { if (e.key === 'x') state.tool = 'pen'; });
+    canvas.addEventListener('pointerdown', (e) => {
+        points = [[e.offsetX, e.offsetY]];
+        context.beginPath();
+        context.moveTo(e.offsetX, e.offsetY);
+    });
+    canvas.addEventListener('pointermove', (e) => {
+        if (!points) return;
+        points.push([e.offsetX, e.offsetY]);
+        context.lineTo(e.offsetX, e.offsetY);
+        context.stroke();
+    });
+    canvas.addEventListener('pointerup', () => {
+        // A click is not a stroke
+        if (points && points.length > 1) {
+            state.strokes += 1;
+            send({type: 'stroke', tool: state.tool, points: points});
+        }
+        points = null;
+    });
+}
+
+window.addEventListener('pagehide', () => { state.left = true; send({type: 'leave'}); });
+</script>
+</body></html>
+"""
+
+
+class MockPerculus:
+    def __init__(self, quiz_options=None, faults=None, seed=None):
+        self.participants = {}  # token -> participant record
+        self.sockets = set()
+        self.participant_ids = itertools.count(1)
+        self.quiz_ids = itertools.count(1)
+        self.quiz = None
+        self.faults = {name: default for name, (default, _) in FAULTS.items()}
+        self.set_faults(faults or {})
+        self.random = random.Random(seed)
+        self.counters = {"pages": 0, "page_failures": 0, "joins": 0, "join_failures": 0, "connected": 0,
+                         "cameras": 0, "answers": 0, "strokes": 0, "pings": 0, "leaves": 0, "disconnects": 0}
+        if quiz_options:
+            self.open_quiz(quiz_options)
+
+    def set_faults(self, faults):
+        unknown = set(faults) - set(FAULTS)
+        if unknown:
+            raise ValueError(f"unknown faults: {', '.join(sorted(unknown))}")
+        self.faults.update((name, float(value)) for name, value in faults.items())
+
+    def open_quiz(self, options):
+        self.quiz = {"type": "quiz", "quiz_id": f"quiz-{next(self.quiz_ids)}", "options": options}
+        return self.quiz
+
+    async def delay(self, fault):
+        latency = self.faults[fault]
+        if latency > 0:
+            jitter = self.faults['jitter']
+            await asyncio.sleep(latency * self.random.uniform(max(0.0, 1 - jitter), 1 + jitter))
+
+    def chance(self, fault):
+        return self.random.random() < self.faults[fault]
+
+    def app(self):
+        application = web.Application()
+        application.router.add_get('/app/', self.page)
+        application.router.add_post('/api/join', self.join)
+        application.router.add_get('/ws', self.websocket)
+        application.router.add_post('/api/quiz', self.start_quiz)
+        application.router.add_post('/api/faults', self.update_faults)
+        application.router.add_get('/api/stats', self.stats)
+        return application
+
+    async def page(self, request):
+        await self.delay('page_latency')
+        if self.chance('page_failure_rate'):
+            self.counters["page_failures"] += 1
+            raise web.HTTPServiceUnavailable(text="injected page failure")
+        self.counters["pages"] += 1
+        page_config = {"cookieBanner": self.chance('cookie_banner'), "uiDelay": self.faults['ui_delay']}
+        return web.Response(text=PAGE.replace('__CONFIG__', json.dumps(page_config)), content_type='text/html')
+
+    async def join(self, request):
+        body = await request.json()
+        if not body.get('session'):
+            return web.json_response({"error": "missing session"}, status=400)
+        await self.delay('join_latency')
+        if self.chance('join_failure_rate'):
+            self.counters["join_failures"] += 1
+            return web.json_response({"error": "injected join failure"}, status=503)
+        token = uuid.uuid4().hex
+        participant_id = next(self.participant_ids)
+        self.participants[token] = {"participant_id": participant_id, "session": body['session'],
+                                    "name": f"{body.get('name', '')} {body.get('surname', '')}".strip()}
+        self.counters["joins"] += 1
+        return web.json_response({"token": token, "participant_id": participant_id})
+
+    async def websocket(self, request):
+        participant = self.participants.get(request.query.get('token'))
+        if participant is None:
+            raise web.HTTPForbidden(text="unknown token")
+        socket = web.WebSocketResponse()
+        await socket.prepare(request)
+        participant['camera'] = False
+        try:
+            async for message in socket:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                await self.delay('message_latency')
+                if not await self.handle(socket, participant, json.loads(message.data)):
+                    break
+                if self.chance('disconnect_rate'):
+                    self.counters["disconnects"] += 1
+                    await socket.close()
+                    break
+        finally:
+            if socket in self.sockets:
+                self.sockets.discard(socket)
+                self.counters["connected"] -= 1
+            if participant['camera']:
+                participant['camera'] = False
+                self.counters["cameras"] -= 1
+        return socket
+
+    async def handle(self, socket, participant, message):
+        kind = message.get('type')
+        if kind == 'join':
+            self.sockets.add(socket)
+            self.counters["connected"] += 1
+            await socket.send_json({"type": "joined", "participant_id": participant['participant_id'],
+                                    "session": participant['session']})
+            if self.quiz is not None:
+                await socket.send_json(self.quiz)
+        elif kind == 'answer':
+            self.counters["answers"] += 1
+            await socket.send_json({"type": "answer_ack", "quiz_id": message.get('quiz_id')})
+        elif kind == 'stroke':
+            self.counters["strokes"] += 1
+            await socket.send_json({"type": "stroke_ack"})
+        elif kind == 'camera':
+            on = bool(message.get('on'))
+            if on != participant['camera']:
+                participant['camera'] = on
+                self.counters["cameras"] += 1 if on else -1
+        elif kind == 'ping':
+            self.counters["pings"] += 1
+            await socket.send_json({"type": "pong"})
+        elif kind == 'leave':
+            self.counters["leaves"] += 1
+            await socket.close()
+            return False
+        return True
+
+    async def start_quiz(self, request):
+        body = await request.json() if request.can_read_body else {}
+        quiz = self.open_quiz(body.get('options', ["A", "B", "C", "D"]))
+        for socket in list(self.sockets):
+            if not socket.closed:
+                await socket.send_json(quiz)
+        return web.json_response(quiz)
+
+    async def update_faults(self, request):
+        try:
+            self.set_faults(await request.json())
+        except (ValueError, TypeError) as e:
+            return web.json_response({"error": str(e)}, status=400)
+        return web.json_response(self.faults)
+
+    async def stats(self, request):
+        return web.json_response(dict(self.counters, quiz=self.quiz, faults=self.faults))
+
+
+def serve_in_thread(server, host='127.0.0.1', port=0):
+    """Run server on its own event loop thread; returns (port, stop). Port 0 picks a free port."""
+    started = Event()
+    bound = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(server.app(), access_log=None)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, host, port)
+        loop.run_until_complete(site.start())
+        bound['port'] = site._server.sockets[0].getsockname()[1]
+        bound['loop'] = loop
+        started.set()
+        loop.run_forever()
+        loop.run_until_complete(runner.cleanup())
+        loop.close()
+
+    thread = Thread(target=run, name="mock-perculus", daemon=True)
+    thread.start()
+    started.wait()
+
+    def stop():
+        bound['loop'].call_soon_threadsafe(bound['loop'].stop)
+        thread.join()
+
+    return bound['port'], stop
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in Perculus server for Chrome and protocol bots.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--no-quiz', action='store_true', help="start without an open quiz (open one via /api/quiz)")
+    parser.add_argument('--seed', type=int, help="seed for the injected faults")
+    for name, (default, help_text) in FAULTS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, default=default, help=help_text)
+    args = parser.parse_args()
+    server = MockPerculus(quiz_options=None if args.no_quiz else ["A", "B", "C", "D"],
+                          faults={name: getattr(args, name) for name in FAULTS}, seed=args.seed)
+    web.run_app(server.app(), host=args.host, port=args.port)
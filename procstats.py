@@ -0,0 +1,116 @@
+"""Linux /proc readers for measuring the browsers the harness spawns."""
+import os
+
+
+def _parent_map():
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as stat_file:
+                stat = stat_file.read()
+        except OSError:
+            continue  # process exited while we were scanning
+        # The command name is in parentheses and may contain spaces, so split after it
+        fields = stat[stat.rindex(')') + 2:].split()
+        parents[int(entry)] = int(fields[1])
+    return parents
+
+
+def process_tree(pid):
+    """Return pid followed by all of its descendants."""
+    children = {}
+    for child, parent in _parent_map().items():
+        children.setdefault(parent, []).append(child)
+    tree = []
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def memory_kb(pid):
+    """Return (rss_kb, pss_kb) for one process, or (0, 0) if it is gone.
+
+    PSS splits shared pages between the processes mapping them, which is the
+    fair number for Chrome's renderer/zygote processes.
+    """
+    rss_kb = pss_kb = 0
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', 'r') as smaps_file:
+            for line in smaps_file:
+                if line.startswith('Rss:'):
+                    rss_kb = int(line.split()[1])
+                elif line.startswith('Pss:'):
+                    pss_kb = int(line.split()[1])
+    except FileNotFoundError:
+        try:
+            with open(f'/proc/{pid}/status', 'r') as status_file:
+                for line in status_file:
+                    if line.startswith('VmRSS:'):
+                        rss_kb = pss_kb = int(line.split()[1])
+        except OSError:
+            pass
+    except OSError:
+        pass
+    return rss_kb, pss_kb
+
+
+def cpu_seconds(pid):
+    """User plus system CPU time used so far by one process, or 0.0 if it is gone."""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as stat_file:
+            stat = stat_file.read()
+    except OSError:
+        return 0.0
+    fields = stat[stat.rindex(')') + 2:].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def tree_cpu_seconds(pid, include_root=True):
+    """Sum cpu_seconds over pid's process tree (processes that already exited are not counted)."""
+    return sum(cpu_seconds(member) for member in process_tree(pid) if include_root or member != pid)
+
+
+def tree_memory_kb(pid, include_root=True):
+    """Sum (rss_kb, pss_kb) over pid's process tree."""
+    total_rss = total_pss = 0
+    for member in process_tree(pid):
+        if member == pid and not include_root:
+            continue
+        rss_kb, pss_kb = memory_kb(member)
+        total_rss += rss_kb
+        total_pss += pss_kb
+    return total_rss, total_pss
+
+
+def cpu_times():
+    """Return (busy, total) jiffies summed over all CPUs since boot; diff two readings for a load figure."""
+    with open('/proc/stat', 'r') as stat_file:
+        values = [int(value) for value in stat_file.readline().split()[1:8]]
+    idle = values[3] + values[4]  # idle + iowait
+    total = sum(values)
+    return total - idle, total
+
+
+def available_memory_kb():
+    """MemAvailable from /proc/meminfo: memory that can be handed out without swapping."""
+    with open('/proc/meminfo', 'r') as meminfo_file:
+        for line in meminfo_file:
+            if line.startswith('MemAvailable:'):
+                return int(line.split()[1])
+    return 0
+
+
+def filesystem_used_percent(path):
+    """How full the filesystem holding path is, e.g. /dev/shm where Chrome keeps its shared memory."""
+    try:
+        stats = os.statvfs(path)
+    except OSError:
+        return 0.0
+    if not stats.f_blocks:
+        return 0.0
+    return 100.0 * (stats.f_blocks - stats.f_bavail) / stats.f_blocks
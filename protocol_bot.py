@@ -0,0 +1,405 @@
+"""Protocol-level bots: replay the join, vote and whiteboard traffic without a browser.
+
+A bot here is a coroutine that runs the HTTP requests and WebSocket messages
+described in a flow file (protocol_flow.json) on one asyncio loop. Every bot
+shares one aiohttp session, so HTTP requests reuse pooled keep-alive connections
+and one process can hold thousands of open participant sockets.
+
+Flow file sections are lists of steps. Strings may reference variables as
+{name}: bot_id, link, origin, ws_origin, host, every query parameter of the
+session link (c, name, surname, ...), and anything saved by earlier steps.
+
+    {"http": {"method": "POST", "url": "{origin}/api/join", "json": {...}}, "save": {"token": "token"}}
+    {"websocket": {"url": "{ws_origin}/ws?token={token}"}}
+    {"send": {"type": "join", "token": "{token}"}}
+    {"expect": {"type": "joined"}, "timeout": 30, "save": {"participant": "participant_id"}}
+    {"sleep": 1.5}
+
+Sections: join, vote_prepare, vote, draw, leave (step lists), and heartbeat
+({"interval": s, "message": {...}}).
+
+Once its group is activated, a protocol bot takes its actions from the same
+scenario timeline as the browser bots (scenario.py), so a cohort means the same
+bots whatever kind they are. vote runs vote_prepare when the action falls due
+(arm_lead seconds early) and vote at the deadline, so only the answer itself is
+left for the deadline. draw runs the draw steps once per action (repeat it with
+"every"), leave runs the leave steps and closes the socket, and rejoin runs the
+join steps again. screenshot and open_camera need a page and a camera, so
+protocol bots skip them.
+"""
+import asyncio
+import json
+import re
+import resource
+import time
+import traceback
+from contextlib import contextmanager
+from threading import Thread
+from urllib.parse import parse_qsl, urlsplit
+
+import aiohttp
+
+PLACEHOLDER = re.compile(r"\{([A-Za-z_][\w.]*)\}")
+
+# Received messages kept per bot for expect steps
+MAX_INBOX = 1000
+
+# Soft open-file limit raised to, when the hard limit allows it (a concrete number even if that is unlimited)
+MAX_OPEN_FILES = 1048576
+
+
+def render(template, variables):
+    """Fill {name} placeholders; a string that is exactly one placeholder keeps the value's type."""
+    if isinstance(template, str):
+        whole = PLACEHOLDER.fullmatch(template)
+        if whole:
+            return variables[whole.group(1)]
+        return PLACEHOLDER.sub(lambda match: str(variables[match.group(1)]), template)
+    if isinstance(template, dict):
+        return {key: render(value, variables) for key, value in template.items()}
+    if isinstance(template, list):
+        return [render(value, variables) for value in template]
+    return template
+
+
+def extract(document, path):
+    for part in path.split('.'):
+        document = document[int(part)] if isinstance(document, list) else document[part]
+    return document
+
+
+def matches(message, pattern):
+    if isinstance(pattern, dict):
+        return isinstance(message, dict) and all(
+            key in message and matches(message[key], value) for key, value in pattern.items())
+    return message == pattern
+
+
+def link_variables(bot_id, link):
+    parts = urlsplit(link)
+    ws_scheme = 'wss' if parts.scheme == 'https' else 'ws'
+    variables = dict(parse_qsl(parts.query))
+    variables.update({
+        "bot_id": bot_id,
+        "link": link,
+        "host": parts.netloc,
+        "origin": f"{parts.scheme}://{parts.netloc}",
+        "ws_origin": f"{ws_scheme}://{parts.netloc}",
+    })
+    return variables
+
+
+def load_flow(path):
+    with open(path, 'r') as flow_file:
+        return json.load(flow_file)
+
+
+class ProtocolBot:
+    def __init__(self, engine, bot_id, link, group_id, batch):
+        self.engine = engine
+        self.bot_id = bot_id
+        self.bot_name = f"ProtocolBot_{bot_id}"
+        self.group_id = group_id
+        self.batch = batch
+        self.variables = link_variables(bot_id, link)
+        self.websocket = None
+        self.reader = None
+        self.inbox = []
+        self.cursor = 0
+        self.message_arrived = asyncio.Event()
+        self.actions = asyncio.Queue()  # (action, monotonic deadline) from the scenario timeline
+        self.left = False
+        self.closed = False
+
+    async def run(self):
+        engine = self.engine
+        started = time.monotonic()
+        joined = await self.join()
+        engine.on_join_attempt(self.bot_id, joined, time.monotonic() - started)
+        if not joined:
+            await self.close()
+            return
+
+        heartbeat = asyncio.create_task(self.heartbeat()) if 'heartbeat' in engine.flow else None
+        try:
+            await engine.wait_for_group(self.group_id)
+            engine.attach(self)
+            await self.run_actions()
+            if not self.left and 'leave' in engine.flow:
+                await self.run_steps(engine.flow['leave'])
+        except Exception as e:
+            engine.log(f"{self.bot_name}: Error in session - {type(e).__name__}: {e}")
+            engine.on_error(self.bot_id, e)
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            await self.close()
+
+    async def join(self):
+        engine = self.engine
+        started = time.monotonic()
+        joined = False
+        try:
+            async with engine.join_slots:
+                await self.run_steps(engine.flow['join'])
+            joined = True
+            engine.log(f"{self.bot_name}: Joined the session.")
+        except Exception as e:
+            engine.log(f"{self.bot_name}: Failed to join the session - {type(e).__name__}: {e}")
+            engine.on_error(self.bot_id, e)
+        self.record('protocol_join', time.monotonic() - started, joined)
+        return joined
+
+    def enqueue_action(self, action, deadline):
+        """Called by the timeline, from a scheduler worker, when an action falls due."""
+        try:
+            self.engine.loop.call_soon_threadsafe(self.actions.put_nowait, (action, deadline))
+        except RuntimeError:
+            pass  # the engine has stopped
+
+    async def run_actions(self):
+        """Run the bot's scenario actions one at a time, in order, until the engine stops."""
+        stopped = asyncio.ensure_future(self.engine.stopped.wait())
+        try:
+            while True:
+                next_action = asyncio.ensure_future(self.actions.get())
+                await asyncio.wait({next_action, stopped}, return_when=asyncio.FIRST_COMPLETED)
+                if stopped.done():
+                    next_action.cancel()
+                    return
+                await self.run_action(*next_action.result())
+        finally:
+            stopped.cancel()
+
+    async def run_action(self, action, deadline):
+        flow = self.engine.flow
+        name = action['action']
+        if self.left and name != 'rejoin':
+            return
+        try:
+            if name == 'vote' and 'vote' in flow:
+                await self.vote(deadline)
+            elif name == 'draw' and 'draw' in flow:
+                with self.time_phase('protocol_draw'):
+                    await self.run_steps(flow['draw'])
+            elif name == 'leave':
+                await self.leave()
+            elif name == 'rejoin':
+                if not self.left:
+                    await self.leave()
+                self.left = not await self.join()
+            # screenshot and open_camera need a page and a camera, which a protocol bot does not have
+        except Exception as e:
+            self.engine.log(f"{self.bot_name}: {name} failed - {type(e).__name__}: {e}")
+            self.engine.on_error(self.bot_id, e)
+
+    async def vote(self, deadline):
+        deadline_epoch = time.time() + (deadline - time.monotonic())
+        if 'vote_prepare' in self.engine.flow:
+            await self.run_steps(self.engine.flow['vote_prepare'])
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        fired_at = time.time()
+        with self.time_phase('protocol_vote'):
+            await self.run_steps(self.engine.flow['vote'])
+        self.engine.on_vote(self.bot_id, fired_at, deadline_epoch)
+        self.engine.log(f"{self.bot_name}: Sent the answer.")
+
+    async def leave(self):
+        with self.time_phase('protocol_leave'):
+            if 'leave' in self.engine.flow:
+                await self.run_steps(self.engine.flow['leave'])
+            await self.close_socket()
+        self.left = True
+        self.engine.log(f"{self.bot_name}: Left the session.")
+
+    def record(self, phase, seconds, ok):
+        self.engine.metrics.record(phase, seconds, ok=ok, batch=self.batch)
+        self.engine.on_phase(self.bot_id, phase, seconds, ok)
+
+    @contextmanager
+    def time_phase(self, phase):
+        """Like PhaseMetrics.time_phase, and the phase also reaches the bot's result row through on_phase."""
+        started = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(phase, time.monotonic() - started, ok)
+
+    async def heartbeat(self):
+        spec = self.engine.flow['heartbeat']
+        while True:
+            await asyncio.sleep(spec['interval'])
+            if self.websocket is not None and not self.websocket.closed:
+                await self.websocket.send_json(render(spec['message'], self.variables))
+
+    async def run_steps(self, steps):
+        for step in steps:
+            await self.run_step(step)
+
+    async def run_step(self, step):
+        if 'http' in step:
+            spec = render(step['http'], self.variables)
+            async with self.engine.session.request(spec.get('method', 'GET'), spec['url'], json=spec.get('json'),
+                                                   data=spec.get('data'), headers=spec.get('headers')) as response:
+                response.raise_for_status()
+                body = await response.text()
+            if 'save' in step:
+                self.save(json.loads(body), step['save'])
+        elif 'websocket' in step:
+            spec = render(step['websocket'], self.variables)
+            self.websocket = await self.engine.session.ws_connect(spec['url'], headers=spec.get('headers'))
+            self.reader = asyncio.create_task(self.read_messages())
+        elif 'send' in step:
+            await self.websocket.send_json(render(step['send'], self.variables))
+        elif 'expect' in step:
+            message = await self.expect(render(step['expect'], self.variables), step.get('timeout', 30))
+            if 'save' in step:
+                self.save(message, step['save'])
+        elif 'sleep' in step:
+            await asyncio.sleep(step['sleep'])
+        else:
+            raise ValueError(f"Unknown flow step: {step}")
+
+    def save(self, document, fields):
+        for name, path in fields.items():
+            self.variables[name] = extract(document, path)
+
+    async def read_messages(self):
+        async for message in self.websocket:
+            if message.type == aiohttp.WSMsgType.TEXT:
+                self.inbox.append(json.loads(message.data))
+                if len(self.inbox) > MAX_INBOX:
+                    dropped = len(self.inbox) - MAX_INBOX
+                    del self.inbox[:dropped]
+                    self.cursor = max(0, self.cursor - dropped)
+                self.message_arrived.set()
+            elif message.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                break
+        self.message_arrived.set()
+
+    async def expect(self, pattern, timeout):
+        """Return the next received message matching pattern, consuming everything before it."""
+        deadline = time.monotonic() + timeout
+        while True:
+            self.message_arrived.clear()
+            for index in range(self.cursor, len(self.inbox)):
+                if matches(self.inbox[index], pattern):
+                    message = self.inbox[index]
+                    del self.inbox[:index + 1]
+                    self.cursor = 0
+                    return message
+            self.cursor = len(self.inbox)
+            if self.websocket is None or self.websocket.closed:
+                raise ConnectionError(f"socket closed while waiting for {pattern}")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"no message matching {pattern} within {timeout}s")
+            try:
+                await asyncio.wait_for(self.message_arrived.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def close_socket(self):
+        if self.websocket is not None and not self.websocket.closed:
+            await self.websocket.close()
+        if self.reader is not None:
+            self.reader.cancel()
+        self.inbox = []
+        self.cursor = 0
+
+    async def close(self):
+        self.closed = True
+        await self.close_socket()
+
+
+class ProtocolBotEngine:
+    """Runs protocol bots on an asyncio loop in one background thread.
+
+    Methods without a leading underscore are called from other threads.
+    """
+
+    def __init__(self, flow, metrics, on_join_attempt, on_vote, attach, max_concurrent_joins=200, on_phase=None,
+                 on_error=None, log=print):
+        self.flow = flow
+        self.metrics = metrics
+        self.on_join_attempt = on_join_attempt
+        self.on_vote = on_vote  # on_vote(bot_id, fired_at, deadline), both local epoch seconds
+        self.attach = attach  # attach(bot) hands a bot whose group is active to the scenario timeline
+        # Called on the loop thread as on_phase(bot_id, phase, seconds, ok) and on_error(bot_id, exception)
+        self.on_phase = on_phase or (lambda bot_id, phase, seconds, ok: None)
+        self.on_error = on_error or (lambda bot_id, error: None)
+        self.max_concurrent_joins = max_concurrent_joins
+        self.log = log
+        self.tasks = set()
+        self.current_group = -1
+        self.loop = asyncio.new_event_loop()
+        self.thread = Thread(target=self.loop.run_forever, name="protocol-bots", daemon=True)
+        raise_open_file_limit()
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self._setup(), self.loop).result()
+
+    async def _setup(self):
+        # limit=0: open WebSockets hold their connection, so a pool limit would cap participants.
+        # Concurrency is bounded by join_slots instead.
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0, ttl_dns_cache=300))
+        self.join_slots = asyncio.Semaphore(self.max_concurrent_joins)
+        self.stopped = asyncio.Event()
+        self.group_activated = asyncio.Condition()
+
+    def start_bot(self, bot_id, link, group_id, batch=None):
+        self.loop.call_soon_threadsafe(self._start_bot, bot_id, link, group_id, batch)
+
+    def _start_bot(self, bot_id, link, group_id, batch):
+        task = self.loop.create_task(ProtocolBot(self, bot_id, link, group_id, batch).run())
+        self.tasks.add(task)
+        task.add_done_callback(self._bot_done)
+
+    def _bot_done(self, task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            e = task.exception()
+            traceback_str = ''.join(traceback.format_exception(None, e, e.__traceback__))
+            self.log(f"Unhandled exception in a protocol bot:\n{traceback_str}")
+
+    def activate_group(self, group_id):
+        asyncio.run_coroutine_threadsafe(self._activate_group(group_id), self.loop).result()
+
+    async def _activate_group(self, group_id):
+        async with self.group_activated:
+            self.current_group = max(self.current_group, group_id)
+            self.group_activated.notify_all()
+
+    async def wait_for_group(self, group_id):
+        async with self.group_activated:
+            await self.group_activated.wait_for(lambda: self.current_group >= group_id)
+
+    def live_bots(self):
+        return len(self.tasks)
+
+    def stop(self, timeout=30):
+        """Let every bot run its leave steps, then close the session and the loop."""
+        try:
+            asyncio.run_coroutine_threadsafe(self._stop(timeout), self.loop).result()
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+    async def _stop(self, timeout):
+        self.stopped.set()
+        if self.tasks:
+            _, pending = await asyncio.wait(list(self.tasks), timeout=timeout)
+            for task in pending:
+                task.cancel()
+        await self.session.close()
+
+
+def raise_open_file_limit():
+    # Every participant holds a socket; the default soft limit of 1024 is too low
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = MAX_OPEN_FILES if hard == resource.RLIM_INFINITY else min(hard, MAX_OPEN_FILES)
+    if soft != resource.RLIM_INFINITY and soft < target:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
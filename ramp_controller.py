@@ -0,0 +1,144 @@
+"""Closed-loop ramp-up: how many bots may be joining at the same time.
+
+Instead of starting fixed batches, the ramp keeps at most `limit` join attempts
+in flight and the controller moves that limit every few seconds, in the style
+of TCP congestion control:
+
+- A host over a ceiling (CPU, free memory, /dev/shm) halves the limit.
+- A low join success rate halves it.
+- p90 join latency above max_join_seconds cuts it by a quarter.
+- A median join latency that has grown well past the best median seen so far
+  (attempts queueing for CPU) cuts it by a quarter.
+- Otherwise, while the join rate is below target, it grows: doubling until the
+  first back-off, then by one per update.
+
+Success rate and latency are judged only on attempts that started after the
+limit last changed, so each limit is measured on its own joins before the next
+move (one adjustment per round trip, as in TCP). Attempts still running count
+as slower than every finished one; otherwise the quick joins that finish first
+would make an overloaded limit look healthy.
+"""
+import math
+import time
+from collections import deque
+from threading import Lock
+
+import procstats
+
+
+class RampController:
+    def __init__(self, initial=5, minimum=1, maximum=50, target_join_rate=2.0, max_join_seconds=30.0,
+                 min_success_rate=0.9, latency_growth=2.0, max_cpu_percent=85.0, min_free_memory_mb=1024,
+                 max_shm_percent=80.0, shm_path='/dev/shm', window_seconds=20.0, min_samples=3):
+        self.limit = max(minimum, min(initial, maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_join_rate = target_join_rate
+        self.max_join_seconds = max_join_seconds
+        self.min_success_rate = min_success_rate
+        self.latency_growth = latency_growth
+        self.max_cpu_percent = max_cpu_percent
+        self.min_free_memory_mb = min_free_memory_mb
+        self.max_shm_percent = max_shm_percent
+        self.shm_path = shm_path
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+        self.samples = deque()  # (finished at, started at, ok, join seconds), monotonic
+        self.starts = deque()  # monotonic start time of each attempt
+        self.changed_at = time.monotonic()
+        self.best_median = None
+        self.slow_start = True
+        self.last_cpu = procstats.cpu_times()
+        self.peak_limit = self.limit
+        self.decreases = 0
+        self.lock = Lock()
+
+    def record_start(self):
+        with self.lock:
+            self.starts.append(time.monotonic())
+
+    def record_attempt(self, ok, seconds):
+        now = time.monotonic()
+        with self.lock:
+            self.samples.append((now, now - seconds, ok, seconds))
+
+    def host_load(self):
+        busy, total = procstats.cpu_times()
+        last_busy, last_total = self.last_cpu
+        self.last_cpu = (busy, total)
+        cpu_percent = 100.0 * (busy - last_busy) / (total - last_total) if total > last_total else 0.0
+        return {
+            "cpu_percent": round(cpu_percent, 1),
+            "free_memory_mb": procstats.available_memory_kb() // 1024,
+            "shm_percent": round(procstats.filesystem_used_percent(self.shm_path), 1),
+        }
+
+    def window_stats(self):
+        now = time.monotonic()
+        with self.lock:
+            while self.samples and self.samples[0][0] < now - self.window_seconds:
+                self.samples.popleft()
+            while self.starts and self.starts[0] < self.changed_at:
+                self.starts.popleft()
+            samples = list(self.samples)
+            started = len(self.starts)
+        judged = [sample for sample in samples if sample[1] >= self.changed_at]
+        if not judged:
+            return None
+        running = max(0, started - len(judged))
+        latencies = sorted(seconds for _, _, _, seconds in judged) + [math.inf] * running
+        since_change = [ok for finished_at, _, ok, _ in samples if finished_at >= self.changed_at]
+        elapsed = max(1.0, min(self.window_seconds, now - self.changed_at))
+        return {
+            "attempts": len(judged),
+            "running": running,
+            "success_rate": sum(1 for _, _, ok, _ in judged if ok) / len(judged),
+            "join_rate": sum(since_change) / elapsed,
+            "p50_seconds": latencies[(len(latencies) - 1) // 2],
+            "p90_seconds": latencies[max(0, math.ceil(len(latencies) * 0.9) - 1)],
+        }
+
+    def update(self):
+        """Move the limit from the latest window and host readings; returns (limit, reason)."""
+        load = self.host_load()
+        if load['cpu_percent'] > self.max_cpu_percent:
+            return self._decrease(0.5, f"CPU at {load['cpu_percent']}%")
+        if load['free_memory_mb'] < self.min_free_memory_mb:
+            return self._decrease(0.5, f"only {load['free_memory_mb']} MB memory available")
+        if load['shm_percent'] > self.max_shm_percent:
+            return self._decrease(0.5, f"{self.shm_path} {load['shm_percent']}% full")
+
+        stats = self.window_stats()
+        if stats is None or stats['attempts'] < self.min_samples:
+            return self.limit, "waiting for join attempts"
+        if stats['success_rate'] < self.min_success_rate:
+            return self._decrease(0.5, f"join success rate {stats['success_rate']:.0%}")
+        if stats['p90_seconds'] > self.max_join_seconds and time.monotonic() - self.changed_at > self.max_join_seconds:
+            return self._decrease(0.75, f"p90 join time over {self.max_join_seconds}s")
+        if math.isinf(stats['p50_seconds']):
+            return self.limit, f"waiting for {stats['running']} join attempts"
+        if self.best_median is None or stats['p50_seconds'] < self.best_median:
+            self.best_median = stats['p50_seconds']
+        if stats['p50_seconds'] > self.latency_growth * self.best_median:
+            return self._decrease(0.75, f"median join time {stats['p50_seconds']:.1f}s, "
+                                       f"best {self.best_median:.1f}s")
+        if stats['join_rate'] >= self.target_join_rate:
+            return self.limit, f"join rate {stats['join_rate']:.1f}/s at target"
+
+        previous = self.limit
+        self.limit = min(self.maximum, self.limit * 2 if self.slow_start else self.limit + 1)
+        if self.limit == previous:
+            return self.limit, f"join rate {stats['join_rate']:.1f}/s, at max_concurrency"
+        self.peak_limit = max(self.peak_limit, self.limit)
+        self.changed_at = time.monotonic()
+        return self.limit, f"join rate {stats['join_rate']:.1f}/s below target {self.target_join_rate}/s"
+
+    def _decrease(self, factor, reason):
+        self.limit = max(self.minimum, math.floor(self.limit * factor))
+        self.slow_start = False
+        self.decreases += 1
+        self.changed_at = time.monotonic()
+        return self.limit, reason
+
+    def summary(self):
+        return {"final_concurrency": self.limit, "peak_concurrency": self.peak_limit, "decreases": self.decreases}
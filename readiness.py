@@ -0,0 +1,124 @@
+"""Page readiness signalled by the page itself instead of fixed sleeps.
+
+Each wait is one execute_async_script call. A MutationObserver (backed by a
+slow interval for style-only changes such as CSS transitions) checks the
+condition in the page and calls back as soon as it holds, or with null when
+the timeout passes. The harness makes a single round trip per wait instead of
+polling every 500 ms.
+
+Joining redirects, so a wait often outlives its document: chromedriver then
+fails the call with "document unloaded". Waits report that, and an element
+that went stale, as not ready yet. Callers wait again on the new page.
+"""
+from selenium.common.exceptions import StaleElementReferenceException, WebDriverException
+
+# The WebDriver script timeout must outlast the longest in-page timeout below
+SCRIPT_TIMEOUT = 120
+
+# chromedriver's messages for a script whose document went away mid-wait
+NAVIGATION_MESSAGES = ('document unloaded', 'Cannot find context with specified id', 'Execution context was destroyed')
+
+NAVIGATED = object()
+
+_MATCH_JS = """
+const matches = (el, state) => {
+    if (!el) return false;
+    if (state === 'present') return true;
+    const rect = el.getBoundingClientRect();
+    const style = window.getComputedStyle(el);
+    const visible = rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+    if (state === 'visible') return visible;
+    return visible && !el.disabled && style.pointerEvents !== 'none';  // clickable
+};
+"""
+
+WAIT_FOR_ANY_JS = _MATCH_JS + """
+const [selectors, state, timeoutMs, done] = arguments;
+const find = () => {
+    for (let i = 0; i < selectors.length; i++) {
+        const el = document.querySelector(selectors[i]);
+        if (matches(el, state)) return [i, el];
+    }
+    return null;
+};
+const found = find();
+if (found) { done(found); return; }
+let observer, interval, timer;
+const finish = (result) => {
+    observer.disconnect();
+    clearInterval(interval);
+    clearTimeout(timer);
+    done(result);
+};
+const check = () => { const result = find(); if (result) finish(result); };
+observer = new MutationObserver(check);
+observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+interval = setInterval(check, 250);
+timer = setTimeout(() => finish(null), timeoutMs);
+"""
+
+CLICK_AND_WAIT_FOR_CHANGE_JS = """
+const [element, timeoutMs, done] = arguments;
+let timer;
+const observer = new MutationObserver(() => { observer.disconnect(); clearTimeout(timer); done(true); });
+observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+timer = setTimeout(() => { observer.disconnect(); done(false); }, timeoutMs);
+element.click();
+"""
+
+WAIT_FOR_CHANGE_JS = """
+const [timeoutMs, done] = arguments;
+let timer;
+const observer = new MutationObserver(() => { observer.disconnect(); clearTimeout(timer); done(true); });
+observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+timer = setTimeout(() => { observer.disconnect(); done(false); }, timeoutMs);
+"""
+
+
+def prepare_driver(driver):
+    driver.set_script_timeout(SCRIPT_TIMEOUT)
+
+
+def _run(driver, script, *args):
+    """execute_async_script; NAVIGATED if the page navigated away, None if an element argument went stale."""
+    try:
+        return driver.execute_async_script(script, *args)
+    except StaleElementReferenceException:
+        return None
+    except WebDriverException as e:
+        if any(message in str(e) for message in NAVIGATION_MESSAGES):
+            return NAVIGATED
+        raise
+
+
+def wait_for_any(driver, selectors, timeout, state='clickable'):
+    """Wait until one of the CSS selectors matches an element in the given state.
+
+    state is 'present', 'visible' or 'clickable'. Returns (index, element) for
+    the first selector that matched, or (None, None) on timeout or navigation.
+    """
+    result = _run(driver, WAIT_FOR_ANY_JS, list(selectors), state, int(timeout * 1000))
+    if result is None or result is NAVIGATED:
+        return None, None
+    return result[0], result[1]
+
+
+def wait_for_element(driver, selector, timeout, state='clickable'):
+    """Return the element matching selector once it is in the given state, or None on timeout or navigation."""
+    return wait_for_any(driver, [selector], timeout, state)[1]
+
+
+def click_and_wait_for_change(driver, element, timeout):
+    """Click element in the page and wait for the DOM to react.
+
+    A click that navigates counts as a reaction. False if nothing changed within
+    timeout, or if the element went stale before the click.
+    """
+    result = _run(driver, CLICK_AND_WAIT_FOR_CHANGE_JS, element, int(timeout * 1000))
+    return result is NAVIGATED or bool(result)
+
+
+def wait_for_change(driver, timeout):
+    """Wait for the next DOM mutation or navigation, at most timeout seconds."""
+    result = _run(driver, WAIT_FOR_CHANGE_JS, int(timeout * 1000))
+    return result is NAVIGATED or bool(result)
@@ -0,0 +1,210 @@
+"""Per-link results in SQLite, so runs can be resumed, failed links rerun and outcomes queried.
+
+Every bot of a run gets one row in results, keyed by (run_id, bot_id); bot_id is
+the link's line number in session_links.txt (blank lines count, but launch no
+bot). A row holds the bot's outcome flags (joined, confirmed, voted, drew), its
+last duration for every phase it went through, the first phase that failed, the
+class and message of its last error and its status:
+
+    started      the bot was launched and has not finished joining
+    joined       in the session
+    failed       the join (or a rejoin) failed
+    left         a leave action took it out of the session
+    completed    in the session when the session ran to its end
+    interrupted  the run was stopped while the bot was starting or in the session
+
+Callers put() a bot's whole row whenever it changes. A writer thread upserts the
+rows queued over each flush_interval in one transaction, keeping only the latest
+row per bot, so bots never wait on the disk. Several processes can share the
+file (coordinator workers): it is opened in WAL mode with a busy timeout.
+
+Modes for a new run: new, resume (the same run id again, launching only the
+links that did not finish: no row, started, joined or interrupted) and
+rerun_failed (a new run of the links that failed in another run). For example:
+
+    sqlite3 results.db "SELECT link, count(*) FROM results WHERE status = 'failed' GROUP BY link"
+"""
+import atexit
+import json
+import sqlite3
+import time
+import uuid
+from datetime import datetime
+from queue import Empty, SimpleQueue
+from threading import Lock, Thread
+
+MODES = ('new', 'resume', 'rerun_failed')
+FINISHED_STATUSES = ('failed', 'left', 'completed')
+
+COLUMNS = ('run_id', 'bot_id', 'link', 'kind', 'status', 'joined', 'confirmed', 'voted', 'drew', 'recycles',
+           'error_type', 'error', 'failed_phase', 'phases', 'started_at', 'updated_at')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    mode TEXT NOT NULL,
+    source_run TEXT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    resumes INTEGER NOT NULL DEFAULT 0,
+    settings TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL,
+    bot_id INTEGER NOT NULL,
+    link TEXT,
+    kind TEXT,
+    status TEXT NOT NULL,
+    joined INTEGER,
+    confirmed INTEGER,
+    voted INTEGER,
+    drew INTEGER,
+    recycles INTEGER,
+    error_type TEXT,
+    error TEXT,
+    failed_phase TEXT,
+    phases TEXT,
+    started_at REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (run_id, bot_id)
+);
+CREATE INDEX IF NOT EXISTS results_status ON results (run_id, status);
+CREATE INDEX IF NOT EXISTS results_link ON results (link);
+"""
+
+UPSERT = (f"INSERT INTO results ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)}) "
+          f"ON CONFLICT (run_id, bot_id) DO UPDATE SET "
+          + ", ".join(f"{column} = excluded.{column}" for column in COLUMNS[2:]))
+
+STOP = object()
+
+
+class ResultsStore:
+    def __init__(self, path, flush_interval=1.0, log=print):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.log = log
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        self.lock = Lock()  # one statement at a time on the shared connection
+        self.run_id = None
+        self.mode = None
+        self.source_run = None
+        self.statuses = {}  # bot_id -> latest status put this process
+        self.rows_written = 0
+        self.flushes = 0
+        self.queue = SimpleQueue()
+        self.writer = Thread(target=self._run, name="results-writer", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    def latest_run(self):
+        with self.lock:
+            row = self.connection.execute("SELECT run_id FROM runs ORDER BY started_at DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def begin_run(self, mode='new', source_run=None, settings=None):
+        """Register this run; resume continues source_run under its own id. Returns the run id."""
+        if mode not in MODES:
+            raise ValueError(f"results mode must be one of {MODES}, got {mode!r}")
+        with self.lock:
+            if mode != 'new':
+                if self.connection.execute("SELECT 1 FROM runs WHERE run_id = ?", (source_run,)).fetchone() is None:
+                    raise ValueError(f"results mode {mode!r}: no run {source_run!r} in {self.path}")
+            if mode == 'resume':
+                run_id = source_run
+                self.connection.execute(
+                    "UPDATE runs SET resumes = resumes + 1, finished_at = NULL WHERE run_id = ?", (run_id,))
+            else:
+                run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+                self.connection.execute(
+                    "INSERT INTO runs (run_id, mode, source_run, started_at, settings) VALUES (?, ?, ?, ?, ?)",
+                    (run_id, mode, source_run, time.time(), json.dumps(settings) if settings is not None else None))
+            self.connection.commit()
+        self.join_run(run_id, mode, source_run)
+        return run_id
+
+    def join_run(self, run_id, mode='new', source_run=None):
+        """Write rows for a run another process registered (a coordinator's worker, maybe on another host)."""
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO runs (run_id, mode, source_run, started_at) VALUES (?, ?, ?, ?)",
+                (run_id, mode, source_run, time.time()))
+            self.connection.commit()
+        self.run_id = run_id
+        self.mode = mode
+        self.source_run = source_run
+
+    def bot_links(self, run_id, statuses):
+        """The (bot_id, link) pairs of run_id whose status is one of statuses."""
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT bot_id, link FROM results WHERE run_id = ? AND status IN ({', '.join('?' for _ in statuses)})",
+                (run_id, *statuses)).fetchall()
+        return set(rows)
+
+    def put(self, row):
+        """Queue a bot's whole row (a dict with bot_id, status and any of COLUMNS); never blocks on the disk."""
+        self.statuses[row['bot_id']] = row['status']
+        self.queue.put(row)
+
+    def close(self):
+        if not self.writer.is_alive():
+            return
+        self.queue.put(STOP)
+        self.writer.join()
+        with self.lock:
+            if self.run_id is not None:
+                self.connection.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), self.run_id))
+                self.connection.commit()
+            self.connection.close()
+
+    def _run(self):
+        running = True
+        while running:
+            pending = {}  # bot_id -> latest row
+            deadline = time.monotonic() + self.flush_interval
+            while running and time.monotonic() < deadline:
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except Empty:
+                    break
+                if item is STOP:
+                    running = False
+                else:
+                    pending[item['bot_id']] = item
+            if pending:
+                self._write(pending.values())
+
+    def _write(self, rows):
+        now = time.time()
+        values = []
+        for row in rows:
+            row = dict(row, run_id=self.run_id, updated_at=now)
+            if 'phases' in row:
+                row['phases'] = json.dumps(row['phases'])
+            values.append(tuple(row.get(column) for column in COLUMNS))
+        try:
+            with self.lock:
+                with self.connection:
+                    self.connection.executemany(UPSERT, values)
+            self.rows_written += len(values)
+            self.flushes += 1
+        except sqlite3.Error as e:
+            self.log(f"Could not write {len(values)} results to {self.path} - {type(e).__name__}: {e}")
+
+    def summary(self):
+        counts = {}
+        for status in list(self.statuses.values()):
+            counts[status] = counts.get(status, 0) + 1
+        return {
+            "path": self.path,
+            "run_id": self.run_id,
+            "mode": self.mode,
+            "source_run": self.source_run,
+            "bots": len(self.statuses),
+            "statuses": counts,
+            "rows_written": self.rows_written,
+            "flushes": self.flushes,
+        }
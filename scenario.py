@@ -0,0 +1,179 @@
+"""Scenario timelines: which bots do what, and when, during a session.
+
+A scenario file lists cohorts of bots and the actions each cohort performs,
+in seconds after T0 (the end of the ramp-up, when groups start to activate):
+
+    {
+        "group_interval": 1.0,
+        "cohorts": [
+            {"name": "cameras", "bots": "1-50", "actions": [{"action": "open_camera", "at": 30}]},
+            {"name": "everyone", "actions": [{"action": "vote", "at": 120}]},
+            {"name": "drawers", "share": 0.1, "actions": [{"action": "draw", "at": 60, "every": 5}]},
+            {"name": "churn", "share": 0.2, "actions": [{"action": "rejoin", "at": 600, "jitter": 30}]}
+        ]
+    }
+
+Cohorts: "bots" is "all" (default), ranges such as "1-10,20,30-40", or a list of
+ids; "share" then keeps that fraction of them, a fixed sample seeded by the
+cohort name so every worker of a distributed run picks the same bots.
+
+Actions: screenshot (with "label"), open_camera, vote, draw, leave and rejoin.
+"at" is seconds after T0 or "vote_time" for config.json's vote_time. "every"
+repeats the action until "until" (default: the end of the session). "jitter"
+spreads a cohort over that many seconds, the same offset for a bot every time.
+A vote fires "arm_lead" seconds early (default 10) to find the quiz and arm the
+in-page barrier, so the click itself lands on the deadline. A draw keeps drawing
+"strokes_per_second" (default: whiteboard_load in config.json) for "duration"
+seconds (default: the rest of the session).
+
+Every action is a timer on the bot scheduler; a bot runs its due actions one at
+a time, in order, and bots do not hold a thread between actions. The session
+ends session_duration seconds after T0.
+"""
+import json
+import math
+import random
+import time
+
+ACTIONS = ('screenshot', 'open_camera', 'vote', 'draw', 'leave', 'rejoin')
+ACTION_FIELDS = {'action', 'at', 'every', 'until', 'jitter', 'label', 'arm_lead', 'strokes_per_second', 'duration'}
+COHORT_FIELDS = {'name', 'bots', 'share', 'actions'}
+
+DEFAULT_ARM_LEAD = 10
+
+
+def parse_bots(spec):
+    """Return the set of bot ids in spec, or None for every bot."""
+    if spec in (None, 'all'):
+        return None
+    if isinstance(spec, list):
+        return set(spec)
+    bot_ids = set()
+    for part in str(spec).split(','):
+        first, _, last = part.strip().partition('-')
+        bot_ids.update(range(int(first), int(last or first) + 1))
+    return bot_ids
+
+
+def validate(scenario):
+    for cohort in scenario.get('cohorts', []):
+        unknown = set(cohort) - COHORT_FIELDS
+        if unknown:
+            raise ValueError(f"Scenario cohort {cohort.get('name')!r} has unknown fields {sorted(unknown)}")
+        for action in cohort.get('actions', []):
+            if action.get('action') not in ACTIONS:
+                raise ValueError(f"Scenario action {action.get('action')!r} is not one of {ACTIONS}")
+            unknown = set(action) - ACTION_FIELDS
+            if unknown:
+                raise ValueError(f"Scenario action {action['action']!r} has unknown fields {sorted(unknown)}")
+            if not isinstance(action.get('at', 0), (int, float)) and action.get('at') != 'vote_time':
+                raise ValueError(f"Scenario action {action['action']!r}: at must be seconds or \"vote_time\"")
+    return scenario
+
+
+def load_scenario(path):
+    with open(path, 'r') as scenario_file:
+        return validate(json.load(scenario_file))
+
+
+def bots_with_action(scenario, action, total_bots):
+    """The ids of the bots, out of total_bots, in any cohort of scenario that performs action."""
+    bot_ids = set()
+    for cohort in scenario.get('cohorts', []):
+        if any(cohort_action.get('action') == action for cohort_action in cohort.get('actions', [])):
+            bot_ids |= Timeline.members(cohort, total_bots)
+    return bot_ids
+
+
+def default_scenario(open_camera, vote, whiteboard):
+    """The fixed sequence from before scenario files: each bot acts as soon as its group is activated."""
+    cohorts = [{"name": "everyone", "actions": [{"action": "screenshot", "at": 0, "label": "debug_before_action"}]}]
+    if open_camera:
+        cohorts.append({"name": "cameras", "bots": "1-15", "actions": [{"action": "open_camera", "at": 0}]})
+    if vote:
+        cohorts.append({"name": "voters", "actions": [{"action": "vote", "at": "vote_time"}]})
+    if whiteboard:
+        # After the vote when there is one: the bot's actions run in order
+        cohorts.append({"name": "drawers", "actions": [{"action": "draw", "at": "vote_time" if vote else 0}]})
+    return {"group_interval": 1.0, "cohorts": cohorts}
+
+
+class Timeline:
+    def __init__(self, scenario, scheduler, total_bots, session_duration, vote_epoch, on_end, log=print):
+        self.scheduler = scheduler
+        self.session_duration = session_duration
+        self.vote_epoch = vote_epoch  # callable returning vote_time as local epoch seconds
+        self.on_end = on_end
+        self.log = log
+        self.group_interval = scenario.get('group_interval', 1.0)
+        self.cohorts = [(cohort, self.members(cohort, total_bots)) for cohort in scenario.get('cohorts', [])]
+        self.t0 = None
+        self.dropped = set()  # id() of the actions already logged as past the end of the session
+
+    @staticmethod
+    def members(cohort, total_bots):
+        bot_ids = parse_bots(cohort.get('bots'))
+        population = sorted(bot_id for bot_id in (bot_ids or range(1, total_bots + 1)) if 1 <= bot_id <= total_bots)
+        share = cohort.get('share', 1.0)
+        if share >= 1.0:
+            return set(population)
+        return set(random.Random(cohort.get('name', '')).sample(population, round(len(population) * share)))
+
+    def start(self, t0_epoch=None):
+        """Set T0 (now, or an epoch time on this host's clock) and schedule the end of the session."""
+        self.t0 = time.monotonic() - (time.time() - t0_epoch) if t0_epoch is not None else time.monotonic()
+        self.scheduler.call_at(self.t0 + self.session_duration, self.end)
+        for cohort, members in self.cohorts:
+            self.log(f"Scenario cohort {cohort.get('name', '?')}: {len(members)} bots, "
+                     f"{', '.join(action['action'] for action in cohort.get('actions', []))}.")
+
+    def end(self):
+        self.log(f"Session duration of {self.session_duration}s reached.")
+        self.on_end()
+
+    def attach(self, bot):
+        """Schedule every action of bot's cohorts; actions already due run right away, in scenario order."""
+        for cohort, members in self.cohorts:
+            if bot.bot_id not in members:
+                continue
+            for action in cohort.get('actions', []):
+                deadline = self.first_deadline(bot.bot_id, action)
+                if deadline > self.t0 + self.session_duration:
+                    self.log_dropped(cohort, action)
+                    continue
+                now = time.monotonic()
+                if action.get('every') and deadline < now:
+                    # A bot attached late (or rejoined) picks up at the next repetition, without catching up
+                    deadline += math.ceil((now - deadline) / action['every']) * action['every']
+                self.schedule(bot, action, deadline)
+
+    def log_dropped(self, cohort, action):
+        if id(action) in self.dropped:
+            return
+        self.dropped.add(id(action))
+        self.log(f"Scenario cohort {cohort.get('name', '?')}: {action['action']} at {action.get('at', 0)} lands after "
+                 f"the session ends ({self.session_duration}s after T0), not scheduled.")
+
+    def first_deadline(self, bot_id, action):
+        if action.get('at') == 'vote_time':
+            deadline = time.monotonic() + (self.vote_epoch() - time.time())
+        else:
+            deadline = self.t0 + action.get('at', 0)
+        jitter = action.get('jitter', 0)
+        if jitter:
+            deadline += random.Random(f"{action['action']}:{bot_id}").uniform(0, jitter)
+        return deadline
+
+    def schedule(self, bot, action, deadline):
+        until = self.t0 + action.get('until', self.session_duration)
+        if deadline > self.t0 + self.session_duration or (action.get('every') and deadline > until):
+            return
+        lead = action.get('arm_lead', DEFAULT_ARM_LEAD) if action['action'] == 'vote' else 0
+        self.scheduler.call_at(deadline - lead, self.fire, bot, action, deadline)
+
+    def fire(self, bot, action, deadline):
+        if bot.closed:
+            return
+        bot.enqueue_action(action, deadline)
+        if action.get('every'):
+            self.schedule(bot, action, deadline + action['every'])
@@ -0,0 +1,106 @@
+"""Screenshots off the bot's critical path.
+
+The bot thread only asks Chrome for a downscaled JPEG over CDP and gets it back
+as base64. Decoding, deduplication, the disk budget and the file write happen on
+a small writer pool. Sampling and the "failures" mode decide before Chrome is
+asked for anything.
+"""
+import base64
+import hashlib
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+MODES = ('all', 'failures', 'off')
+
+
+class ScreenshotPipeline:
+    def __init__(self, directory, mode='all', sample_rate=1.0, disk_budget_mb=500, scale=0.5, jpeg_quality=60,
+                 window_size=(1920, 1080), writer_threads=2, log=print):
+        if mode not in MODES:
+            raise ValueError(f"screenshots.mode must be one of {MODES}, got {mode!r}")
+        self.directory = directory
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.disk_budget_bytes = int(disk_budget_mb * 1024 * 1024)
+        self.scale = scale
+        self.jpeg_quality = jpeg_quality
+        self.window_size = window_size
+        self.log = log
+        self.executor = ThreadPoolExecutor(max_workers=writer_threads, thread_name_prefix="screenshot-writer")
+        self.seen = {}  # frame digest -> path it was first written to
+        self.counters = {"captured": 0, "written": 0, "duplicates": 0, "sampled_out": 0, "over_budget": 0,
+                         "failed": 0, "bytes_written": 0}
+        self.lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def capture(self, driver, bot_name, label, failure=False):
+        """Grab a frame for bot_name and queue it to be written as <bot_name>_<label>.<ext>."""
+        if self.mode == 'off' or (self.mode == 'failures' and not failure):
+            return
+        with self.lock:
+            if not failure and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                self.counters["sampled_out"] += 1
+                return
+            if self.counters["bytes_written"] >= self.disk_budget_bytes:
+                self.counters["over_budget"] += 1
+                return
+        try:
+            data, extension = self._grab(driver)
+        except Exception as e:
+            with self.lock:
+                self.counters["failed"] += 1
+            self.log(f"{bot_name}: Could not capture screenshot {label} - {e}")
+            return
+        with self.lock:
+            self.counters["captured"] += 1
+        self.executor.submit(self._write, bot_name, label, data, extension)
+
+    def _grab(self, driver):
+        width, height = self.window_size
+        try:
+            result = driver.execute("executeCdpCommand", {"cmd": "Page.captureScreenshot", "params": {
+                "format": "jpeg",
+                "quality": self.jpeg_quality,
+                "clip": {"x": 0, "y": 0, "width": width, "height": height, "scale": self.scale},
+            }})["value"]
+            return result["data"], "jpg"
+        except Exception:
+            # Not a Chromium driver: full-size PNG over plain WebDriver
+            return driver.get_screenshot_as_base64(), "png"
+
+    def _write(self, bot_name, label, data, extension):
+        try:
+            frame = base64.b64decode(data)
+            digest = hashlib.blake2b(frame, digest_size=16).digest()
+            screenshot_path = os.path.join(self.directory, f"{bot_name}_{label}.{extension}")
+            with self.lock:
+                duplicate_of = self.seen.get(digest)
+                if duplicate_of is None:
+                    if self.counters["bytes_written"] + len(frame) > self.disk_budget_bytes:
+                        self.counters["over_budget"] += 1
+                        return
+                    self.seen[digest] = screenshot_path
+                    self.counters["bytes_written"] += len(frame)
+                else:
+                    self.counters["duplicates"] += 1
+            if duplicate_of is not None:
+                self.log(f"{bot_name}: Screenshot {label} is identical to {duplicate_of}, not saved again.")
+                return
+            with open(screenshot_path, 'wb') as screenshot_file:
+                screenshot_file.write(frame)
+            with self.lock:
+                self.counters["written"] += 1
+            self.log(f"{bot_name}: Screenshot saved to {screenshot_path}")
+        except Exception as e:
+            with self.lock:
+                self.counters["failed"] += 1
+            self.log(f"{bot_name}: Could not write screenshot {label} - {e}")
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
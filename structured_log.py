@@ -0,0 +1,254 @@
+"""Queue-backed logging: callers only enqueue, one writer thread formats and writes.
+
+Every record goes to a JSONL file as
+
+    {"time": "2024-05-01 12:00:00.123", "t": 5123.456789, "bot_id": 12, "group": 0,
+     "phase": "join", "event": "Bot has fully joined and is ready.", "message": "...",
+     "error_type": "TimeoutException"}
+
+t is time.monotonic(). bot_id, group and phase come from the scheduler step the
+caller is running in (engine.current_step), or from a "Bot_N:" message prefix.
+event is the message with the bot prefix and numbers taken out, so every bot's
+copy of a line has the same event, unless the caller passes event=... itself.
+error_type is the class name of an error=... argument, or of an exception named
+in the message.
+
+rate_limit_per_event caps each event at that many records per second (0: no
+cap); records over the cap are dropped and counted in a "log_suppressed" record.
+The console shows every line as before ("full"), one status line every
+summary_interval seconds plus the errors ("summary"), or nothing ("off").
+"""
+import atexit
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from queue import Empty, SimpleQueue
+from threading import Thread
+
+import engine
+
+CONSOLE_MODES = ('full', 'summary', 'off')
+
+BOT_PREFIX = re.compile(r'^(?:Bot_|Bot |protocol Bot |ProtocolBot_)(\d+)[: ]\s*')
+NUMBERS = re.compile(r'\d+(?:\.\d+)?')
+ERROR_NAME = re.compile(r'\b(\w+(?:Exception|Error))\b')
+
+MAX_DRAIN = 5000  # records written per wake-up of the writer
+MAX_CACHED_EVENTS = 10000
+STOP = object()
+
+encode = json.JSONEncoder(default=str).encode
+
+
+def path_with_suffix(path, suffix):
+    """run_log.jsonl, worker-1 -> run_log.worker-1.jsonl"""
+    root, extension = os.path.splitext(path)
+    return f"{root}.{suffix}{extension}"
+
+
+class LogPipeline:
+    def __init__(self, path='', max_bytes=0, backup_count=3, console='full', summary_interval=5.0,
+                 rate_limit_per_event=0, rate_limits=None, group_size=None, stream=None):
+        if console not in CONSOLE_MODES:
+            raise ValueError(f"logging console must be one of {CONSOLE_MODES}, got {console!r}")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.console = console
+        self.summary_interval = summary_interval
+        self.rate_limit_per_event = rate_limit_per_event
+        self.rate_limits = rate_limits or {}  # event -> records per second, overriding the default
+        self.group_size = group_size
+        self.stream = stream or sys.stdout
+        self.queue = SimpleQueue()
+        self.file = None
+        self.file_bytes = 0
+        self.buckets = {}  # event -> [tokens, last refill]
+        self.suppressed = {}  # event -> records dropped since the last log_suppressed record
+        self.interval_events = {}  # event -> records since the last console summary
+        self.interval_errors = 0
+        self.written = 0
+        self.event_cache = {}  # message text -> (event, exception name in it)
+        self.second = None  # the formatted second of the last record, reused for records in the same second
+        self.second_text = ''
+        self.next_summary = time.monotonic() + summary_interval
+        self.writer = Thread(target=self._run, name="log-writer", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    def log(self, message, **fields):
+        """Queue a record; never blocks on the file or the console."""
+        self.queue.put((time.time(), time.monotonic(), message, fields, engine.current_step()))
+
+    def reopen(self, path):
+        """Write to path from here on; records already queued still go to the old file."""
+        self.queue.put(('reopen', path))
+
+    def close(self):
+        if self.writer.is_alive():
+            self.queue.put(STOP)
+            self.writer.join()
+
+    def _run(self):
+        running = True
+        while running:
+            try:
+                items = [self.queue.get(timeout=max(0.05, self.next_summary - time.monotonic()))]
+            except Empty:
+                items = []
+            while len(items) < MAX_DRAIN:
+                try:
+                    items.append(self.queue.get_nowait())
+                except Empty:
+                    break
+            lines = []
+            console_lines = []
+            for item in items:
+                if item is STOP:
+                    running = False
+                elif len(item) == 2:
+                    self._write(lines)
+                    lines = []
+                    self._close_file()
+                    self.path = item[1]
+                else:
+                    self._handle(item, lines, console_lines)
+            now = time.monotonic()
+            if now >= self.next_summary or not running:
+                self._flush_suppressed(lines, now)
+                if self.console == 'summary':
+                    console_lines.append(self._summary_line(now))
+                self.next_summary = now + self.summary_interval
+            self._write(lines)
+            if console_lines:
+                self.stream.write(''.join(console_lines))
+                self.stream.flush()
+        self._close_file()
+
+    def _handle(self, item, lines, console_lines):
+        wall, monotonic, message, fields, step = item
+        record = self._record(wall, monotonic, message, fields, step)
+        if not self._allow(record['event'], monotonic):
+            self.suppressed[record['event']] = self.suppressed.get(record['event'], 0) + 1
+            return
+        lines.append(encode(record) + '\n')
+        self.written += 1
+        self.interval_events[record['event']] = self.interval_events.get(record['event'], 0) + 1
+        if 'error_type' in record:
+            self.interval_errors += 1
+        if self.console == 'full' or (self.console == 'summary' and 'error_type' in record):
+            console_lines.append(f"{record['time'][:19]} - {message}\n")
+
+    def _record(self, wall, monotonic, message, fields, step):
+        second = int(wall)
+        if second != self.second:
+            self.second = second
+            self.second_text = datetime.fromtimestamp(second).strftime('%Y-%m-%d %H:%M:%S')
+        record = {"time": f"{self.second_text}.{int((wall - second) * 1000):03d}", "t": round(monotonic, 6)}
+        bot = getattr(step, '__self__', None)
+        bot_id = getattr(bot, 'bot_id', None)
+        text = message
+        match = BOT_PREFIX.match(message)
+        if match:
+            text = message[match.end():]
+            if bot_id is None:
+                bot_id = int(match.group(1))
+        if bot_id is not None:
+            record['bot_id'] = bot_id
+            group = getattr(bot, 'group_id', None)
+            if group is None and self.group_size:
+                group = (bot_id - 1) // self.group_size
+            if group is not None:
+                record['group'] = group
+        if step is not None:
+            record['phase'] = getattr(step, '__name__', str(step))
+        error = fields.pop('error', None)
+        if error is not None and str(error):
+            text = text.replace(str(error), '{error}')  # one event per failure, whatever its message
+        event, error_name = self._event(text)
+        record['event'] = fields.pop('event', None) or event
+        record['message'] = message
+        if error is not None:
+            record['error_type'] = type(error).__name__
+            record['error'] = str(error)
+        elif error_name:
+            record['error_type'] = error_name
+        record.update(fields)
+        return record
+
+    def _event(self, text):
+        cached = self.event_cache.get(text)
+        if cached is None:
+            error_name = ERROR_NAME.search(text)
+            cached = (NUMBERS.sub('#', text.split('\n', 1)[0])[:120], error_name and error_name.group(1))
+            if len(self.event_cache) >= MAX_CACHED_EVENTS:
+                self.event_cache.clear()
+            self.event_cache[text] = cached
+        return cached
+
+    def _allow(self, event, now):
+        rate = self.rate_limits.get(event, self.rate_limit_per_event)
+        if not rate:
+            return True
+        bucket = self.buckets.get(event)
+        if bucket is None:
+            bucket = self.buckets[event] = [rate, now]
+        bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+    def _flush_suppressed(self, lines, now):
+        if not self.suppressed:
+            return
+        record = {"time": datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:23], "t": round(now, 6),
+                  "event": "log_suppressed", "counts": self.suppressed}
+        lines.append(encode(record) + '\n')
+        self.suppressed = {}
+
+    def _summary_line(self, now):
+        records = sum(self.interval_events.values())
+        top = sorted(self.interval_events.items(), key=lambda item: -item[1])[:3]
+        line = (f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {records} log records in the last "
+                f"{self.summary_interval:g}s, {self.interval_errors} errors")
+        if top:
+            line += "; most frequent: " + ", ".join(f"{event!r} x{count}" for event, count in top)
+        self.interval_events = {}
+        self.interval_errors = 0
+        return line + "\n"
+
+    def _write(self, lines):
+        if not lines or not self.path:
+            return
+        if self.file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.file = open(self.path, 'a')
+            self.file_bytes = self.file.tell()
+        data = ''.join(lines)
+        self.file.write(data)
+        self.file.flush()
+        self.file_bytes += len(data)
+        if self.max_bytes and self.file_bytes >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._close_file()
+        if self.backup_count:
+            for index in range(self.backup_count - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{index}"):
+                    os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def _close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chrome_profile import LeanProfile  # noqa: E402
+
+
+def seed(directory):
+    os.makedirs(directory / "index-dir")
+    (directory / "index").write_bytes(b"index")
+    (directory / "index-dir" / "the-real-index").write_bytes(b"real index")
+    (directory / "0123456789abcdef_0").write_bytes(b"bundle")
+
+
+def test_bot_writes_do_not_reach_the_seed(tmp_path):
+    seed_dir = tmp_path / "seed"
+    seed(seed_dir)
+    profile = LeanProfile(shared_cache_dir=str(seed_dir))
+    cache_dir = profile.new_bot_cache()
+    try:
+        for name in ("0123456789abcdef_0", "index", os.path.join("index-dir", "the-real-index")):
+            try:
+                with open(os.path.join(cache_dir, name), 'r+b') as entry:
+                    entry.write(b"rewritten")
+            except PermissionError:
+                pass  # a read-only link into the seed
+        assert (seed_dir / "0123456789abcdef_0").read_bytes() == b"bundle"
+        assert (seed_dir / "index").read_bytes() == b"index"
+        assert (seed_dir / "index-dir" / "the-real-index").read_bytes() == b"real index"
+        assert not os.access(seed_dir / "0123456789abcdef_0", os.W_OK) or os.geteuid() == 0
+    finally:
+        profile.cleanup()
+
+
+def test_bot_index_files_are_its_own_and_writable(tmp_path):
+    seed_dir = tmp_path / "seed"
+    seed(seed_dir)
+    profile = LeanProfile(shared_cache_dir=str(seed_dir))
+    cache_dir = profile.new_bot_cache()
+    try:
+        with open(os.path.join(cache_dir, "index"), 'r+b') as index:
+            index.write(b"bot")
+        assert (seed_dir / "index").read_bytes() == b"index"
+    finally:
+        profile.cleanup()
@@ -0,0 +1,29 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from structured_log import LogPipeline  # noqa: E402
+
+
+def write_records(path, *messages):
+    pipeline = LogPipeline(path=str(path), console='off', group_size=20)
+    for message in messages:
+        pipeline.log(message)
+    pipeline.close()
+    with open(path) as log_file:
+        return [json.loads(line) for line in log_file]
+
+
+def test_bot_prefixes_set_bot_id_and_group(tmp_path):
+    records = write_records(tmp_path / "run_log.jsonl",
+                            "Bot_3: Joined the session.",
+                            "ProtocolBot_41: Joined the session.")
+    assert [(record['bot_id'], record['group']) for record in records] == [(3, 0), (41, 2)]
+    assert records[0]['event'] == records[1]['event'] == "Joined the session."
+
+
+def test_message_without_bot_prefix_has_no_bot_id(tmp_path):
+    records = write_records(tmp_path / "run_log.jsonl", "All groups have been activated.")
+    assert 'bot_id' not in records[0]
@@ -0,0 +1,113 @@
+"""Vote barrier: every bot fires its vote clicks at the same instant.
+
+Ahead of vote_time each bot arms its page: the quiz option is located and a
+timer inside the page runs the click sequence on the page's monotonic clock,
+spinning for the last few milliseconds. Firing needs no WebDriver round trip,
+so bots fire together however busy the harness's worker pool is. The harness
+only collects the recorded fire timestamp afterwards.
+"""
+import math
+
+OPTION_SELECTOR = "div.custom-quiz:first-of-type"
+SEND_SELECTOR = "button.answer-button"
+
+# Milliseconds before the deadline at which the page timer hands over to a busy-wait
+SPIN_MS = 20
+
+ARM_JS = """
+const [deadlineEpochMs, optionSelector, sendSelector, sendTimeoutMs, spinMs] = arguments;
+let option = document.querySelector(optionSelector);
+if (!option) return false;
+const target = performance.now() + (deadlineEpochMs - Date.now());
+const state = window.__loadtestVote = {firedAt: null, sentAt: null, error: null, done: false, waiters: []};
+const finish = () => { state.done = true; state.waiters.forEach((waiter) => waiter()); };
+const trySend = () => {
+    const send = document.querySelector(sendSelector);
+    if (!send || send.disabled) return false;
+    send.click();
+    state.sentAt = performance.timeOrigin + performance.now();
+    return true;
+};
+const sendWhenReady = () => {
+    if (trySend()) { finish(); return; }
+    let timer;
+    const observer = new MutationObserver(() => {
+        if (trySend()) { observer.disconnect(); clearTimeout(timer); finish(); }
+    });
+    observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+    timer = setTimeout(() => { observer.disconnect(); state.error = 'answer button not ready'; finish(); }, sendTimeoutMs);
+};
+const fire = () => {
+    if (!option.isConnected) option = document.querySelector(optionSelector);
+    while (performance.now() < target) {}
+    try {
+        option.click();
+        state.firedAt = performance.timeOrigin + performance.now();
+    } catch (e) {
+        state.error = String(e);
+        finish();
+        return;
+    }
+    sendWhenReady();
+};
+setTimeout(fire, Math.max(0, target - performance.now() - spinMs));
+return true;
+"""
+
+COLLECT_JS = """
+const [timeoutMs, done] = arguments;
+const state = window.__loadtestVote;
+if (!state) { done(null); return; }
+const report = () => done({firedAt: state.firedAt, sentAt: state.sentAt, error: state.error});
+if (state.done) { report(); return; }
+state.waiters.push(report);
+setTimeout(report, timeoutMs);
+"""
+
+
+def arm(driver, deadline_epoch, send_timeout=15):
+    """Arm the page to vote at deadline_epoch (local time.time() seconds). False if the quiz is missing."""
+    return bool(driver.execute_script(ARM_JS, deadline_epoch * 1000, OPTION_SELECTOR, SEND_SELECTOR,
+                                      int(send_timeout * 1000), SPIN_MS))
+
+
+def collect(driver, timeout):
+    """Wait for an armed vote to finish.
+
+    Returns a dict with fired_at and sent_at as epoch seconds (None if that click
+    did not happen) and error, or None if the page was never armed (e.g. it reloaded).
+    """
+    result = driver.execute_async_script(COLLECT_JS, int(timeout * 1000))
+    if result is None:
+        return None
+    return {
+        "fired_at": result['firedAt'] / 1000 if result['firedAt'] is not None else None,
+        "sent_at": result['sentAt'] / 1000 if result['sentAt'] is not None else None,
+        "error": result['error'],
+    }
+
+
+def skew_summary(fire_times, deadline_epoch):
+    """Distribution of fire time minus deadline, in milliseconds, over {bot_id: fire epoch seconds}.
+
+    deadline_epoch is one deadline for every bot or a {bot_id: deadline} dict.
+    """
+    if not fire_times:
+        return {"fired": 0}
+    if isinstance(deadline_epoch, dict):
+        offsets = sorted((fired_at - deadline_epoch[bot_id]) * 1000 for bot_id, fired_at in fire_times.items())
+    else:
+        offsets = sorted((fired_at - deadline_epoch) * 1000 for fired_at in fire_times.values())
+
+    def percentile(p):
+        return offsets[max(0, math.ceil(len(offsets) * p / 100) - 1)]
+
+    return {
+        "fired": len(offsets),
+        "min_ms": round(offsets[0], 2),
+        "p50_ms": round(percentile(50), 2),
+        "p90_ms": round(percentile(90), 2),
+        "p99_ms": round(percentile(99), 2),
+        "max_ms": round(offsets[-1], 2),
+        "spread_ms": round(offsets[-1] - offsets[0], 2),
+    }
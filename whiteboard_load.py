@@ -0,0 +1,204 @@
+"""Whiteboard stroke load: random curves, shapes and handwritten digits, drawn in batches.
+
+A drawing bot sends strokes_per_second strokes for as long as it draws, one
+batch every batch_interval seconds. A batch costs one WebDriver round trip:
+
+    actions  every stroke of the batch compiled into a single W3C Actions
+             payload (pointerMove / pointerDown / pointerUp), so the browser
+             produces trusted input events and the app handles them as a user's.
+    events   one execute_script that dispatches synthetic pointer and mouse
+             events in the page. Cheaper for the browser, but the events are
+             untrusted; use it only when the app does not check isTrusted.
+
+Points are canvas coordinates; dispatch adds the canvas position in the viewport.
+"""
+import math
+import random
+from threading import Lock
+
+from selenium.webdriver.remote.command import Command
+
+STROKE_KINDS = ('curve', 'shape', 'text')
+DISPATCH_MODES = ('actions', 'events')
+
+# Seven-segment digits on a unit cell, y pointing down
+SEGMENTS = {
+    'a': ((0, 0), (1, 0)), 'b': ((1, 0), (1, 0.5)), 'c': ((1, 0.5), (1, 1)), 'd': ((1, 1), (0, 1)),
+    'e': ((0, 1), (0, 0.5)), 'f': ((0, 0.5), (0, 0)), 'g': ((0, 0.5), (1, 0.5)),
+}
+DIGITS = {
+    '0': 'abcdef', '1': 'bc', '2': 'abged', '3': 'abgcd', '4': 'fgbc',
+    '5': 'afgcd', '6': 'afgedc', '7': 'abc', '8': 'abcdefg', '9': 'abcdfg',
+}
+
+EVENTS_JS = """
+const [strokes, left, top] = arguments;
+let dispatched = 0;
+for (const points of strokes) {
+    const target = document.elementFromPoint(left + points[0], top + points[1]);
+    if (!target) continue;
+    const fire = (type, i, buttons) => {
+        const init = {bubbles: true, cancelable: true, composed: true, pointerId: 1, pointerType: 'mouse',
+                      isPrimary: true, button: 0, buttons: buttons,
+                      clientX: left + points[i], clientY: top + points[i + 1]};
+        target.dispatchEvent(new PointerEvent('pointer' + type, init));
+        target.dispatchEvent(new MouseEvent('mouse' + type, init));
+    };
+    fire('down', 0, 1);
+    for (let i = 2; i < points.length; i += 2) fire('move', i, 1);
+    fire('up', points.length - 2, 0);
+    dispatched += 1;
+}
+return dispatched;
+"""
+
+
+class StrokeGenerator:
+    """Random strokes inside a width x height canvas; a stroke is a list of (x, y) integer points."""
+
+    def __init__(self, width, height, seed=None, points_per_stroke=16, mix=None, margin=10):
+        self.width = width
+        self.height = height
+        self.points_per_stroke = max(2, points_per_stroke)
+        self.margin = min(margin, width / 4, height / 4)
+        self.random = random.Random(seed)
+        mix = mix or {'curve': 0.5, 'shape': 0.3, 'text': 0.2}
+        self.kinds = [kind for kind in STROKE_KINDS if mix.get(kind, 0) > 0]
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.pending = []  # strokes of a shape or digit that did not fit in the last batch
+
+    def point(self):
+        return (self.random.uniform(self.margin, self.width - self.margin),
+                self.random.uniform(self.margin, self.height - self.margin))
+
+    def clamp(self, points):
+        return [(int(min(self.width - 1, max(0, x))), int(min(self.height - 1, max(0, y)))) for x, y in points]
+
+    def curve(self):
+        # A cubic Bezier through four random points
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3) = (self.point() for _ in range(4))
+        points = []
+        for step in range(self.points_per_stroke):
+            t = step / (self.points_per_stroke - 1)
+            u = 1 - t
+            points.append((u ** 3 * x0 + 3 * u * u * t * x1 + 3 * u * t * t * x2 + t ** 3 * x3,
+                           u ** 3 * y0 + 3 * u * u * t * y1 + 3 * u * t * t * y2 + t ** 3 * y3))
+        return [self.clamp(points)]
+
+    def shape(self):
+        size = self.random.uniform(20, max(21, min(self.width, self.height) / 4))
+        cx, cy = self.point()
+        shape = self.random.choice(('rectangle', 'ellipse', 'triangle'))
+        if shape == 'rectangle':
+            corners = [(cx - size, cy - size), (cx + size, cy - size), (cx + size, cy + size), (cx - size, cy + size)]
+        else:
+            sides = 3 if shape == 'triangle' else self.points_per_stroke
+            rotation = self.random.uniform(0, 2 * math.pi)
+            aspect = self.random.uniform(0.5, 1.0) if shape == 'ellipse' else 1.0
+            corners = [(cx + size * math.cos(rotation + 2 * math.pi * i / sides),
+                        cy + size * aspect * math.sin(rotation + 2 * math.pi * i / sides)) for i in range(sides)]
+        return [self.clamp(corners + corners[:1])]
+
+    def text(self):
+        # A two to four digit number, one stroke per segment
+        height = self.random.uniform(20, max(21, min(self.width, self.height) / 6))
+        width = height / 2
+        x, y = self.point()
+        strokes = []
+        for digit in str(self.random.randrange(10, 10000)):
+            for segment in DIGITS[digit]:
+                strokes.append(self.clamp([(x + sx * width, y + sy * height) for sx, sy in SEGMENTS[segment]]))
+            x += width * 1.6
+        return strokes
+
+    def strokes(self, count):
+        """The next count strokes; a shape or number split across batches is finished in the next one."""
+        batch = self.pending[:count]
+        self.pending = self.pending[count:]
+        while len(batch) < count:
+            item = getattr(self, self.random.choices(self.kinds, self.weights)[0])()
+            room = count - len(batch)
+            batch.extend(item[:room])
+            self.pending = item[room:]
+        return batch
+
+
+def actions_payload(strokes, left, top, move_ms=0):
+    """One W3C Actions pointer source that draws every stroke."""
+    actions = []
+    for points in strokes:
+        x, y = points[0]
+        actions.append({"type": "pointerMove", "duration": 0, "origin": "viewport",
+                        "x": int(left + x), "y": int(top + y)})
+        actions.append({"type": "pointerDown", "button": 0})
+        for x, y in points[1:]:
+            actions.append({"type": "pointerMove", "duration": move_ms, "origin": "viewport",
+                            "x": int(left + x), "y": int(top + y)})
+        actions.append({"type": "pointerUp", "button": 0})
+    return {"type": "pointer", "id": "whiteboard-pen", "parameters": {"pointerType": "mouse"}, "actions": actions}
+
+
+def dispatch(driver, strokes, left, top, mode='actions', move_ms=0):
+    """Draw strokes in one round trip; returns the number of strokes dispatched."""
+    if mode == 'events':
+        flat = [[coordinate for point in points for coordinate in point] for points in strokes]
+        return driver.execute_script(EVENTS_JS, flat, left, top)
+    driver.execute(Command.W3C_ACTIONS, {"actions": [actions_payload(strokes, left, top, move_ms)]})
+    return len(strokes)
+
+
+class StrokeStats:
+    """Strokes and batches per bot, for the achieved stroke rate.
+
+    A bot's rate is its strokes over the time from its first batch to one
+    batch_interval after its last, the span the batches were meant to cover.
+    """
+
+    def __init__(self, batch_interval):
+        self.batch_interval = batch_interval
+        self.lock = Lock()
+        self.bots = {}  # bot_id -> [strokes, first batch start, last batch start]
+        self.batches = 0
+        self.failed_batches = 0
+        self.missed_batches = 0
+
+    def record(self, bot_id, strokes, started, ok=True):
+        with self.lock:
+            if not ok:
+                self.failed_batches += 1
+                return
+            self.batches += 1
+            bot = self.bots.setdefault(bot_id, [0, started, started])
+            bot[0] += strokes
+            bot[2] = started
+
+    def missed(self):
+        """A batch that came due while the bot's previous one was still waiting to run."""
+        with self.lock:
+            self.missed_batches += 1
+
+    def strokes(self):
+        with self.lock:
+            return sum(bot[0] for bot in self.bots.values())
+
+    def summary(self):
+        with self.lock:
+            bots = list(self.bots.values())
+            summary = {
+                "bots": len(bots),
+                "strokes": sum(bot[0] for bot in bots),
+                "batches": self.batches,
+                "failed_batches": self.failed_batches,
+                "missed_batches": self.missed_batches,
+            }
+        if bots:
+            started = min(bot[1] for bot in bots)
+            finished = max(bot[2] for bot in bots) + self.batch_interval
+            summary['strokes_per_second'] = round(summary['strokes'] / (finished - started), 2)
+            rates = sorted(bot[0] / (bot[2] - bot[1] + self.batch_interval) for bot in bots)
+            summary['strokes_per_second_per_bot'] = {
+                "min": round(rates[0], 2),
+                "p50": round(rates[len(rates) // 2], 2),
+                "max": round(rates[-1], 2),
+            }
+        return summary